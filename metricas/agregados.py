@@ -0,0 +1,450 @@
+"""
+Almacén local de agregados diarios por técnico.
+
+Los reportes se calculaban siempre en vivo contra la base GLPI de producción. Este
+módulo mantiene en la base de datos por defecto (modelo ``AgregadoDiarioTecnico``)
+los conteos diarios por técnico y día local de Caracas:
+
+- recibidos, pendientes SLA: por día de apertura del ticket,
+- cerrados, cerrados dentro de SLA, cerrados con SLA: por día de cierre,
+- reabiertos: por día de aprobación del rechazo de la solución.
+
+La sincronización es incremental: se recalculan solo los días afectados por
+tickets o soluciones con ``date_mod`` posterior a la marca de agua guardada en
+``EstadoSincronizacion``, más los últimos ``DIAS_REPROCESO`` días (cubren cambios
+que GLPI no refleja en ``date_mod`` del ticket, como reasignaciones). Se ejecuta
+con ``python manage.py sincronizar_agregados`` (pensado para cron).
+
+Con ``settings.REPORT_SOURCE = 'local'`` el reporte principal y las tendencias se
+leen de aquí (ver ``reporte_principal_local``, ``tendencia_tecnico_local`` y
+``tendencia_sla_local``). Diferencias conocidas frente al cálculo en vivo:
+
+- los cerrados no aplican la ventana de 90 días sobre la fecha de apertura,
+- un ticket reabierto en dos días distintos del rango cuenta dos veces,
+- los recibidos de la tendencia por técnico excluyen entidades no elegibles y
+  técnicos sin perfil, igual que en el reporte principal.
+
+La configuración se lee de ``settings.AGREGADOS_LOCALES`` (ver ``DEFAULT_AGREGADOS_CONFIG``).
+"""
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .dimensiones import ids_entidades_elegibles, nombres_por_id
+from .glpi_db import glpi_connection
+from .models import AgregadoDiarioTecnico, EstadoSincronizacion
+from .periodos import etiqueta_periodo
+from .report_cache import ZONA_HORARIA_REPORTES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AGREGADOS_CONFIG = {
+    'DIAS_REPROCESO': 7,   # Días recientes que se recalculan en cada sincronización
+    'DIAS_POR_LOTE': 31,   # Máximo de días consecutivos recalculados por consulta
+}
+
+NOMBRE_SINCRONIZACION = 'agregados_diarios'
+
+CAMPOS_CONTEO = (
+    'recibidos', 'cerrados', 'cerrados_dentro_sla', 'cerrados_con_sla', 'reabiertos',
+    'pendientes_sla_resueltos', 'pendientes_sla_abiertos',
+)
+
+
+def _config():
+    return {**DEFAULT_AGREGADOS_CONFIG, **getattr(settings, 'AGREGADOS_LOCALES', {})}
+
+
+def _a_fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+def _consultar(query, params=()):
+    with glpi_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        filas = cursor.fetchall()
+        cursor.close()
+    return filas
+
+
+# --- Marca de agua (date_mod de GLPI, en UTC) ---
+
+def _a_utc(valor):
+    """date_mod llega de MySQL sin zona horaria; GLPI lo guarda en UTC."""
+    return valor.replace(tzinfo=dt_timezone.utc) if valor is not None else None
+
+
+def _a_mysql(valor):
+    return valor.astimezone(dt_timezone.utc).replace(tzinfo=None)
+
+
+def _marcas_actuales():
+    """Máximo date_mod actual de tickets y soluciones."""
+    fila = _consultar("""
+        SELECT (SELECT MAX(date_mod) FROM glpi_tickets),
+               (SELECT MAX(date_mod) FROM glpi_itilsolutions)
+    """)[0]
+    return _a_utc(fila[0]), _a_utc(fila[1])
+
+
+def _dias_modificados(marca):
+    """
+    Días locales afectados por tickets y soluciones modificados desde ``marca``
+    (inclusive: un registro escrito en el mismo segundo que la marca se reprocesa).
+    Devuelve (dias, max_date_mod_tickets, max_date_mod_soluciones).
+    """
+    marca_mysql = _a_mysql(marca)
+    dias = set()
+
+    filas_tickets = _consultar("""
+        SELECT DATE(CONVERT_TZ(gt.date, 'UTC', 'America/Caracas')),
+               DATE(CONVERT_TZ(gt.solvedate, 'UTC', 'America/Caracas')),
+               gt.date_mod
+        FROM glpi_tickets gt
+        WHERE gt.date_mod >= %s
+    """, (marca_mysql,))
+    marca_tickets = None
+    for dia_apertura, dia_cierre, date_mod in filas_tickets:
+        dias.update(d for d in (dia_apertura, dia_cierre) if d is not None)
+        if date_mod is not None and (marca_tickets is None or date_mod > marca_tickets):
+            marca_tickets = date_mod
+
+    filas_soluciones = _consultar("""
+        SELECT DATE(CONVERT_TZ(gi.date_approval, 'UTC', 'America/Caracas')), gi.date_mod
+        FROM glpi_itilsolutions gi
+        WHERE gi.date_mod >= %s
+            AND gi.date_approval IS NOT NULL
+    """, (marca_mysql,))
+    marca_soluciones = None
+    for dia_aprobacion, date_mod in filas_soluciones:
+        if dia_aprobacion is not None:
+            dias.add(dia_aprobacion)
+        if date_mod is not None and (marca_soluciones is None or date_mod > marca_soluciones):
+            marca_soluciones = date_mod
+
+    return dias, _a_utc(marca_tickets), _a_utc(marca_soluciones)
+
+
+def _tramos(dias, max_dias):
+    """Agrupa días ordenados en tramos consecutivos (ini, fin) de a lo sumo ``max_dias``."""
+    tramos = []
+    for dia in dias:
+        if tramos:
+            ini, fin = tramos[-1]
+            if dia == fin + timedelta(days=1) and (dia - ini).days < max_dias:
+                tramos[-1] = (ini, dia)
+                continue
+        tramos.append((dia, dia))
+    return tramos
+
+
+# --- Cálculo de un tramo de días ---
+
+def _calcular_tramo(ini, fin):
+    """Conteos por (día, users_id) de los días [ini, fin] leídos de GLPI."""
+    # Importación diferida: services importa este módulo
+    from .services import rango_utc
+
+    rango = rango_utc(ini, fin)
+    conteos = {}
+
+    def fila(dia, users_id):
+        clave = (dia, users_id)
+        if clave not in conteos:
+            conteos[clave] = dict.fromkeys(CAMPOS_CONTEO, 0)
+        return conteos[clave]
+
+    ids_entidades = ids_entidades_elegibles()
+    if ids_entidades:
+        entidad_elegible = f"gt.entities_id IN ({', '.join(['%s'] * len(ids_entidades))})"
+    else:
+        entidad_elegible = "1 = 0"
+
+    # Por día de apertura: recibidos (entidades elegibles, técnicos con perfil) y pendientes SLA
+    filas = _consultar(f"""
+        SELECT
+            DATE(CONVERT_TZ(gt.date, 'UTC', 'America/Caracas')) AS dia,
+            gtu.users_id,
+            COUNT(DISTINCT CASE
+                WHEN perfil.users_id IS NOT NULL AND {entidad_elegible}
+                THEN gt.id END) AS recibidos,
+            SUM(CASE
+                WHEN gt.solvedate > gt.time_to_resolve
+                     AND MONTH(gt.time_to_resolve) = MONTH(gt.date)
+                     AND MONTH(gt.solvedate) != MONTH(gt.date)
+                THEN (YEAR(gt.solvedate) - YEAR(gt.`date`)) * 12 + (MONTH(gt.solvedate) - MONTH(gt.`date`))
+                ELSE 0 END) AS pendientes_sla_resueltos,
+            SUM(CASE WHEN gt.solvedate IS NULL THEN 1 ELSE 0 END) AS pendientes_sla_abiertos
+        FROM glpi_tickets gt
+        JOIN glpi_entities ge ON gt.entities_id = ge.id
+        JOIN glpi_tickets_users gtu ON gt.id = gtu.tickets_id AND gtu.type = 2
+        LEFT JOIN (
+            SELECT DISTINCT gpu.users_id
+            FROM glpi_profiles_users gpu
+            JOIN glpi_profiles gp ON gpu.profiles_id = gp.id
+        ) AS perfil ON perfil.users_id = gtu.users_id
+        WHERE
+            gt.is_deleted = 0
+            AND gt.date >= %s AND gt.date < %s
+        GROUP BY dia, gtu.users_id
+    """, (*ids_entidades, *rango))
+    for dia, users_id, recibidos, resueltos, abiertos in filas:
+        f = fila(dia, users_id)
+        f['recibidos'] = int(recibidos or 0)
+        f['pendientes_sla_resueltos'] = int(resueltos or 0)
+        f['pendientes_sla_abiertos'] = int(abiertos or 0)
+
+    # Por día de cierre: cerrados, dentro de SLA y con SLA definido
+    filas = _consultar("""
+        SELECT
+            DATE(CONVERT_TZ(gt.solvedate, 'UTC', 'America/Caracas')) AS dia,
+            gtu.users_id,
+            COUNT(DISTINCT gt.id) AS cerrados,
+            SUM(CASE WHEN gt.solvedate <= gt.time_to_resolve THEN 1 ELSE 0 END) AS cerrados_dentro_sla,
+            COUNT(DISTINCT CASE WHEN gt.time_to_resolve IS NOT NULL THEN gt.id END) AS cerrados_con_sla
+        FROM glpi_tickets gt
+        JOIN glpi_tickets_users gtu ON gt.id = gtu.tickets_id AND gtu.type = 2
+        WHERE
+            gt.is_deleted = 0
+            AND gt.status > 4
+            AND gt.solvedate >= %s AND gt.solvedate < %s
+        GROUP BY dia, gtu.users_id
+    """, rango)
+    for dia, users_id, cerrados, dentro_sla, con_sla in filas:
+        f = fila(dia, users_id)
+        f['cerrados'] = int(cerrados or 0)
+        f['cerrados_dentro_sla'] = int(dentro_sla or 0)
+        f['cerrados_con_sla'] = int(con_sla or 0)
+
+    # Por día de aprobación del rechazo: reabiertos
+    filas = _consultar("""
+        SELECT
+            DATE(CONVERT_TZ(gi.date_approval, 'UTC', 'America/Caracas')) AS dia,
+            gi.users_id,
+            COUNT(DISTINCT gi.items_id) AS reabiertos
+        FROM glpi_itilsolutions gi
+        INNER JOIN glpi_tickets gt ON gi.items_id = gt.id
+        WHERE
+            gi.status = 4
+            AND gi.users_id_approval > 0
+            AND gi.date_approval >= %s AND gi.date_approval < %s
+        GROUP BY dia, gi.users_id
+    """, rango)
+    for dia, users_id, reabiertos in filas:
+        fila(dia, users_id)['reabiertos'] = int(reabiertos or 0)
+
+    return conteos
+
+
+def _recalcular_tramo(ini, fin):
+    """Reemplaza los agregados de los días [ini, fin]. Devuelve las filas escritas."""
+    conteos = _calcular_tramo(ini, fin)
+    objetos = [
+        AgregadoDiarioTecnico(fecha=dia, users_id=users_id, **valores)
+        for (dia, users_id), valores in conteos.items()
+        if ini <= dia <= fin and any(valores.values())
+    ]
+    with transaction.atomic():
+        AgregadoDiarioTecnico.objects.filter(fecha__range=(ini, fin)).delete()
+        AgregadoDiarioTecnico.objects.bulk_create(objetos, batch_size=500)
+    return len(objetos)
+
+
+# --- Sincronización ---
+
+def sincronizar(desde=None, hasta=None, completo=False):
+    """
+    Sincroniza el almacén local con GLPI y devuelve un resumen.
+
+    - Primera ejecución o ``completo=True``: recalcula todos los días [desde, hasta]
+      (``desde`` es obligatorio).
+    - Ejecuciones siguientes: recalcula los días afectados desde la marca de agua
+      y los últimos ``DIAS_REPROCESO`` días, acotados a [desde, hasta] si se indican.
+
+    ``hasta`` por defecto es el día de hoy (hora de Caracas).
+    """
+    config = _config()
+    inicio = time.perf_counter()
+    hoy = datetime.now(ZONA_HORARIA_REPORTES).date()
+    desde = _a_fecha(desde) if desde else None
+    hasta = _a_fecha(hasta) if hasta else hoy
+
+    estado, _ = EstadoSincronizacion.objects.get_or_create(nombre=NOMBRE_SINCRONIZACION)
+    if completo or estado.marca_agua is None:
+        if desde is None:
+            raise ValueError("La primera sincronización (o una completa) requiere la fecha inicial 'desde'.")
+        # La marca se toma antes de leer: lo modificado durante el recálculo se verá la próxima vez
+        marcas = _marcas_actuales()
+        dias = {desde + timedelta(days=n) for n in range((hasta - desde).days + 1)}
+    else:
+        dias, *marcas = _dias_modificados(estado.marca_agua)
+        marcas = [m or estado.marca_agua for m in marcas]
+        dias.update(hoy - timedelta(days=n) for n in range(config['DIAS_REPROCESO']))
+        dias = {d for d in dias if d <= hasta and (desde is None or d >= desde)}
+
+    filas = 0
+    tramos = _tramos(sorted(dias), config['DIAS_POR_LOTE'])
+    for ini, fin in tramos:
+        filas += _recalcular_tramo(ini, fin)
+
+    # Con una sola marca para ambas tablas se toma la menor: reprocesar es inocuo, saltarse cambios no
+    marcas = [m for m in marcas if m is not None]
+    if marcas:
+        estado.marca_agua = min(marcas)
+    estado.ultima_ejecucion = timezone.now()
+    estado.dias_recalculados = len(dias)
+    estado.save()
+
+    resumen = {
+        'dias': len(dias),
+        'tramos': len(tramos),
+        'filas': filas,
+        'marca_agua': estado.marca_agua,
+        'segundos': round(time.perf_counter() - inicio, 2),
+    }
+    logger.info(f"Agregados diarios sincronizados: {resumen}")
+    return resumen
+
+
+# --- Lectura ---
+
+def _agregados(fecha_ini, fecha_fin, ids_tecnicos=None):
+    qs = AgregadoDiarioTecnico.objects.filter(fecha__range=(_a_fecha(fecha_ini), _a_fecha(fecha_fin)))
+    if ids_tecnicos is not None:
+        qs = qs.filter(users_id__in=ids_tecnicos)
+    return qs
+
+
+def reporte_principal_local(fecha_ini, fecha_fin, ids_tecnicos=None):
+    """
+    Filas del reporte principal calculadas desde el almacén local, con el mismo
+    orden de columnas que la consulta SQL (ver services.COLUMNAS_REPORTE_PRINCIPAL).
+    """
+    qs = _agregados(fecha_ini, fecha_fin, ids_tecnicos)
+    nombres = nombres_por_id()
+    totales = {}
+
+    def total(users_id):
+        nombre = nombres.get(users_id)
+        if nombre is None:
+            return None  # Usuario eliminado de GLPI: el reporte en vivo tampoco lo muestra
+        if nombre not in totales:
+            totales[nombre] = dict.fromkeys(CAMPOS_CONTEO, 0)
+        return totales[nombre]
+
+    for fila in qs.values('users_id').annotate(**{campo: Sum(campo) for campo in CAMPOS_CONTEO}):
+        t = total(fila['users_id'])
+        if t is not None:
+            for campo in CAMPOS_CONTEO:
+                t[campo] += fila[campo] or 0
+
+    # Los pendientes aún sin resolver pesan los meses entre su apertura y el día
+    # siguiente a fecha_fin, igual que en la consulta en vivo.
+    cierre = _a_fecha(fecha_fin) + timedelta(days=1)
+    abiertos = (qs.filter(pendientes_sla_abiertos__gt=0)
+                .annotate(mes=TruncMonth('fecha'))
+                .values('users_id', 'mes')
+                .annotate(abiertos=Sum('pendientes_sla_abiertos')))
+    for fila in abiertos:
+        t = total(fila['users_id'])
+        if t is not None:
+            meses = (cierre.year - fila['mes'].year) * 12 + (cierre.month - fila['mes'].month)
+            t['pendientes_sla_resueltos'] += fila['abiertos'] * meses
+
+    filas = []
+    for nombre in sorted(totales):
+        t = totales[nombre]
+        if t['recibidos'] <= 0:
+            continue
+        pendientes = t['pendientes_sla_resueltos']
+        denominador = t['cerrados'] + pendientes
+        cumplimiento = round(t['cerrados_dentro_sla'] / denominador * 100, 2) if denominador else None
+        proporcion = '0' if t['reabiertos'] == 0 else round(t['reabiertos'] / (t['cerrados'] or 1) * 100, 2)
+        filas.append((
+            nombre, t['cerrados_dentro_sla'], t['cerrados'], pendientes, cumplimiento,
+            t['cerrados'], t['recibidos'], t['reabiertos'], proporcion,
+        ))
+    return filas
+
+
+def tendencia_tecnico_local(fecha_ini, fecha_fin, ids_tecnicos):
+    """
+    Datos diarios de un técnico desde el almacén local, en el mismo formato que las
+    consultas de ``ReportGenerator.obtener_datos_tendencia_tecnico``:
+    (recibidos_data, cerrados_data, sla_data).
+    """
+    por_dia = (_agregados(fecha_ini, fecha_fin, ids_tecnicos)
+               .values('fecha')
+               .annotate(recibidos=Sum('recibidos'), cerrados=Sum('cerrados'),
+                         cerrados_dentro_sla=Sum('cerrados_dentro_sla'),
+                         cerrados_con_sla=Sum('cerrados_con_sla'))
+               .order_by('fecha'))
+    recibidos_data, cerrados_data, sla_data = [], [], []
+    for fila in por_dia:
+        if fila['recibidos']:
+            recibidos_data.append({'dia': fila['fecha'], 'recibidos': fila['recibidos']})
+        if fila['cerrados']:
+            cerrados_data.append({'dia': fila['fecha'], 'cerrados': fila['cerrados']})
+        if fila['cerrados_con_sla']:
+            sla_data.append({'dia': fila['fecha'], 'cerrados_dentro_sla': fila['cerrados_dentro_sla'],
+                             'cerrados_con_sla': fila['cerrados_con_sla']})
+    return recibidos_data, cerrados_data, sla_data
+
+
+def tendencia_tecnicos_local(fecha_ini, fecha_fin, ids_tecnicos):
+    """
+    Datos diarios por técnico desde el almacén local, en el mismo formato que las
+    consultas agrupadas por técnico de ``ReportGenerator.tendencia_diaria_tecnicos``:
+    {'recibidos': [(users_id, dia, recibidos)], 'cerrados': [(users_id, dia, cerrados)],
+    'sla': [(users_id, dia, cerrados_dentro_sla, cerrados_con_sla)]}.
+    """
+    # El almacén ya tiene una fila por técnico y día: no hace falta agrupar
+    filas = list(_agregados(fecha_ini, fecha_fin, ids_tecnicos).values_list(
+        'users_id', 'fecha', 'recibidos', 'cerrados', 'cerrados_dentro_sla', 'cerrados_con_sla'
+    ))
+    return {
+        'recibidos': [(u, f, r) for u, f, r, _, _, _ in filas if r],
+        'cerrados': [(u, f, c) for u, f, _, c, _, _ in filas if c],
+        'sla': [(u, f, d, s) for u, f, _, _, d, s in filas if s],
+    }
+
+
+def tendencia_sla_local(fecha_ini, fecha_fin, ids_tecnicos, agrupacion='mes'):
+    """
+    Cumplimiento de SLA por periodo (agrupaciones de metricas/periodos.py) y técnico
+    desde el almacén local, con las mismas claves que la consulta de tendencia SLA.
+    """
+    nombres = nombres_por_id()
+    periodos = {}
+    for fila in _agregados(fecha_ini, fecha_fin, ids_tecnicos).filter(cerrados_con_sla__gt=0).values(
+            'fecha', 'users_id', 'cerrados_dentro_sla', 'cerrados_con_sla'):
+        nombre = nombres.get(fila['users_id'])
+        if nombre is None:
+            continue
+        periodo = etiqueta_periodo(fila['fecha'], agrupacion)
+        acumulado = periodos.setdefault((periodo, nombre), [0, 0])
+        acumulado[0] += fila['cerrados_dentro_sla']
+        acumulado[1] += fila['cerrados_con_sla']
+
+    return [
+        {
+            'periodo': periodo,
+            'tecnico': nombre,
+            'cerrados_dentro_sla': dentro,
+            'cerrados_con_sla': con_sla,
+            'pendientes_sla': 0,
+            'cumplimiento': round(dentro / con_sla * 100, 2),
+        }
+        for (periodo, nombre), (dentro, con_sla) in sorted(periodos.items())
+    ]
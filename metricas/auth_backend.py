@@ -3,11 +3,11 @@
 import bcrypt
 import mysql.connector
 import logging
-from django.conf import settings
 # Asegúrate de importar Group y make_password
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth.hashers import make_password
+from .glpi_db import glpi_connection, PoolTimeoutError
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -30,39 +30,14 @@ class GLPIAuthBackend(BaseBackend):
     Crea/actualiza el usuario de Django si la autenticación GLPI es exitosa.
     """
 
-    def _get_glpi_connection(self):
-        """Método auxiliar para obtener la conexión a la BD de GLPI."""
-        try:
-            conn = mysql.connector.connect(
-                user=settings.DATABASES['glpi']['USER'],
-                password=settings.DATABASES['glpi']['PASSWORD'],
-                host=settings.DATABASES['glpi']['HOST'],
-                database=settings.DATABASES['glpi']['NAME'],
-                port=int(settings.DATABASES['glpi']['PORT']),
-                connection_timeout=10
-            )
-            return conn
-        except mysql.connector.Error as e:
-            logger.error(f"Error de conexión MySQL: {str(e)}")
-            return None
-        except Exception as e:
-             logger.error(f"Error inesperado al conectar a GLPI: {str(e)}")
-             return None
-
     def authenticate(self, request, username=None, password=None):
         if not username or not password:
             logger.warning("Intento de autenticación con usuario o contraseña faltante")
             return None
 
-        conn = self._get_glpi_connection()
-        if not conn:
-            return None  # Falló la conexión
-
         user_data = None
-        cursor = None
 
         try:
-            cursor = conn.cursor(dictionary=True)
             # --- Consulta Optimizada ---
             query = f"""
                 SELECT
@@ -74,21 +49,23 @@ class GLPIAuthBackend(BaseBackend):
                 WHERE gu.name = %s
                 GROUP BY gu.id, gu.name, gu.password, gu.firstname, gu.realname
             """
-            cursor.execute(query, (*REQUIRED_GLPI_PROFILE_IDS, username))
-            user_data = cursor.fetchone()
+            # Conexión prestada por el pool GLPI compartido
+            with glpi_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, (*REQUIRED_GLPI_PROFILE_IDS, username))
+                user_data = cursor.fetchone()
+                cursor.close()
             # ---------------------------
 
+        except PoolTimeoutError as e:
+            logger.error(f"Sin conexiones GLPI disponibles para autenticar a {username}: {str(e)}")
+            return None
         except mysql.connector.Error as e:
             logger.error(f"Error MySQL durante consulta de autenticación para {username}: {str(e)}")
             return None
         except Exception as e:
             logger.error(f"Error inesperado durante consulta GLPI para {username}: {str(e)}")
             return None
-        finally:
-            if cursor:
-                cursor.close()
-            if conn and conn.is_connected():
-                conn.close()
 
         if not user_data:
             logger.warning(f"Usuario {username} no encontrado en la base de datos GLPI.")
@@ -160,6 +137,14 @@ class GLPIAuthBackend(BaseBackend):
                     logger.error(f"Error al añadir usuario {username} al grupo Django: {e}")
                     # return None # Podrías denegar el acceso si falla la asignación de grupo
 
+                # Datos visibles del usuario GLPI; login_view los guarda en la sesión para
+                # que el context processor no tenga que consultarlos en cada petición
+                user.datos_glpi = {
+                    'name': user_data.get('name'),
+                    'realname': user_data.get('realname'),
+                    'firstname': user_data.get('firstname'),
+                }
+
                 return user # ¡Autenticación completa y exitosa!
 
             except Exception as e:
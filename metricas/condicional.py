@@ -0,0 +1,84 @@
+"""
+Peticiones condicionales (ETag / Last-Modified) para los catálogos que cambian poco.
+
+La lista de técnicos y los catálogos de grupos se pedían completos en cada carga de
+página. Con ``catalogo_condicional`` la vista calcula sus validadores a partir del
+marcador de cambios de GLPI del que dependen sus datos (ver metricas/dimensiones.py):
+
+- ``ETag``: hash del marcador, la vista y los parámetros de la petición;
+- ``Last-Modified``: el mayor ``date_mod`` del marcador (GLPI lo guarda en UTC).
+
+Si el cliente envía ``If-None-Match`` / ``If-Modified-Since`` y los datos no
+cambiaron se responde 304 sin ejecutar la vista. Django evalúa ``If-None-Match``
+antes que ``If-Modified-Since``, así que los cambios sin ``date_mod`` (miembros de
+grupos, perfiles) se detectan por el ETag. ``Cache-Control: private, max-age``
+(``CACHE_HTTP_CATALOGOS['MAX_AGE']``) evita incluso la revalidación durante ese tiempo.
+"""
+import hashlib
+import logging
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_HTTP_CATALOGOS = {
+    'MAX_AGE': 300,  # Segundos que el navegador usa su copia sin revalidar
+}
+
+
+def _config():
+    return {**DEFAULT_CACHE_HTTP_CATALOGOS, **getattr(settings, 'CACHE_HTTP_CATALOGOS', {})}
+
+
+def ultima_modificacion(marca):
+    """Timestamp del mayor datetime del marcador (date_mod de GLPI, en UTC) o None."""
+    fechas = [valor for valor in marca or () if isinstance(valor, datetime)]
+    if not fechas:
+        return None
+    fecha = max(fechas)
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=dt_timezone.utc)
+    return fecha.timestamp()
+
+
+def etag_catalogo(nombre, request, marca):
+    """ETag de la respuesta de la vista ``nombre`` para esta petición y este marcador."""
+    parametros = sorted(request.GET.lists())
+    return quote_etag(hashlib.sha1(f"{nombre}|{parametros!r}|{marca!r}".encode()).hexdigest())
+
+
+def catalogo_condicional(version):
+    """
+    Decorador de vistas GET de catálogos. ``version()`` devuelve el marcador de
+    cambios de GLPI de los datos de la vista; si no se puede obtener, la vista
+    responde como siempre, sin validadores. Solo las respuestas 200 (y los 304)
+    llevan validadores y ``Cache-Control``.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            try:
+                marca = version()
+            except Exception as e:
+                logger.warning(f"Sin validadores para {vista.__name__}: {e}")
+                return vista(request, *args, **kwargs)
+
+            etag = etag_catalogo(vista.__name__, request, marca)
+            modificado = ultima_modificacion(marca)
+            respuesta = get_conditional_response(request, etag=etag, last_modified=modificado)
+            if respuesta is None:
+                respuesta = vista(request, *args, **kwargs)
+            if respuesta.status_code not in (200, 304):
+                return respuesta
+
+            respuesta['ETag'] = etag
+            if modificado is not None:
+                respuesta['Last-Modified'] = http_date(modificado)
+            patch_cache_control(respuesta, private=True, max_age=_config()['MAX_AGE'])
+            return respuesta
+        return envoltura
+    return decorador
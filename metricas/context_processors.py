@@ -1,35 +1,33 @@
-import mysql.connector
-from django.conf import settings
+from .dimensiones import usuario_por_login
 import logging
 
 logger = logging.getLogger('metricas')
 
+# Clave de sesión con los datos visibles del usuario GLPI (se guardan al iniciar sesión)
+SESION_USUARIO_GLPI = 'glpi_usuario'
+
+def datos_usuario_glpi(name, realname, firstname):
+    """Datos del usuario que usan las plantillas (inicial del avatar, apellido y nombre)."""
+    user_initial = realname[0].upper() if realname else (name[0].upper() if name else '')
+    return {
+        'user_initial': user_initial,
+        'user_realname': realname or '',
+        'user_firstname': firstname or ''  # Agregar firstname
+    }
+
 def user_initial(request):
     if request.user.is_authenticated:
-        try:
-            conn = mysql.connector.connect(
-                user=settings.DATABASES['glpi']['USER'],
-                password=settings.DATABASES['glpi']['PASSWORD'],
-                host=settings.DATABASES['glpi']['HOST'],
-                database=settings.DATABASES['glpi']['NAME'],
-                port=int(settings.DATABASES['glpi']['PORT'])
-            )
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(
-                "SELECT gu.name, gu.realname, gu.firstname FROM glpi_users gu WHERE gu.name = %s",
-                (request.user.username,)
-            )
-            user_data = cursor.fetchone()
-            cursor.close()
-            conn.close()
-
-            if user_data:
-                user_initial = user_data['realname'][0].upper() if user_data.get('realname') else user_data['name'][0].upper()
-                return {
-                    'user_initial': user_initial,
-                    'user_realname': user_data.get('realname', ''),
-                    'user_firstname': user_data.get('firstname', '')  # Agregar firstname
-                }
-        except Exception as e:
-            logger.error(f"Error getting user data: {str(e)}")
-    return {'user_initial': '', 'user_realname': '', 'user_firstname': ''}  # Valores predeterminados
\ No newline at end of file
+        datos = request.session.get(SESION_USUARIO_GLPI)
+        if datos is None:
+            # Sesión iniciada antes de guardar los datos en el login: se toman del
+            # directorio de usuarios en memoria (sin consultar GLPI) y se guardan en la sesión
+            try:
+                usuario = usuario_por_login(request.user.username)
+                datos = datos_usuario_glpi(usuario['name'], usuario['realname'], usuario['firstname']) if usuario else {}
+                request.session[SESION_USUARIO_GLPI] = datos
+            except Exception as e:
+                logger.error(f"Error getting user data: {str(e)}")
+                datos = {}
+        if datos:
+            return datos
+    return {'user_initial': '', 'user_realname': '', 'user_firstname': ''}  # Valores predeterminados
@@ -0,0 +1,173 @@
+"""
+Transformaciones de reportes que usan numpy y pandas.
+
+pandas (con numpy) es la dependencia más pesada de importar en cada worker de
+gunicorn y solo la necesitan el pivote de la tendencia SLA y las series diarias de
+tendencia por técnico. Este módulo se importa dentro de las funciones que lo
+usan (``ReportGenerator.tendencia_sla``,
+``ReportGenerator.obtener_datos_tendencia_tecnico`` y
+``ReportGenerator.tendencia_diaria_tecnicos``), nunca al cargar la aplicación.
+"""
+import numpy as np
+import pandas as pd
+
+
+def pivotar_cumplimiento_sla(filas, periodos=None):
+    """
+    Pivota filas (periodo, tecnico, cerrados_dentro_sla, cerrados_con_sla) a una fila
+    por técnico con el cumplimiento de cada periodo (0.0 donde el técnico no tiene
+    datos), ordenadas por técnico. Las filas repetidas de un técnico y periodo se
+    suman. ``periodos``: columnas del cuadro, en orden cronológico; None = las
+    presentes en los datos.
+
+    Todo el cálculo se hace sobre arreglos: índices de técnico y periodo con
+    ``np.unique``/``np.searchsorted``, sumas con ``np.add.at`` y el cumplimiento con
+    una sola división sobre la matriz técnico x periodo.
+    """
+    if not filas:
+        return []
+    columnas = list(zip(*filas))
+    tecnicos_filas = np.asarray(columnas[1], dtype=object)
+    # Filas sin técnico (usuario sin nombre en GLPI) no forman parte del cuadro
+    con_tecnico = tecnicos_filas != None  # noqa: E711 (comparación elemento a elemento)
+    if not con_tecnico.any():
+        return []
+    etiquetas = np.asarray(columnas[0], dtype=object)[con_tecnico].astype(str)
+    dentro = np.asarray(columnas[2], dtype=np.float64)[con_tecnico]
+    con_sla = np.asarray(columnas[3], dtype=np.float64)[con_tecnico]
+    tecnicos, indice_tecnico = np.unique(tecnicos_filas[con_tecnico].astype(str), return_inverse=True)
+
+    if periodos is None:
+        periodos, indice_periodo = np.unique(etiquetas, return_inverse=True)
+    else:
+        # Las etiquetas ordenan cronológicamente como texto: búsqueda binaria
+        periodos = np.asarray(periodos, dtype=str)
+        indice_periodo = np.searchsorted(periodos, etiquetas)
+        en_rango = indice_periodo < len(periodos)
+        en_rango[en_rango] = periodos[indice_periodo[en_rango]] == etiquetas[en_rango]
+        indice_tecnico, indice_periodo = indice_tecnico[en_rango], indice_periodo[en_rango]
+        dentro, con_sla = dentro[en_rango], con_sla[en_rango]
+
+    forma = (len(tecnicos), len(periodos))
+    matriz_dentro = np.zeros(forma)
+    matriz_con_sla = np.zeros(forma)
+    np.add.at(matriz_dentro, (indice_tecnico, indice_periodo), dentro)
+    np.add.at(matriz_con_sla, (indice_tecnico, indice_periodo), con_sla)
+
+    cumplimiento = np.zeros(forma)
+    np.divide(matriz_dentro, matriz_con_sla, out=cumplimiento, where=matriz_con_sla > 0)
+    cumplimiento = np.round(cumplimiento * 100, 2)
+
+    nombres_periodos = periodos.tolist()
+    return [
+        {'tecnico': tecnico, **dict(zip(nombres_periodos, valores))}
+        for tecnico, valores in zip(tecnicos.tolist(), cumplimiento.tolist())
+    ]
+
+
+def combinar_tendencia_diaria(recibidos_data, cerrados_data, sla_data, fecha_ini, fecha_fin):
+    """
+    DataFrame con una fila por día del rango (columna 'dia') y los conteos enteros
+    'recibidos', 'cerrados', 'cerrados_dentro_sla' y 'cerrados_con_sla' (0 en los
+    días sin datos).
+    """
+    df_recibidos = pd.DataFrame(recibidos_data)
+    df_cerrados = pd.DataFrame(cerrados_data)
+    df_sla = pd.DataFrame(sla_data)
+
+    # Asegurarse de que la columna 'dia' sea datetime
+    if not df_recibidos.empty:
+        df_recibidos['dia'] = pd.to_datetime(df_recibidos['dia'])
+    if not df_cerrados.empty:
+        df_cerrados['dia'] = pd.to_datetime(df_cerrados['dia'])
+    if not df_sla.empty:
+        df_sla['dia'] = pd.to_datetime(df_sla['dia'])
+
+    # Crear un DataFrame base con todas las fechas del rango para asegurar continuidad
+    date_range = pd.date_range(start=fecha_ini, end=fecha_fin, freq='D')
+    df_base = pd.DataFrame({'dia': date_range})
+
+    # Fusionar los dataframes con el base usando outer merge
+    df_merged = df_base
+    if not df_recibidos.empty: df_merged = pd.merge(df_merged, df_recibidos, on='dia', how='left')
+    if not df_cerrados.empty: df_merged = pd.merge(df_merged, df_cerrados, on='dia', how='left')
+    if not df_sla.empty: df_merged = pd.merge(df_merged, df_sla, on='dia', how='left')
+    else:
+        # Si todos están vacíos, df_merged será solo el df_base con fechas
+        df_merged['recibidos'] = 0
+        df_merged['cerrados'] = 0
+        df_merged['cerrados_dentro_sla'] = 0
+        df_merged['cerrados_con_sla'] = 0
+
+    df_merged = df_merged.fillna(0).sort_values(by='dia')
+    # Convertir columnas numéricas a enteros
+    df_merged['recibidos'] = df_merged['recibidos'].astype(int)
+    df_merged['cerrados'] = df_merged['cerrados'].astype(int)
+    df_merged['cerrados_dentro_sla'] = df_merged['cerrados_dentro_sla'].astype(int)
+    df_merged['cerrados_con_sla'] = df_merged['cerrados_con_sla'].astype(int)
+
+    return df_merged
+
+
+# Columnas de valores de cada consulta agrupada por técnico y día (tras users_id y dia)
+SERIES_POR_METRICA = {
+    'recibidos': ('recibidos',),
+    'cerrados': ('cerrados',),
+    'sla': ('cerrados_dentro_sla', 'cerrados_con_sla'),
+}
+
+
+def series_diarias_tecnicos(datos, etiquetas, ids_por_fila, fecha_ini, fecha_fin):
+    """
+    Series diarias de varios técnicos en formato columnar::
+
+        {'fecha_ini': ..., 'fecha_fin': ..., 'dias': ['YYYY-MM-DD', ...],
+         'tecnicos': [...], 'series': {'recibidos': [[...], ...], 'cerrados': ...,
+                                       'cerrados_dentro_sla': ..., 'cerrados_con_sla': ...}}
+
+    ``datos``: {'recibidos' | 'cerrados' | 'sla': [(users_id, dia, valores...)]} (ver
+    ``SERIES_POR_METRICA``). ``etiquetas[i]`` es el técnico de la fila i y
+    ``ids_por_fila[i]`` sus ids de usuario GLPI; las filas de un usuario se suman en
+    la de su técnico. Cada serie es una lista por técnico, alineada con ``dias``
+    (0 en los días sin datos).
+
+    Todas las filas de una métrica se reindexan de una vez: índice de técnico con
+    ``np.searchsorted`` sobre los ids, índice de día restando el inicio del rango en
+    ``datetime64[D]`` y sumas con ``np.add.at`` sobre la matriz técnico x día.
+    """
+    inicio = np.datetime64(str(fecha_ini)[:10], 'D')
+    dias = np.arange(inicio, np.datetime64(str(fecha_fin)[:10], 'D') + 1)
+    forma = (len(etiquetas), len(dias))
+
+    # Id de usuario -> fila (si un id aparece en varias filas, cuenta en la primera)
+    fila_por_id = {}
+    for fila, ids_tecnico in enumerate(ids_por_fila):
+        for user_id in ids_tecnico:
+            fila_por_id.setdefault(int(user_id), fila)
+    ids = np.array(sorted(fila_por_id), dtype=np.int64)
+    filas_ids = np.array([fila_por_id[user_id] for user_id in ids.tolist()], dtype=np.int64)
+
+    series = {}
+    for metrica, nombres in SERIES_POR_METRICA.items():
+        matrices = {nombre: np.zeros(forma, dtype=np.int64) for nombre in nombres}
+        filas = datos.get(metrica) or []
+        if filas and len(ids):
+            columnas = list(zip(*filas))
+            usuarios = np.asarray(columnas[0], dtype=np.int64)
+            indice_dia = (np.asarray(columnas[1], dtype='datetime64[D]') - inicio).astype(np.int64)
+            indice_id = np.minimum(np.searchsorted(ids, usuarios), len(ids) - 1)
+            validas = (ids[indice_id] == usuarios) & (indice_dia >= 0) & (indice_dia < len(dias))
+            indice = (filas_ids[indice_id[validas]], indice_dia[validas])
+            for posicion, nombre in enumerate(nombres, start=2):
+                # Los conteos pueden llegar como Decimal (SUM de MySQL)
+                valores = np.asarray(columnas[posicion], dtype=np.float64)[validas].astype(np.int64)
+                np.add.at(matrices[nombre], indice, valores)
+        series.update({nombre: matriz.tolist() for nombre, matriz in matrices.items()})
+
+    return {
+        'fecha_ini': str(dias[0]) if len(dias) else str(fecha_ini),
+        'fecha_fin': str(dias[-1]) if len(dias) else str(fecha_fin),
+        'dias': dias.astype(str).tolist(),
+        'tecnicos': list(etiquetas),
+        'series': series,
+    }
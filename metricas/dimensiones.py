@@ -0,0 +1,529 @@
+"""
+Resolución de dimensiones GLPI a identificadores enteros.
+
+Las consultas de reportes filtraban por ``CONCAT(gu.realname, ' ', gu.firstname) IN (...)``
+y excluían entidades con ``LOCATE(...)`` sobre ``completename``, lo que obliga a
+calcular cadenas fila por fila e impide usar los índices de ``users_id`` y
+``entities_id``. Este módulo resuelve una sola vez (y mantiene en caché):
+
+- el mapa nombre visible -> ids de usuario GLPI (un nombre puede tener varios ids),
+- el conjunto de ids de entidades elegibles para el reporte,
+
+de modo que las consultas filtren con listas ``IN`` de enteros. Cada dimensión
+revisa cada cierto tiempo un marcador barato de cambios (conteo y ``MAX(date_mod)``
+de la tabla) y solo se recarga cuando el marcador cambia.
+
+El mapa de técnicos sale del directorio de usuarios GLPI (``DirectorioUsuarios``):
+una carga masiva de ``glpi_users`` con sus perfiles que también sirve la lista de
+técnicos (perfil 10) y los datos visibles de cada usuario (context processor), sin
+consultar GLPI en cada petición. Además del marcador, el directorio se recarga
+completo al superar ``TTL_DIRECTORIO`` segundos. Un nombre o login que no está en
+el directorio (p. ej. un usuario recién creado) adelanta la verificación del
+marcador, como mucho una vez cada ``INTERVALO_REVALIDACION`` segundos: los nombres
+inexistentes que envía el cliente no provocan una recarga por petición.
+
+La jerarquía de grupos (entidades de nivel 3 -> grupos GLPI -> usuarios miembros,
+``JerarquiaGrupos``) se carga con tres consultas masivas y se indexa en memoria;
+las vistas de grupos, subgrupos y técnicos por grupo la consultan sin ir a GLPI.
+
+Los marcadores sirven también de validadores HTTP (ETag / Last-Modified) de los
+catálogos de técnicos y grupos (ver metricas/condicional.py).
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+
+from .glpi_db import glpi_connection
+from .instrumentacion import sentencia
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIMENSIONES_CONFIG = {
+    'INTERVALO_VERIFICACION': 300,  # Segundos entre verificaciones del marcador de cambios
+    'TTL_DIRECTORIO': 3600,         # Antigüedad máxima del directorio de usuarios (segundos)
+    'INTERVALO_REVALIDACION': 10,   # Segundos mínimos entre verificaciones adelantadas por claves faltantes
+    'INTERVALO_JERARQUIA': 30,      # Segundos entre verificaciones del marcador de la jerarquía de grupos
+    'TTL_JERARQUIA': 3600,          # Antigüedad máxima de la jerarquía de grupos (segundos)
+}
+
+# Perfil GLPI de los técnicos que aparecen en los reportes
+PERFIL_TECNICO = 10
+
+
+def _config():
+    return {**DEFAULT_DIMENSIONES_CONFIG, **getattr(settings, 'DIMENSIONES', {})}
+
+
+def _consultar(query, params=()):
+    with glpi_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        filas = cursor.fetchall()
+        cursor.close()
+    return filas
+
+
+class DimensionCacheada:
+    """
+    Valor derivado de GLPI que se carga con ``cargar()`` y se recarga cuando
+    ``marcador()`` cambia. El marcador se consulta como máximo una vez cada
+    ``intervalo`` segundos. Con ``ttl`` (segundos o función que los devuelve) el
+    valor se recarga también cuando supera esa antigüedad, aunque el marcador no cambie.
+    """
+
+    def __init__(self, nombre, cargar, marcador, intervalo=None, ttl=None):
+        self.nombre = nombre
+        self._cargar = cargar
+        self._marcador = marcador
+        self._intervalo = intervalo
+        self._ttl = ttl
+        self._valor = None
+        self._marca = None
+        self._verificado_en = 0.0
+        self._revalidado_en = 0.0
+        self._cargado_en = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def intervalo(self):
+        if self._intervalo is None:
+            return _config()['INTERVALO_VERIFICACION']
+        return self._intervalo() if callable(self._intervalo) else self._intervalo
+
+    def _vencido(self):
+        ttl = self._ttl() if callable(self._ttl) else self._ttl
+        return ttl is not None and time.monotonic() - self._cargado_en > ttl
+
+    def obtener(self, forzar=False):
+        ahora = time.monotonic()
+        if not forzar and self._valor is not None and ahora - self._verificado_en < self.intervalo:
+            return self._valor
+        with self._lock:
+            if not forzar and self._valor is not None and time.monotonic() - self._verificado_en < self.intervalo:
+                return self._valor
+            return self._verificar(forzar)
+
+    def revalidar(self):
+        """
+        Como ``obtener()``, pero consulta el marcador sin esperar ``intervalo``; para
+        cuando falta una clave en el valor vigente. Solo recarga si el marcador cambió
+        (o venció el ttl), y el marcador se adelanta como mucho una vez cada
+        ``INTERVALO_REVALIDACION`` segundos.
+        """
+        intervalo = _config()['INTERVALO_REVALIDACION']
+        if self._valor is not None and time.monotonic() - self._revalidado_en >= intervalo:
+            with self._lock:
+                if self._valor is not None and time.monotonic() - self._revalidado_en >= intervalo:
+                    self._revalidado_en = time.monotonic()
+                    return self._verificar()
+        return self.obtener()
+
+    def _verificar(self, forzar=False):
+        """Consulta el marcador y recarga si hace falta. Se llama con ``_lock`` tomado."""
+        # Las sentencias se registran con el nombre de la dimensión (metricas/instrumentacion.py)
+        with sentencia(f'{self.nombre}:marcador'):
+            marca = self._marcador()
+        if forzar or self._valor is None or marca != self._marca or self._vencido():
+            inicio = time.perf_counter()
+            with sentencia(f'{self.nombre}:carga'):
+                self._valor = self._cargar()
+            self._marca = marca
+            self._cargado_en = time.monotonic()
+            logger.info(f"Dimensión '{self.nombre}' recargada en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        self._verificado_en = time.monotonic()
+        return self._valor
+
+    def version(self):
+        """Marcador con el que se cargó el valor vigente: identifica lo que se sirve desde él."""
+        self.obtener()
+        return self._marca
+
+    def invalidar(self):
+        with self._lock:
+            self._valor = None
+            self._marca = None
+
+
+# --- Directorio de usuarios GLPI ---
+
+CONSULTA_DIRECTORIO_USUARIOS = """
+    SELECT gu.id, gu.name, gu.realname, gu.firstname,
+           GROUP_CONCAT(DISTINCT gp.id) AS perfiles
+    FROM glpi_users gu
+    LEFT JOIN glpi_profiles_users gpu ON gpu.users_id = gu.id
+    LEFT JOIN glpi_profiles gp ON gp.id = gpu.profiles_id
+    GROUP BY gu.id, gu.name, gu.realname, gu.firstname
+"""
+
+
+class DirectorioUsuarios:
+    """
+    Instantánea inmutable de ``glpi_users`` con sus perfiles, indexada por id, por
+    login y por nombre visible ("Apellido Nombre"). Al recargar se reemplaza entera.
+    """
+
+    def __init__(self, filas):
+        self.por_id = {}
+        self.por_login = {}
+        self.ids_por_nombre = {}
+        for user_id, login, realname, firstname, perfiles in filas:
+            # Igual que CONCAT() en MySQL: sin apellido o sin nombre no hay nombre visible
+            nombre = f"{realname} {firstname}" if realname is not None and firstname is not None else None
+            usuario = {
+                'id': user_id,
+                'name': login,
+                'realname': realname,
+                'firstname': firstname,
+                'nombre': nombre,
+                'perfiles': self._perfiles(perfiles),
+            }
+            self.por_id[user_id] = usuario
+            if login is not None:
+                self.por_login[login] = usuario
+            if nombre is not None:
+                self.ids_por_nombre.setdefault(nombre, []).append(user_id)
+
+    @staticmethod
+    def _perfiles(valor):
+        """Ids de perfil de GROUP_CONCAT (según el conector llega como str o bytes)."""
+        if not valor:
+            return frozenset()
+        if isinstance(valor, (bytes, bytearray)):
+            valor = valor.decode()
+        return frozenset(int(p) for p in str(valor).split(','))
+
+    def nombres_con_perfil(self, perfil_id):
+        """Nombres visibles (sin repetir) de los usuarios con el perfil, ordenados por apellido y nombre."""
+        usuarios = [u for u in self.por_id.values() if perfil_id in u['perfiles'] and u['nombre'] is not None]
+        usuarios.sort(key=lambda u: (u['realname'].casefold(), u['firstname'].casefold()))
+        return list(dict.fromkeys(u['nombre'] for u in usuarios))
+
+
+def _marcador_usuarios():
+    return tuple(_consultar("""
+        SELECT (SELECT COUNT(*) FROM glpi_users), (SELECT MAX(id) FROM glpi_users),
+               (SELECT MAX(date_mod) FROM glpi_users),
+               (SELECT COUNT(*) FROM glpi_profiles_users), (SELECT MAX(id) FROM glpi_profiles_users)
+    """)[0])
+
+
+def _cargar_directorio():
+    return DirectorioUsuarios(_consultar(CONSULTA_DIRECTORIO_USUARIOS))
+
+
+directorio_usuarios = DimensionCacheada(
+    'directorio_usuarios', _cargar_directorio, _marcador_usuarios,
+    ttl=lambda: _config()['TTL_DIRECTORIO'],
+)
+
+
+def usuario_por_login(login):
+    """
+    Datos del usuario GLPI con ese login (id, name, realname, firstname, nombre,
+    perfiles) o None. Un login desconocido adelanta la verificación del directorio
+    (``DimensionCacheada.revalidar``).
+    """
+    usuario = directorio_usuarios.obtener().por_login.get(login)
+    if usuario is None:
+        usuario = directorio_usuarios.revalidar().por_login.get(login)
+    return usuario
+
+
+def tecnicos_con_perfil(perfil_id=PERFIL_TECNICO):
+    """Lista de nombres visibles de los técnicos (perfil 10 por defecto)."""
+    return directorio_usuarios.obtener().nombres_con_perfil(perfil_id)
+
+
+def version_directorio_usuarios():
+    """Marcador de glpi_users/glpi_profiles_users con el que se cargó el directorio vigente."""
+    return directorio_usuarios.version()
+
+
+# --- Jerarquía de grupos: entidades -> grupos GLPI -> usuarios ---
+
+# Entidades de nivel 3, usadas como 'grupos' principales
+CONSULTA_JERARQUIA_ENTIDADES = "SELECT ge.id, ge.name FROM glpi_entities ge WHERE ge.`level` = 3 ORDER BY ge.name"
+
+# Grupos GLPI ('subgrupos') de todas las entidades
+CONSULTA_JERARQUIA_GRUPOS = """
+    SELECT gg.id, gg.name, gg.comment, gg.entities_id
+    FROM glpi_groups gg
+    ORDER BY gg.name
+"""
+
+# Miembros de todos los grupos, con su nombre visible y si tienen el perfil de técnico
+CONSULTA_JERARQUIA_MIEMBROS = """
+    SELECT ggu.groups_id, gu.id, CONCAT(gu.realname, ' ', gu.firstname) AS nombre,
+           EXISTS (SELECT 1 FROM glpi_profiles_users gpu
+                   WHERE gpu.users_id = gu.id AND gpu.profiles_id = %s) AS es_tecnico
+    FROM glpi_groups_users ggu
+    JOIN glpi_users gu ON gu.id = ggu.users_id
+"""
+
+
+def _orden_nombre(usuario):
+    # Como ORDER BY nombre en MySQL: primero los usuarios sin nombre visible
+    return (usuario['nombre'] is not None, (usuario['nombre'] or '').casefold(), usuario['id'])
+
+
+class JerarquiaGrupos:
+    """
+    Instantánea inmutable de la jerarquía entidades de nivel 3 -> grupos GLPI ->
+    usuarios miembros, indexada por id para obtener los hijos de cada nodo con una
+    búsqueda en diccionario. Las listas tienen la forma y el orden que devolvían
+    las consultas por petición de las vistas de grupos. Al recargar se reemplaza entera.
+    """
+
+    def __init__(self, entidades, grupos, miembros):
+        self.entidades = [{'id': entidad_id, 'name': nombre} for entidad_id, nombre in entidades]
+        self.grupos_por_entidad = {}
+        for grupo_id, nombre, comentario, entidad_id in grupos:
+            self.grupos_por_entidad.setdefault(entidad_id, []).append(
+                {'id': grupo_id, 'name': nombre, 'comment': comentario}
+            )
+
+        usuarios = {}
+        ids_por_grupo = {}
+        tecnicos_por_grupo = {}
+        for grupo_id, user_id, nombre, es_tecnico in miembros:
+            usuarios[user_id] = {'id': user_id, 'nombre': nombre}
+            ids_por_grupo.setdefault(grupo_id, set()).add(user_id)
+            if es_tecnico:
+                tecnicos_por_grupo.setdefault(grupo_id, set()).add(user_id)
+        self.usuarios = usuarios
+
+        def ordenados(ids):
+            return sorted((usuarios[user_id] for user_id in ids), key=_orden_nombre)
+
+        # Técnicos (perfil de técnico) de cada grupo GLPI
+        self.tecnicos_por_grupo = {grupo_id: ordenados(ids) for grupo_id, ids in tecnicos_por_grupo.items()}
+        # Usuarios de los grupos de cada entidad, sin repetir
+        self.usuarios_por_entidad = {
+            entidad_id: ordenados(set().union(*(ids_por_grupo.get(g['id'], ()) for g in grupos_entidad)))
+            for entidad_id, grupos_entidad in self.grupos_por_entidad.items()
+        }
+        self.arbol = self._armar_arbol()
+
+    def subgrupos(self, entidad_id):
+        """Grupos GLPI (id, name, comment) de la entidad, ordenados por nombre."""
+        return self.grupos_por_entidad.get(entidad_id, [])
+
+    def usuarios_de_entidad(self, entidad_id):
+        """Usuarios (id, nombre) de los grupos GLPI de la entidad, ordenados por nombre."""
+        return self.usuarios_por_entidad.get(entidad_id, [])
+
+    def tecnicos_de_grupo(self, grupo_id):
+        """Técnicos (id, nombre) que pertenecen directamente al grupo GLPI, ordenados por nombre."""
+        return self.tecnicos_por_grupo.get(grupo_id, [])
+
+    def _armar_arbol(self):
+        """
+        Árbol completo para una sola respuesta: los nombres van una vez en
+        'usuarios' (id -> nombre) y los nodos solo llevan ids.
+        """
+        def ids(usuarios):
+            return [u['id'] for u in usuarios]
+
+        grupos = []
+        referenciados = set()
+        for entidad in self.entidades:
+            subgrupos = [
+                {**grupo, 'tecnicos': ids(self.tecnicos_de_grupo(grupo['id']))}
+                for grupo in self.subgrupos(entidad['id'])
+            ]
+            tecnicos = ids(self.usuarios_de_entidad(entidad['id']))
+            referenciados.update(tecnicos)
+            for subgrupo in subgrupos:
+                referenciados.update(subgrupo['tecnicos'])
+            grupos.append({**entidad, 'tecnicos': tecnicos, 'subgrupos': subgrupos})
+        return {
+            'usuarios': {user_id: self.usuarios[user_id]['nombre'] for user_id in sorted(referenciados)},
+            'grupos': grupos,
+        }
+
+
+def _marcador_catalogo_grupos():
+    """
+    Entidades, grupos GLPI, miembros de grupos y usuarios con sus perfiles (los
+    listados de técnicos por grupo muestran nombres y filtran por perfil).
+    glpi_groups_users y glpi_profiles_users no tienen date_mod: conteo y MAX(id).
+    """
+    return tuple(_consultar("""
+        SELECT (SELECT COUNT(*) FROM glpi_entities), (SELECT MAX(date_mod) FROM glpi_entities),
+               (SELECT COUNT(*) FROM glpi_groups), (SELECT MAX(date_mod) FROM glpi_groups),
+               (SELECT COUNT(*) FROM glpi_groups_users), (SELECT MAX(id) FROM glpi_groups_users),
+               (SELECT COUNT(*) FROM glpi_users), (SELECT MAX(date_mod) FROM glpi_users),
+               (SELECT COUNT(*) FROM glpi_profiles_users), (SELECT MAX(id) FROM glpi_profiles_users)
+    """)[0])
+
+
+def _cargar_jerarquia():
+    return JerarquiaGrupos(
+        _consultar(CONSULTA_JERARQUIA_ENTIDADES),
+        _consultar(CONSULTA_JERARQUIA_GRUPOS),
+        _consultar(CONSULTA_JERARQUIA_MIEMBROS, (PERFIL_TECNICO,)),
+    )
+
+
+jerarquia_grupos = DimensionCacheada(
+    'jerarquia_grupos', _cargar_jerarquia, _marcador_catalogo_grupos,
+    intervalo=lambda: _config()['INTERVALO_JERARQUIA'],
+    ttl=lambda: _config()['TTL_JERARQUIA'],
+)
+
+
+def obtener_jerarquia():
+    """Jerarquía de grupos vigente (``JerarquiaGrupos``)."""
+    return jerarquia_grupos.obtener()
+
+
+def version_catalogo_grupos():
+    """Marcador de cambios con el que se cargó la jerarquía de grupos vigente."""
+    return jerarquia_grupos.version()
+
+
+# --- Equipos: técnicos de un grupo o subgrupo ---
+
+@dataclass(frozen=True)
+class EquipoGLPI:
+    """
+    Técnicos de un equipo GLPI, aceptado donde se acepta una lista de ``tecnicos``:
+    ``subgrupo_id`` (grupo GLPI; sus usuarios con perfil de técnico, como
+    /obtener-tecnicos-por-subgrupo/) o ``grupo_id`` (entidad de nivel 3; los usuarios
+    de todos sus grupos, como /obtener-tecnicos-por-grupo/). Si llegan los dos manda
+    el subgrupo. En SQL se filtra con una subconsulta sobre ``glpi_groups_users`` por
+    ids, sin enviar la lista de técnicos como parámetros.
+    """
+    grupo_id: Optional[int] = None
+    subgrupo_id: Optional[int] = None
+
+    @classmethod
+    def desde_parametros(cls, grupo_id=None, subgrupo_id=None):
+        """Equipo a partir de parámetros de la petición (texto o enteros); ValueError si no son enteros."""
+        if subgrupo_id not in (None, ''):
+            return cls(subgrupo_id=int(subgrupo_id))
+        if grupo_id not in (None, ''):
+            return cls(grupo_id=int(grupo_id))
+        raise ValueError("Se requiere grupo_id o subgrupo_id.")
+
+    def ids_usuarios(self):
+        """Ids de usuario GLPI de los miembros, según la jerarquía de grupos en memoria."""
+        jerarquia = obtener_jerarquia()
+        if self.subgrupo_id is not None:
+            usuarios = jerarquia.tecnicos_de_grupo(self.subgrupo_id)
+        else:
+            usuarios = jerarquia.usuarios_de_entidad(self.grupo_id)
+        return sorted(u['id'] for u in usuarios)
+
+    def condicion(self, columna):
+        """Fragmento ``AND columna IN (SELECT users_id ...)`` y sus parámetros."""
+        if self.subgrupo_id is not None:
+            return (f"""AND {columna} IN (
+                SELECT ggu.users_id FROM glpi_groups_users ggu
+                JOIN glpi_profiles_users gpu ON gpu.users_id = ggu.users_id AND gpu.profiles_id = %s
+                WHERE ggu.groups_id = %s)""", [PERFIL_TECNICO, self.subgrupo_id])
+        return (f"""AND {columna} IN (
+                SELECT ggu.users_id FROM glpi_groups_users ggu
+                JOIN glpi_groups gg ON gg.id = ggu.groups_id
+                WHERE gg.entities_id = %s)""", [self.grupo_id])
+
+
+def filtro_tecnicos(tecnicos):
+    """
+    Lo que reciben los constructores de consultas: un ``EquipoGLPI`` tal cual (se
+    filtra en SQL) o la lista de ids resueltos; None = todos los técnicos.
+    """
+    if not tecnicos:
+        return None
+    return tecnicos if isinstance(tecnicos, EquipoGLPI) else resolver_ids_tecnicos(tecnicos)
+
+
+# --- Técnicos: nombre visible -> ids ---
+
+def resolver_ids_tecnicos(tecnicos):
+    """
+    Convierte una lista de técnicos en ids de usuario GLPI ordenados.
+    Acepta los nombres visibles que envía el frontend ("Apellido Nombre") y
+    también ids enteros. Los nombres desconocidos se ignoran (se registra un aviso).
+    Con un ``EquipoGLPI`` devuelve los ids de sus miembros.
+    """
+    if isinstance(tecnicos, EquipoGLPI):
+        return tecnicos.ids_usuarios()
+    ids = set()
+    nombres = []
+    for tecnico in tecnicos or []:
+        if isinstance(tecnico, int) and not isinstance(tecnico, bool):
+            ids.add(tecnico)
+        else:
+            nombres.append(tecnico)
+
+    if nombres:
+        mapa = directorio_usuarios.obtener().ids_por_nombre
+        faltantes = [n for n in nombres if n not in mapa]
+        if faltantes:
+            # Puede tratarse de un usuario creado después de la última verificación
+            mapa = directorio_usuarios.revalidar().ids_por_nombre
+            faltantes = [n for n in faltantes if n not in mapa]
+            if faltantes:
+                logger.warning(f"Técnicos sin usuario GLPI: {faltantes}")
+        for nombre in nombres:
+            ids.update(mapa.get(nombre, ()))
+    return sorted(ids)
+
+
+def nombres_por_id():
+    """Mapa inverso id de usuario GLPI -> nombre visible ("Apellido Nombre")."""
+    return {user_id: u['nombre'] for user_id, u in directorio_usuarios.obtener().por_id.items() if u['nombre'] is not None}
+
+
+# --- Entidades elegibles ---
+
+def _marcador_entidades():
+    return tuple(_consultar("SELECT COUNT(*), MAX(id), MAX(date_mod) FROM glpi_entities")[0])
+
+
+def _cargar_entidades_elegibles():
+    filas = _consultar("""
+        SELECT ge.id
+        FROM glpi_entities ge
+        WHERE ge.completename IS NOT NULL
+            AND LOCATE('@', ge.completename) = 0
+            AND LOCATE('CASOS DUPLICADOS', UPPER(ge.completename)) = 0
+        ORDER BY ge.id
+    """)
+    return [fila[0] for fila in filas]
+
+
+entidades_elegibles = DimensionCacheada('entidades_elegibles', _cargar_entidades_elegibles, _marcador_entidades)
+
+
+def ids_entidades_elegibles():
+    """Ids de las entidades que cuentan para el reporte (sin '@' ni 'CASOS DUPLICADOS')."""
+    return entidades_elegibles.obtener()
+
+
+# --- Utilidad SQL ---
+
+def condicion_tecnicos(columna, tecnicos):
+    """
+    Fragmento ``AND columna ...`` y sus parámetros para filtrar por técnicos: lista
+    de nombres o ids (``IN`` de enteros) o ``EquipoGLPI`` (subconsulta por grupo).
+    """
+    if isinstance(tecnicos, EquipoGLPI):
+        return tecnicos.condicion(columna)
+    return condicion_in(columna, resolver_ids_tecnicos(tecnicos))
+
+
+def condicion_in(columna, valores):
+    """
+    Fragmento ``AND columna IN (%s, ...)`` y sus parámetros para una lista de enteros.
+    Con una lista vacía devuelve una condición siempre falsa (``IN ()`` no es SQL válido).
+    """
+    if not valores:
+        return "AND 1 = 0", []
+    placeholders = ', '.join(['%s'] * len(valores))
+    return f"AND {columna} IN ({placeholders})", [int(v) for v in valores]
@@ -0,0 +1,126 @@
+"""
+Exportación de reportes a Excel generada en el servidor.
+
+El libro tiene tres hojas: el reporte principal, el detalle de tickets reabiertos
+y el cuadro de tendencia SLA pivotado por técnico. Se usa openpyxl en modo
+``write_only``: cada hoja se escribe fila a fila a medida que se leen los datos
+de GLPI (``services.iterar_consulta``) y openpyxl las vuelca a disco, así que ni
+el resultado de las consultas ni el libro completo están en memoria. El archivo
+terminado se guarda en un temporal que se envía por bloques con ``FileResponse``
+y se borra al cerrarse.
+"""
+import logging
+import tempfile
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from .dimensiones import resolver_ids_tecnicos
+from .services import (ReportGenerator, COLUMNAS_REPORTE_PRINCIPAL, COLUMNAS_TICKETS_REABIERTOS,
+                       iterar_consulta, periodos_tendencia_sla, pivotar_tendencia_sla)
+from .agregados import tendencia_sla_local
+
+logger = logging.getLogger(__name__)
+
+# Mismos títulos que la tabla del reporte en la interfaz
+TITULOS_REPORTE_PRINCIPAL = [
+    'Técnico', 'Cerrados dentro SLA', 'Cerrados con SLA', 'Pendientes SLA', 'Cumplimiento SLA (%)',
+    'Total cerrados', 'Recibidos', 'Reabiertos', 'Reabiertos/Cerrados (%)',
+]
+TITULOS_TICKETS_REABIERTOS = ['Nro. Ticket', 'Fecha reapertura', 'Fecha apertura', 'Técnico asignado']
+
+_FUENTE_ENCABEZADO = Font(bold=True, color='FFFFFF')
+_RELLENO_ENCABEZADO = PatternFill(fill_type='solid', fgColor='1F4E78')
+_ALINEACION_ENCABEZADO = Alignment(horizontal='center', vertical='center', wrap_text=True)
+
+
+def _crear_hoja(libro, titulo, encabezados, anchos):
+    """Hoja write-only con anchos de columna, encabezado con estilo y panel inmovilizado."""
+    hoja = libro.create_sheet(title=titulo)
+    # En modo write_only las dimensiones y el panel deben fijarse antes de la primera fila
+    for indice, ancho in enumerate(anchos, start=1):
+        hoja.column_dimensions[get_column_letter(indice)].width = ancho
+    hoja.freeze_panes = 'A2'
+    fila = []
+    for texto in encabezados:
+        celda = WriteOnlyCell(hoja, value=texto)
+        celda.font = _FUENTE_ENCABEZADO
+        celda.fill = _RELLENO_ENCABEZADO
+        celda.alignment = _ALINEACION_ENCABEZADO
+        fila.append(celda)
+    hoja.append(fila)
+    return hoja
+
+
+def _escribir_reporte_principal(libro, fecha_ini, fecha_fin, tecnicos):
+    hoja = _crear_hoja(libro, 'Reporte', TITULOS_REPORTE_PRINCIPAL, [30] + [15] * 8)
+    filas = 0
+    for fila in ReportGenerator.iterar_reporte_principal(fecha_ini, fecha_fin, tecnicos):
+        hoja.append([fila[columna] for columna in COLUMNAS_REPORTE_PRINCIPAL])
+        filas += 1
+    return filas
+
+
+def _escribir_reabiertos(libro, fecha_ini, fecha_fin, ids_tecnicos):
+    hoja = _crear_hoja(libro, 'Reabiertos', TITULOS_TICKETS_REABIERTOS, [14, 18, 18, 30])
+    query, params = ReportGenerator.consulta_detalle_reabiertos(ids_tecnicos, fecha_ini, fecha_fin)
+    filas = 0
+    for fila in iterar_consulta(query, params, columnas=COLUMNAS_TICKETS_REABIERTOS):
+        hoja.append([fila[columna] for columna in COLUMNAS_TICKETS_REABIERTOS])
+        filas += 1
+    return filas
+
+
+def _filas_tendencia_sla(fecha_ini, fecha_fin, ids_tecnicos, agrupacion):
+    if ReportGenerator.fuente_reporte() == 'local':
+        filas = sorted(tendencia_sla_local(fecha_ini, fecha_fin, ids_tecnicos, agrupacion),
+                       key=lambda fila: (fila['tecnico'], str(fila['periodo'])))
+        return iter(filas)
+    query, params = ReportGenerator.consulta_tendencia_sla(
+        fecha_ini, fecha_fin, ids_tecnicos, agrupacion, orden_por_tecnico=True
+    )
+    return iterar_consulta(query, params)
+
+
+def _escribir_tendencia_sla(libro, fecha_ini, fecha_fin, ids_tecnicos, agrupacion):
+    periodos = periodos_tendencia_sla(fecha_ini, fecha_fin, agrupacion)
+    hoja = _crear_hoja(libro, 'Tendencia SLA', ['Técnico'] + periodos, [30] + [12] * len(periodos))
+    filas = 0
+    pivotadas = pivotar_tendencia_sla(_filas_tendencia_sla(fecha_ini, fecha_fin, ids_tecnicos, agrupacion), periodos)
+    for fila in pivotadas:
+        hoja.append([fila['tecnico']] + [fila[periodo] for periodo in periodos])
+        filas += 1
+    return filas
+
+
+def generar_excel_reporte(fecha_ini, fecha_fin, tecnicos=None, agrupacion='mes'):
+    """
+    Genera el libro Excel del reporte (``tecnicos`` por nombre; None = todos) y
+    devuelve un archivo temporal abierto y posicionado al inicio, que se borra al
+    cerrarlo. La tendencia SLA sin técnicos seleccionados abarca a todos los técnicos.
+    """
+    if tecnicos:
+        ids_tecnicos = resolver_ids_tecnicos(tecnicos)
+        ids_tendencia = ids_tecnicos
+    else:
+        ids_tecnicos = None
+        ids_tendencia = resolver_ids_tecnicos(ReportGenerator.obtener_tecnicos())
+
+    libro = Workbook(write_only=True)
+    conteos = {
+        'reporte': _escribir_reporte_principal(libro, fecha_ini, fecha_fin, tecnicos),
+        'reabiertos': _escribir_reabiertos(libro, fecha_ini, fecha_fin, ids_tecnicos),
+        'tendencia_sla': _escribir_tendencia_sla(libro, fecha_ini, fecha_fin, ids_tendencia, agrupacion),
+    }
+
+    archivo = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        libro.save(archivo)
+    except Exception:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    logger.info(f"Excel del reporte {fecha_ini} a {fecha_fin} generado: {conteos}")
+    return archivo
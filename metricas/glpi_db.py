@@ -1 +1,329 @@
- 
\ No newline at end of file
+"""
+Pool de conexiones a la base de datos GLPI.
+
+Todas las rutas de código que consultan GLPI (servicios de reportes, backend de
+autenticación, context processor y vistas de consulta) toman prestada una
+conexión de este pool mediante el context manager ``glpi_connection()`` en lugar
+de abrir una conexión nueva con ``mysql.connector.connect()`` en cada llamada.
+
+Características:
+- Tamaño máximo acotado y tiempo máximo de espera al pedir una conexión.
+- Verificación de vida (ping) al entregar una conexión reutilizada.
+- Reciclaje de conexiones que superan su tiempo de vida máximo.
+- Aislamiento por proceso: tras un fork (workers de gunicorn) el proceso hijo
+  crea su propio pool y nunca reutiliza los sockets heredados del padre.
+- Estadísticas (prestadas, ociosas, tiempos de espera) para monitoreo.
+
+La configuración se lee de ``settings.GLPI_POOL`` (ver ``DEFAULT_POOL_CONFIG``).
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+from django.conf import settings
+
+from .instrumentacion import instrumentar_conexion
+
+logger = logging.getLogger(__name__)
+
+# Valores por defecto; cualquier clave puede sobrescribirse en settings.GLPI_POOL
+DEFAULT_POOL_CONFIG = {
+    'SIZE': 5,                 # Máximo de conexiones abiertas por proceso
+    'BORROW_TIMEOUT': 10,      # Segundos máximos esperando una conexión libre
+    'MAX_LIFETIME': 1800,      # Segundos antes de reciclar una conexión
+    'PING_ON_CHECKOUT': True,  # Verificar la conexión antes de entregarla
+    'CONNECT_TIMEOUT': 10,     # Timeout de conexión TCP/autenticación
+}
+
+
+class PoolTimeoutError(Exception):
+    """No se obtuvo una conexión libre dentro del tiempo de espera configurado."""
+
+
+class _PooledConnection:
+    """Conexión física junto con su instante de creación (para el reciclaje)."""
+
+    __slots__ = ('conn', 'created_at')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+
+
+class GLPIConnectionPool:
+    """Pool acotado y thread-safe de conexiones mysql.connector hacia GLPI."""
+
+    def __init__(self, connect_kwargs, size=5, borrow_timeout=10, max_lifetime=1800,
+                 ping_on_checkout=True):
+        self._connect_kwargs = connect_kwargs
+        self.size = max(1, int(size))
+        self.borrow_timeout = float(borrow_timeout)
+        self.max_lifetime = float(max_lifetime) if max_lifetime else None
+        self.ping_on_checkout = ping_on_checkout
+        self.pid = os.getpid()
+
+        self._idle = deque()  # LIFO: se reutiliza primero la conexión más reciente
+        self._cond = threading.Condition()
+        self._open = 0        # Conexiones abiertas (prestadas + ociosas + en creación)
+        self._borrowed = 0
+
+        # Contadores para estadísticas
+        self._borrows = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._ping_failures = 0
+        self._discarded = 0
+
+    @classmethod
+    def from_settings(cls):
+        """Construye el pool con los datos de DATABASES['glpi'] y GLPI_POOL."""
+        db = settings.DATABASES['glpi']
+        config = {**DEFAULT_POOL_CONFIG, **getattr(settings, 'GLPI_POOL', {})}
+        connect_kwargs = {
+            'user': db['USER'],
+            'password': db['PASSWORD'],
+            'host': db['HOST'],
+            'database': db['NAME'],
+            'port': int(db['PORT']),
+            'connection_timeout': config['CONNECT_TIMEOUT'],
+            # Sin autocommit una conexión reutilizada conservaría la instantánea
+            # REPEATABLE READ de su primera consulta y devolvería datos viejos.
+            'autocommit': True,
+        }
+        return cls(
+            connect_kwargs,
+            size=config['SIZE'],
+            borrow_timeout=config['BORROW_TIMEOUT'],
+            max_lifetime=config['MAX_LIFETIME'],
+            ping_on_checkout=config['PING_ON_CHECKOUT'],
+        )
+
+    # --- Ciclo de vida de las conexiones físicas ---
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self._connect_kwargs)
+        with self._cond:
+            self._created += 1
+        return _PooledConnection(conn)
+
+    def _expired(self, entry):
+        return self.max_lifetime is not None and time.monotonic() - entry.created_at > self.max_lifetime
+
+    @staticmethod
+    def _close_quietly(entry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def _is_alive(self, entry):
+        try:
+            entry.conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _release_slot(self):
+        """Libera el cupo de una conexión que se cerró o no llegó a crearse."""
+        with self._cond:
+            self._open -= 1
+            self._borrowed -= 1
+            self._cond.notify()
+
+    # --- Préstamo y devolución ---
+
+    def acquire(self):
+        """
+        Toma prestada una conexión. Espera como máximo ``borrow_timeout`` segundos
+        si todas están en uso y lanza PoolTimeoutError si no se libera ninguna.
+        """
+        start = time.monotonic()
+        deadline = start + self.borrow_timeout
+        waited = False
+        entry = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1  # Se reserva el cupo; la conexión se crea fuera del lock
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No hay conexiones GLPI libres tras {self.borrow_timeout}s "
+                        f"(tamaño del pool: {self.size})."
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            self._borrowed += 1
+            self._borrows += 1
+            wait_time = time.monotonic() - start
+            if waited:
+                self._waits += 1
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        try:
+            if entry is not None:
+                if self._expired(entry):
+                    with self._cond:
+                        self._recycled += 1
+                    self._close_quietly(entry)
+                    entry = None
+                elif self.ping_on_checkout and not self._is_alive(entry):
+                    logger.warning("Conexión GLPI inactiva detectada en el pool; se reemplaza.")
+                    with self._cond:
+                        self._ping_failures += 1
+                    self._close_quietly(entry)
+                    entry = None
+            if entry is None:
+                entry = self._connect()
+        except Exception:
+            self._release_slot()
+            raise
+        return entry
+
+    def release(self, entry, discard=False):
+        """Devuelve una conexión al pool, o la cierra si está dañada o vencida."""
+        if not discard:
+            try:
+                # Un cursor sin consumir por completo deja la conexión inutilizable
+                discard = bool(entry.conn.unread_result)
+            except Exception:
+                discard = True
+        if discard or self._expired(entry):
+            with self._cond:
+                if discard:
+                    self._discarded += 1
+                else:
+                    self._recycled += 1
+            self._close_quietly(entry)
+            self._release_slot()
+            return
+        with self._cond:
+            self._idle.append(entry)
+            self._borrowed -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager que presta una conexión y la devuelve al salir."""
+        entry = self.acquire()
+        try:
+            yield entry.conn
+        except BaseException:
+            # Tras un error no se sabe en qué estado quedó la sesión: se descarta
+            self.release(entry, discard=True)
+            raise
+        else:
+            self.release(entry)
+
+    def close_all(self):
+        """Cierra las conexiones ociosas (las prestadas se cierran al devolverse)."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for entry in idle:
+            self._close_quietly(entry)
+
+    def stats(self):
+        """Estadísticas del pool de este proceso."""
+        with self._cond:
+            return {
+                'pid': self.pid,
+                'size': self.size,
+                'open': self._open,
+                'borrowed': self._borrowed,
+                'idle': len(self._idle),
+                'borrows': self._borrows,
+                'waits': self._waits,
+                'wait_time_total_ms': round(self._wait_time_total * 1000, 2),
+                'wait_time_avg_ms': round(self._wait_time_total * 1000 / self._borrows, 2) if self._borrows else 0.0,
+                'wait_time_max_ms': round(self._wait_time_max * 1000, 2),
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'recycled': self._recycled,
+                'ping_failures': self._ping_failures,
+                'discarded': self._discarded,
+            }
+
+
+# --- Pool por proceso ---
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """
+    Se ejecuta en el proceso hijo tras un fork. Se descartan las referencias al
+    pool del padre sin cerrarlas: cerrar esos sockets enviaría COM_QUIT sobre
+    conexiones que el padre (u otro worker) podría seguir usando.
+    """
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_pool():
+    """Devuelve el pool del proceso actual, creándolo la primera vez."""
+    global _pool
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = GLPIConnectionPool.from_settings()
+                logger.info(f"Pool de conexiones GLPI creado para el proceso {_pool.pid} (tamaño {_pool.size}).")
+    return _pool
+
+
+def reiniciar_pool():
+    """
+    Cierra las conexiones ociosas y descarta el pool del proceso; el siguiente uso
+    lo crea de nuevo con los settings vigentes (p. ej. benchmark_reportes al
+    cambiar de base de datos).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.close_all()
+        _pool = None
+
+
+@contextmanager
+def glpi_connection():
+    """
+    Presta una conexión GLPI del pool del proceso.
+
+    Uso:
+        with glpi_connection() as conn:
+            cursor = conn.cursor()
+            ...
+    """
+    with get_pool().connection() as conn:
+        # Cursores medidos por petición (Server-Timing, consultas lentas)
+        yield instrumentar_conexion(conn)
+
+
+def pool_stats():
+    """Estadísticas del pool de este proceso (vacías si aún no se ha creado)."""
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        return {'pid': os.getpid(), 'size': 0, 'open': 0, 'borrowed': 0, 'idle': 0}
+    return pool.stats()
@@ -0,0 +1,148 @@
+"""
+Figuras Plotly de las gráficas del reporte principal.
+
+plotly (y con él numpy) tarda en importarse y ocupa memoria en cada worker de
+gunicorn; la mayoría de las peticiones (login, listas de técnicos, reportes) no
+lo necesitan. Por eso este módulo no se importa desde ``metricas.views`` al
+cargar la aplicación sino dentro de la vista ``generar_grafica``, la primera vez
+que se piden gráficas en el formato completo; la interfaz usa el formato
+compacto de ``metricas/plantillas_graficas.py``, que no necesita plotly.
+"""
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from .plantillas_graficas import COLORES, META_SLA, series_reporte_principal
+
+
+def figuras_reporte_principal(report_data):
+    """
+    JSON de las figuras de cumplimiento SLA y de volumen de tickets por técnico
+    a partir de las filas del reporte principal: [graph_sla_json, graph_volumen_json].
+    """
+    # --- 1. Series de los Gráficos (las mismas del formato compacto) ---
+    series = series_reporte_principal(report_data)
+    tecnicos = series['tecnicos']
+    cumplimiento_sla = series['cumplimiento_sla']
+    tickets_recibidos = series['recibidos']
+    tickets_cerrados = series['cerrados']
+    pendientes = series['pendientes']
+    colors = COLORES
+
+    # --- 2. Generación del Gráfico 1: Cumplimiento SLA ---
+    fig_sla = go.Figure()
+
+    fig_sla.add_trace(go.Bar(
+        x=tecnicos,
+        y=cumplimiento_sla,
+        name='Cumplimiento SLA',
+        marker_color=colors['primary'],
+        text=[f'{val:.1f}%' for val in cumplimiento_sla], # Texto para cada barra
+        textposition='outside', # Posición del texto
+        hoverinfo='x+y' # Información al pasar el mouse
+        # textfont_size=10 # Opcional: ajustar tamaño del texto en la barra
+    ))
+
+    # Añade línea de meta SLA
+    meta_sla = META_SLA # Define la meta
+    fig_sla.add_hline(
+        y=meta_sla,
+        line_width=2,
+        line_dash="dash",
+        line_color=colors['accent'],
+        annotation_text=f'Meta SLA ({meta_sla}%)',
+        annotation_position="bottom right"
+    )
+
+    # Configura el layout de la gráfica SLA
+    fig_sla.update_layout(
+        title_text='<b>Cumplimiento de SLA por Técnico</b>', # Título en negrita
+        title_font_size=20,
+        xaxis_title='Técnico',
+        yaxis_title='Cumplimiento (%)',
+        # Ajusta el rango Y para dar espacio al texto 'outside'
+        yaxis_range=[0, max(110, (max(cumplimiento_sla) if cumplimiento_sla else 0) * 1.20) + 5],
+        xaxis_tickangle=-45, # Rota etiquetas X
+        legend_title_text='Leyenda',
+        template='plotly_white', # Estilo base
+        height=600, # Aumentar altura del gráfico
+        margin=dict(l=70, r=40, t=100, b=150), # Ajusta márgenes (más espacio abajo para etiquetas X)
+        font=dict(
+            family="Arial, sans-serif",
+            size=12,
+            color="black"
+        ),
+        xaxis_tickfont_size=11,
+        yaxis_tickfont_size=11,
+        hovermode='x unified' # Mejora el hover
+    )
+
+    # Convierte la figura SLA a JSON
+    graph_sla_json = pio.to_json(fig_sla)
+
+    # --- 3. Generación del Gráfico 2: Volumen de Tickets ---
+    fig_volumen = go.Figure()
+
+    # Añade traza para Tickets Recibidos
+    fig_volumen.add_trace(go.Bar(
+        x=tecnicos,
+        y=tickets_recibidos,
+        name='Recibidos',
+        marker_color=colors['recibidos'],
+        text=[int(val) for val in tickets_recibidos], # Texto entero
+        textposition='auto', # 'auto' puede ser mejor si las barras son muy pequeñas
+        # textfont_size=10,
+        hoverinfo='x+y'
+    ))
+
+    # Añade traza para Tickets Cerrados
+    fig_volumen.add_trace(go.Bar(
+        x=tecnicos,
+        y=tickets_cerrados,
+        name='Cerrados',
+        marker_color=colors['cerrados'],
+        text=[int(val) for val in tickets_cerrados],
+        textposition='auto',
+        # textfont_size=10,
+        hoverinfo='x+y'
+    ))
+
+    # Añade traza para Tickets Pendientes SLA
+    fig_volumen.add_trace(go.Bar(
+        x=tecnicos,
+        y=pendientes,
+        name='Pendientes SLA',
+        marker_color=colors['pendientes'],
+        text=[int(val) for val in pendientes],
+        textposition='auto',
+        # textfont_size=10,
+        hoverinfo='x+y'
+    ))
+
+    # Configura el layout de la gráfica de Volumen
+    max_volumen_val = 0
+    if tickets_recibidos or tickets_cerrados or pendientes:
+        all_volumen_values = tickets_recibidos + tickets_cerrados + pendientes
+        max_volumen_val = max(all_volumen_values) if all_volumen_values else 0
+
+    fig_volumen.update_layout(
+        title_text='<b>Volumen de Tickets por Técnico</b>', # Título en negrita
+        title_font_size=20,
+        xaxis_title='Técnico',
+        yaxis_title='Cantidad de Tickets',
+        yaxis_range=[0, max_volumen_val * 1.20 + 5], # Ajusta el rango Y para dar espacio
+        barmode='group', # Agrupa las barras
+        xaxis_tickangle=-45,
+        legend_title_text='Tipo de Ticket',
+        template='plotly_white',
+        height=600, # Aumentar altura
+        margin=dict(l=70, r=40, t=100, b=150), # Ajusta márgenes
+        font=dict(family="Arial, sans-serif", size=12, color="black"),
+        xaxis_tickfont_size=11,
+        yaxis_tickfont_size=11,
+        hovermode='x unified',
+    )
+
+    # Convierte la figura de Volumen a JSON
+    graph_volumen_json = pio.to_json(fig_volumen)
+
+    return [graph_sla_json, graph_volumen_json]
@@ -0,0 +1,279 @@
+"""
+Instantáneas mensuales de reportes para meses cerrados.
+
+Un mes ya cerrado no cambia de forma significativa, pero el reporte principal se
+recalculaba contra GLPI en cada consulta. ``python manage.py generar_instantaneas``
+(pensado para cron) calcula una vez por mes cerrado, para todos los técnicos:
+
+- el reporte principal (una fila por técnico),
+- el detalle de tickets reabiertos (agrupado por ticket y técnico),
+- la tendencia SLA mensual (una fila por técnico),
+
+y los guarda en ``InstantaneaMensual``. Un grupo o subgrupo de técnicos es un
+subconjunto de esas filas: las filas de un técnico no dependen de qué otros
+técnicos se consulten, así que se filtran por nombre en lugar de guardar una
+instantánea por grupo.
+
+Cuando un rango abarca meses completos y todos tienen instantánea, se arma con
+ellas sin consultar GLPI:
+
+- reabiertos: se unen los tickets de cada mes con sus fechas máximas, como el
+  GROUP BY por ticket de la consulta en vivo;
+- reporte principal y tendencia SLA (``TIPOS_UN_MES``): solo rangos de un mes, con
+  las filas congeladas tal cual. Sus valores dependen del rango completo (la ventana
+  de 90 días de los cerrados, los pendientes de tickets sin resolver, los tickets
+  reabiertos en varios meses, los abiertos en un mes y resueltos en otro), así que
+  las filas de varios meses no se pueden sumar y esos rangos se calculan en vivo.
+
+La configuración se lee de ``settings.INSTANTANEAS`` (ver ``DEFAULT_INSTANTANEAS_CONFIG``).
+"""
+import calendar
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+
+from .dimensiones import nombres_por_id, EquipoGLPI
+from .models import InstantaneaMensual
+from .periodos import AGRUPACIONES_MENSUALES, etiqueta_periodo
+from .report_cache import ZONA_HORARIA_REPORTES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INSTANTANEAS_CONFIG = {
+    'ACTIVAS': True,     # Servir rangos de meses completos desde las instantáneas
+    'DIAS_GRACIA': 3,    # Días tras el fin de mes antes de considerarlo cerrado
+    'MESES_ATRAS': 24,   # Meses que genera el comando si no se indica --desde
+}
+
+TIPOS_INSTANTANEA = ('reporte_principal', 'reabiertos', 'tendencia_sla')
+
+# Tipos cuyas filas dependen del rango completo: solo se sirven rangos de un mes
+TIPOS_UN_MES = ('reporte_principal', 'tendencia_sla')
+
+
+def _config():
+    return {**DEFAULT_INSTANTANEAS_CONFIG, **getattr(settings, 'INSTANTANEAS', {})}
+
+
+def instantaneas_activas():
+    return bool(_config()['ACTIVAS'])
+
+
+def _a_fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+def _siguiente_mes(mes):
+    return date(mes.year + 1, 1, 1) if mes.month == 12 else date(mes.year, mes.month + 1, 1)
+
+
+def fin_de_mes(mes):
+    return date(mes.year, mes.month, calendar.monthrange(mes.year, mes.month)[1])
+
+
+def meses_del_rango(fecha_ini, fecha_fin):
+    """Primeros días de los meses del rango si abarca meses completos; None si no."""
+    inicio, fin = _a_fecha(fecha_ini), _a_fecha(fecha_fin)
+    if inicio > fin or inicio.day != 1 or fin != fin_de_mes(fin):
+        return None
+    meses = []
+    mes = inicio
+    while mes <= fin:
+        meses.append(mes)
+        mes = _siguiente_mes(mes)
+    return meses
+
+
+def ultimo_mes_cerrado(hoy=None):
+    """Primer día del mes cerrado más reciente (pasados DIAS_GRACIA días desde su fin)."""
+    hoy = hoy or datetime.now(ZONA_HORARIA_REPORTES).date()
+    mes = date(hoy.year, hoy.month, 1)
+    while fin_de_mes(mes) + timedelta(days=_config()['DIAS_GRACIA']) >= hoy:
+        mes = date(mes.year - 1, 12, 1) if mes.month == 1 else date(mes.year, mes.month - 1, 1)
+    return mes
+
+
+# --- Lectura ---
+
+def _meses_servibles(tipo, fecha_ini, fecha_fin):
+    """Meses del rango si el tipo se puede servir con instantáneas para él; None si no."""
+    meses = meses_del_rango(fecha_ini, fecha_fin)
+    if not meses or (tipo in TIPOS_UN_MES and len(meses) > 1):
+        return None
+    return meses
+
+
+def _filas_por_mes(tipo, fecha_ini, fecha_fin):
+    """Filas guardadas de cada mes del rango, o None si el rango no se puede servir con instantáneas."""
+    if not instantaneas_activas():
+        return None
+    meses = _meses_servibles(tipo, fecha_ini, fecha_fin)
+    if not meses:
+        return None
+    guardadas = dict(InstantaneaMensual.objects.filter(tipo=tipo, mes__in=meses).values_list('mes', 'datos'))
+    if len(guardadas) != len(meses):
+        return None
+    return [guardadas[mes] for mes in meses]
+
+
+def cubre_rango(tipo, fecha_ini, fecha_fin):
+    """Indica si el rango se sirve desde instantáneas del tipo indicado (sin leer sus datos)."""
+    if not instantaneas_activas():
+        return False
+    meses = _meses_servibles(tipo, fecha_ini, fecha_fin)
+    return bool(meses) and InstantaneaMensual.objects.filter(tipo=tipo, mes__in=meses).count() == len(meses)
+
+
+def _nombres_tecnicos(tecnicos):
+    """Nombres visibles de los técnicos pedidos (acepta ids enteros o un EquipoGLPI); None = todos."""
+    if not tecnicos:
+        return None
+    if isinstance(tecnicos, EquipoGLPI):
+        mapa = nombres_por_id()
+        return {mapa[i] for i in tecnicos.ids_usuarios() if i in mapa}
+    nombres = {t for t in tecnicos if isinstance(t, str)}
+    ids = [t for t in tecnicos if isinstance(t, int) and not isinstance(t, bool)]
+    if ids:
+        mapa = nombres_por_id()
+        nombres.update(mapa[i] for i in ids if i in mapa)
+    return nombres
+
+
+def _decimal(valor):
+    """Los Decimal se guardan como texto en JSON; se restauran para mantener los tipos del cálculo en vivo."""
+    if isinstance(valor, str):
+        try:
+            return Decimal(valor)
+        except InvalidOperation:
+            return valor
+    return valor
+
+
+def reporte_principal_instantaneas(fecha_ini, fecha_fin, tecnicos=None):
+    """
+    Reporte principal de un mes cerrado con instantánea (lista de dicts), o None si
+    el rango no es un único mes completo o no tiene instantánea.
+    """
+    meses = _filas_por_mes('reporte_principal', fecha_ini, fecha_fin)
+    if meses is None:
+        return None
+    # Importación diferida: services importa este módulo
+    from .services import COLUMNAS_REPORTE_PRINCIPAL
+
+    nombres = _nombres_tecnicos(tecnicos)
+    return [
+        {columna: fila[columna] if columna == 'Tecnico_Asignado' else _decimal(fila[columna])
+         for columna in COLUMNAS_REPORTE_PRINCIPAL}
+        for fila in meses[0] if nombres is None or fila['Tecnico_Asignado'] in nombres
+    ]
+
+
+def reabiertos_instantaneas(tecnico, fecha_ini, fecha_fin):
+    """Detalle de tickets reabiertos de un técnico (o EquipoGLPI) armado con instantáneas, o None si el rango no está cubierto."""
+    meses = _filas_por_mes('reabiertos', fecha_ini, fecha_fin)
+    if meses is None:
+        return None
+    nombres = _nombres_tecnicos(tecnico if isinstance(tecnico, EquipoGLPI) else [tecnico]) or set()
+    tickets = {}
+    for filas in meses:
+        for fila in filas:
+            if fila['Tecnico_Asignado'] not in nombres:
+                continue
+            # Como el GROUP BY por ticket de la consulta en vivo: una fila por ticket con las fechas máximas
+            previa = tickets.get(fila['Nro_Ticket'])
+            if previa is None:
+                tickets[fila['Nro_Ticket']] = dict(fila)
+            else:
+                for campo in ('Fecha_Reapertura', 'Fecha_Apertura'):
+                    previa[campo] = max(filter(None, (previa[campo], fila[campo])), default=None)
+    return [tickets[nro] for nro in sorted(tickets)]
+
+
+def tendencia_sla_instantaneas(fecha_ini, fecha_fin, tecnicos, agrupacion='mes'):
+    """
+    Filas de la tendencia SLA de un mes cerrado armadas con su instantánea, o None
+    si no se pueden usar (ver ``TIPOS_UN_MES``). Con 'trimestre' o 'año' el mes se
+    etiqueta con su periodo.
+    """
+    if agrupacion not in AGRUPACIONES_MENSUALES:
+        return None
+    meses = _filas_por_mes('tendencia_sla', fecha_ini, fecha_fin)
+    if meses is None:
+        return None
+    nombres = _nombres_tecnicos(tecnicos)
+    return [
+        {
+            clave: (etiqueta_periodo(valor, agrupacion) if clave == 'periodo'
+                    else valor if clave == 'tecnico' else _decimal(valor))
+            for clave, valor in fila.items()
+        }
+        for filas in meses for fila in filas
+        if nombres is None or fila['tecnico'] in nombres
+    ]
+
+
+def cubre_tendencia_sla(fecha_ini, fecha_fin, agrupacion):
+    """True si la tendencia SLA del rango se puede servir desde instantáneas."""
+    return agrupacion in AGRUPACIONES_MENSUALES and cubre_rango('tendencia_sla', fecha_ini, fecha_fin)
+
+
+# --- Generación ---
+
+def generar_mes(mes):
+    """Calcula contra GLPI y guarda las instantáneas de un mes (las reemplaza si existen)."""
+    # Importación diferida: services importa este módulo
+    from .services import (ReportGenerator, ejecutar_consultas, COLUMNAS_REPORTE_PRINCIPAL,
+                           COLUMNAS_TICKETS_REABIERTOS, COLUMNAS_TENDENCIA_SLA)
+
+    fecha_ini, fecha_fin = mes, fin_de_mes(mes)
+    consultas = {
+        'reporte_principal': ReportGenerator.consulta_reporte_principal(fecha_ini, fecha_fin, None),
+        'reabiertos': ReportGenerator.consulta_detalle_reabiertos(None, fecha_ini, fecha_fin, por_tecnico=True),
+        'tendencia_sla': ReportGenerator.consulta_tendencia_sla(fecha_ini, fecha_fin, None, 'mes'),
+    }
+    columnas = {
+        'reporte_principal': COLUMNAS_REPORTE_PRINCIPAL,
+        'reabiertos': COLUMNAS_TICKETS_REABIERTOS,
+        'tendencia_sla': COLUMNAS_TENDENCIA_SLA,
+    }
+    resultados = ejecutar_consultas(consultas, dictionary=False)
+    with transaction.atomic():
+        for tipo, filas in resultados.items():
+            InstantaneaMensual.objects.update_or_create(
+                mes=mes, tipo=tipo,
+                defaults={'datos': [dict(zip(columnas[tipo], fila)) for fila in filas]},
+            )
+    conteos = {tipo: len(filas) for tipo, filas in resultados.items()}
+    logger.info(f"Instantáneas de {mes:%Y-%m} generadas: {conteos}")
+    return conteos
+
+
+def meses_pendientes(desde=None, hasta=None, regenerar=False):
+    """Meses cerrados entre ``desde`` y ``hasta`` a los que les falta alguna instantánea (o todos con ``regenerar``)."""
+    ultimo = ultimo_mes_cerrado()
+    hasta = min(date(hasta.year, hasta.month, 1), ultimo) if hasta else ultimo
+    if desde:
+        mes = date(desde.year, desde.month, 1)
+    else:
+        mes = hasta
+        for _ in range(_config()['MESES_ATRAS'] - 1):
+            mes = date(mes.year - 1, 12, 1) if mes.month == 1 else date(mes.year, mes.month - 1, 1)
+
+    meses = []
+    while mes <= hasta:
+        meses.append(mes)
+        mes = _siguiente_mes(mes)
+    if regenerar:
+        return meses
+
+    completos = {}
+    for mes_guardado, tipo in InstantaneaMensual.objects.filter(mes__in=meses).values_list('mes', 'tipo'):
+        completos.setdefault(mes_guardado, set()).add(tipo)
+    return [m for m in meses if completos.get(m, set()) != set(TIPOS_INSTANTANEA)]
@@ -0,0 +1,325 @@
+"""
+Instrumentación por petición del acceso a GLPI.
+
+GLPI se consulta con cursores de ``mysql.connector`` (no con el ORM), así que el
+registro de consultas y las herramientas de depuración de Django no los ven. Este
+módulo lo suple:
+
+- ``glpi_db.glpi_connection()`` entrega una ``ConexionInstrumentada`` cuyos
+  cursores (``CursorInstrumentado``) miden cada sentencia: nombre, duración
+  (ejecución más lectura), filas devueltas y bytes leídos (aproximados).
+- ``etapa(nombre)`` suma a la petición el tiempo de otras etapas: ``dataframe``
+  (numpy/pandas), ``graficas`` (plotly) y ``serializacion`` (``JsonResponseMedido``).
+- ``MiddlewareInstrumentacion`` abre un registro por petición y responde con la
+  cabecera ``Server-Timing`` (db, dataframe, graficas, serializacion, total), que
+  las herramientas de desarrollo del navegador muestran en la pestaña de red.
+- Las sentencias que superan ``UMBRAL_CONSULTA_LENTA_MS`` se escriben en el logger
+  ``metricas.consultas_lentas`` (archivo ``consultas_lentas.log``), con la ruta de
+  la petición y el SQL sin parámetros.
+
+El registro viaja en una ``ContextVar``: las consultas en hilos
+(``services.ejecutar_consultas``) se ejecutan con una copia del contexto y suman
+al mismo registro; el tiempo ``db`` es la suma de las sentencias, no el tiempo real.
+Fuera de una petición (comandos, cola de trabajos) no hay registro, pero el log de
+consultas lentas sigue activo. Configuración en ``settings.INSTRUMENTACION``.
+"""
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+logger_lentas = logging.getLogger('metricas.consultas_lentas')
+
+DEFAULT_INSTRUMENTACION_CONFIG = {
+    'ACTIVA': True,
+    'SERVER_TIMING': True,             # Cabecera Server-Timing en las respuestas
+    'UMBRAL_CONSULTA_LENTA_MS': 1000,  # Sentencias más lentas van a consultas_lentas.log (None = nunca)
+    'CONTAR_BYTES': True,              # Estimar los bytes leídos recorriendo los valores de cada fila
+    'MAX_SQL_LOG': 4000,               # Caracteres de SQL que se escriben por sentencia lenta
+}
+
+# Etapas de la cabecera Server-Timing, en orden
+ETAPAS = ('db', 'dataframe', 'graficas', 'serializacion')
+
+_registro_actual = ContextVar('registro_instrumentacion', default=None)
+_nombre_sentencia = ContextVar('nombre_sentencia', default=None)
+
+
+def _config():
+    return {**DEFAULT_INSTRUMENTACION_CONFIG, **getattr(settings, 'INSTRUMENTACION', {})}
+
+
+def instrumentacion_activa():
+    return bool(_config()['ACTIVA'])
+
+
+class RegistroPeticion:
+    """Sentencias y tiempos por etapa de una petición. Thread-safe (consultas en hilos)."""
+
+    def __init__(self, ruta=''):
+        self.ruta = ruta
+        self.sentencias = []
+        self.etapas = dict.fromkeys(ETAPAS, 0.0)
+        self.inicio = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def agregar_sentencia(self, sentencia):
+        with self._lock:
+            self.sentencias.append(sentencia)
+
+    def sumar(self, etapa_nombre, segundos):
+        with self._lock:
+            self.etapas[etapa_nombre] = self.etapas.get(etapa_nombre, 0.0) + segundos
+
+    def resumen(self):
+        """Totales de la petición: tiempos por etapa (ms), sentencias, filas y bytes."""
+        with self._lock:
+            sentencias = list(self.sentencias)
+            etapas = dict(self.etapas)
+        etapas['db'] = sum(s.segundos for s in sentencias)
+        return {
+            'ms': {nombre: segundos * 1000 for nombre, segundos in etapas.items()},
+            'total_ms': (time.perf_counter() - self.inicio) * 1000,
+            'sentencias': len(sentencias),
+            'filas': sum(s.filas for s in sentencias),
+            'bytes': sum(s.bytes for s in sentencias),
+            'errores': sum(s.error for s in sentencias),
+        }
+
+
+def registro_actual():
+    """Registro de la petición en curso, o None fuera de una petición."""
+    return _registro_actual.get()
+
+
+@contextmanager
+def registrar(ruta=''):
+    """Abre un ``RegistroPeticion`` para el bloque (una petición, o una medición de benchmark_reportes)."""
+    registro = RegistroPeticion(ruta)
+    token = _registro_actual.set(registro)
+    try:
+        yield registro
+    finally:
+        _registro_actual.reset(token)
+
+
+@contextmanager
+def etapa(nombre):
+    """Suma el tiempo del bloque a la etapa ``nombre`` de la petición en curso."""
+    registro = _registro_actual.get()
+    if registro is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro.sumar(nombre, time.perf_counter() - inicio)
+
+
+@contextmanager
+def sentencia(nombre):
+    """Nombre con el que se registran las sentencias ejecutadas dentro del bloque."""
+    token = _nombre_sentencia.set(nombre)
+    try:
+        yield
+    finally:
+        _nombre_sentencia.reset(token)
+
+
+_TABLA_SQL = re.compile(r'\bFROM\s+`?(\w+)', re.IGNORECASE)
+
+
+def _nombre_por_sql(query):
+    """Nombre por defecto: la primera tabla del FROM (p. ej. 'glpi_tickets')."""
+    coincidencia = _TABLA_SQL.search(query or '')
+    return coincidencia.group(1) if coincidencia else 'sql'
+
+
+def _bytes_fila(fila):
+    valores = fila.values() if isinstance(fila, dict) else fila
+    total = 0
+    for valor in valores:
+        if isinstance(valor, (str, bytes, bytearray)):
+            total += len(valor)
+        elif valor is not None:
+            total += 8
+    return total
+
+
+class Sentencia:
+    """Medición de una sentencia: se completa al leer sus filas y se cierra al terminar."""
+
+    __slots__ = ('nombre', 'query', 'segundos', 'filas', 'bytes', 'error', 'cerrada')
+
+    def __init__(self, nombre, query):
+        self.nombre = nombre
+        self.query = query
+        self.segundos = 0.0
+        self.filas = 0
+        self.bytes = 0
+        self.error = False
+        self.cerrada = False
+
+    def cerrar(self, ruta=None):
+        if self.cerrada:
+            return
+        self.cerrada = True
+        umbral = _config()['UMBRAL_CONSULTA_LENTA_MS']
+        if umbral is not None and self.segundos * 1000 >= umbral:
+            sql = ' '.join((self.query or '').split())[:_config()['MAX_SQL_LOG']]
+            logger_lentas.warning(
+                f"{self.segundos * 1000:.0f} ms | {self.nombre} | {self.filas} filas | {self.bytes} bytes | "
+                f"{ruta or '-'} | {sql}"
+            )
+
+
+class CursorInstrumentado:
+    """Envoltura de un cursor de mysql.connector que mide cada sentencia."""
+
+    def __init__(self, cursor, contar_bytes=True):
+        self._cursor = cursor
+        self._contar_bytes = contar_bytes
+        self._actual = None
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __iter__(self):
+        while True:
+            fila = self.fetchone()
+            if fila is None:
+                return
+            yield fila
+
+    def _cerrar_actual(self):
+        if self._actual is not None:
+            registro = _registro_actual.get()
+            self._actual.cerrar(registro.ruta if registro is not None else None)
+
+    def _medir(self, funcion, *args):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args)
+        finally:
+            if self._actual is not None:
+                self._actual.segundos += time.perf_counter() - inicio
+
+    def _contar(self, filas):
+        if self._actual is not None and filas:
+            self._actual.filas += len(filas)
+            if self._contar_bytes:
+                self._actual.bytes += sum(_bytes_fila(fila) for fila in filas)
+
+    def execute(self, query, params=(), *args, **kwargs):
+        self._cerrar_actual()
+        self._actual = Sentencia(_nombre_sentencia.get() or _nombre_por_sql(query), query)
+        registro = _registro_actual.get()
+        if registro is not None:
+            registro.agregar_sentencia(self._actual)
+        try:
+            return self._medir(lambda: self._cursor.execute(query, params, *args, **kwargs))
+        except Exception:
+            self._actual.error = True
+            raise
+
+    def fetchall(self):
+        filas = self._medir(self._cursor.fetchall)
+        self._contar(filas)
+        self._cerrar_actual()
+        return filas
+
+    def fetchmany(self, *args, **kwargs):
+        filas = self._medir(lambda: self._cursor.fetchmany(*args, **kwargs))
+        self._contar(filas)
+        return filas
+
+    def fetchone(self):
+        fila = self._medir(self._cursor.fetchone)
+        if fila is not None:
+            self._contar([fila])
+        return fila
+
+    def close(self):
+        self._cerrar_actual()
+        return self._cursor.close()
+
+
+class ConexionInstrumentada:
+    """Envoltura de una conexión GLPI cuyos cursores son ``CursorInstrumentado``."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._contar_bytes = bool(_config()['CONTAR_BYTES'])
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+    def cursor(self, *args, **kwargs):
+        return CursorInstrumentado(self._conn.cursor(*args, **kwargs), self._contar_bytes)
+
+
+def instrumentar_conexion(conn):
+    """Conexión envuelta si la instrumentación está activa; si no, la misma conexión."""
+    return ConexionInstrumentada(conn) if instrumentacion_activa() else conn
+
+
+class JsonResponseMedido(JsonResponse):
+    """``JsonResponse`` que suma el tiempo de serialización a la etapa 'serializacion'."""
+
+    def __init__(self, *args, **kwargs):
+        with etapa('serializacion'):
+            super().__init__(*args, **kwargs)
+
+
+def cabecera_server_timing(resumen):
+    """Valor de la cabecera Server-Timing a partir de ``RegistroPeticion.resumen()``."""
+    partes = [
+        f'db;dur={resumen["ms"]["db"]:.1f};desc="GLPI {resumen["sentencias"]} consultas, {resumen["filas"]} filas"'
+    ]
+    for nombre in ETAPAS[1:]:
+        if resumen['ms'].get(nombre):
+            partes.append(f'{nombre};dur={resumen["ms"][nombre]:.1f}')
+    partes.append(f'total;dur={resumen["total_ms"]:.1f}')
+    return ', '.join(partes)
+
+
+class MiddlewareInstrumentacion:
+    """
+    Abre un ``RegistroPeticion`` por petición y añade la cabecera Server-Timing.
+    En respuestas en streaming el tiempo de lectura posterior a la cabecera no se incluye.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Histogramas y contadores de /metrics/ (telemetria importa glpi_db, que importa este módulo)
+        from .telemetria import observar_peticion
+        self.observar_peticion = observar_peticion
+
+    def __call__(self, request):
+        if not instrumentacion_activa():
+            return self.get_response(request)
+        with registrar(request.path) as registro:
+            respuesta = self.get_response(request)
+
+        resumen = registro.resumen()
+        request.instrumentacion = resumen
+        if _config()['SERVER_TIMING']:
+            respuesta['Server-Timing'] = cabecera_server_timing(resumen)
+        try:
+            self.observar_peticion(request, respuesta, resumen)
+        except Exception as e:
+            logger.warning(f"No se registraron las métricas de {request.path}: {e}")
+        if resumen['sentencias']:
+            logger.debug(
+                f"{request.method} {request.path}: {resumen['total_ms']:.0f} ms, "
+                f"{resumen['sentencias']} consultas GLPI ({resumen['ms']['db']:.0f} ms, "
+                f"{resumen['filas']} filas, {resumen['bytes']} bytes)"
+            )
+        return respuesta
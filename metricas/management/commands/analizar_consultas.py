@@ -0,0 +1,293 @@
+import json
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from metricas.dimensiones import (
+    resolver_ids_tecnicos, CONSULTA_DIRECTORIO_USUARIOS, CONSULTA_JERARQUIA_ENTIDADES,
+    CONSULTA_JERARQUIA_GRUPOS, CONSULTA_JERARQUIA_MIEMBROS, PERFIL_TECNICO,
+)
+from metricas.glpi_db import glpi_connection
+from metricas.periodos import AGRUPACIONES_TENDENCIA
+from metricas.services import ReportGenerator, MOTORES_REPORTE, rango_utc
+
+# Índices propuestos para las consultas de reportes: (tabla, nombre, columnas).
+# Las columnas finales hacen que el índice sea de cobertura (InnoDB añade el id).
+INDICES_PROPUESTOS = [
+    ('glpi_tickets', 'idx_reportes_date',
+     ['date', 'is_deleted', 'status', 'entities_id', 'solvedate', 'time_to_resolve']),
+    ('glpi_tickets', 'idx_reportes_solvedate',
+     ['solvedate', 'is_deleted', 'status', 'time_to_resolve', 'date']),
+    ('glpi_tickets_users', 'idx_reportes_type_users_tickets',
+     ['type', 'users_id', 'tickets_id']),
+    ('glpi_itilsolutions', 'idx_reportes_status_approval',
+     ['status', 'date_approval', 'users_id', 'users_id_approval', 'items_id']),
+]
+
+# Predicado de rango de fechas antes y después de rango_utc(): (nombre, consulta, columna).
+# 'antes' convierte en MySQL (y en date_approval envuelve la columna, sin índice);
+# 'despues' compara la columna cruda con los límites UTC calculados en Python.
+PREDICADOS_FECHA = [
+    ('glpi_tickets.date', "SELECT COUNT(*) FROM glpi_tickets gt WHERE gt.is_deleted = 0 AND {predicado}", 'gt.date'),
+    ('glpi_tickets.solvedate', "SELECT COUNT(*) FROM glpi_tickets gt WHERE gt.is_deleted = 0 AND {predicado}",
+     'gt.solvedate'),
+    ('glpi_itilsolutions.date_approval',
+     "SELECT COUNT(DISTINCT gi.items_id) FROM glpi_itilsolutions gi "
+     "WHERE gi.status = 4 AND gi.users_id_approval > 0 AND {predicado}", 'gi.date_approval'),
+]
+PREDICADO_ANTES = "{columna} BETWEEN CONVERT_TZ(%s, 'America/Caracas', 'UTC') AND CONVERT_TZ(%s, 'America/Caracas', 'UTC')"
+PREDICADO_ANTES_COLUMNA = "CONVERT_TZ({columna}, 'UTC', 'America/Caracas') BETWEEN %s AND %s"
+PREDICADO_DESPUES = "{columna} >= %s AND {columna} < %s"
+
+
+def _consultas_predicado_fecha(fecha_ini, fecha_fin):
+    """(nombre, query, params) de cada predicado de fecha en su forma anterior y actual."""
+    consultas = []
+    for nombre, plantilla, columna in PREDICADOS_FECHA:
+        antes = PREDICADO_ANTES_COLUMNA if columna == 'gi.date_approval' else PREDICADO_ANTES
+        consultas.append((f'predicado_fecha[{nombre},antes]',
+                          plantilla.format(predicado=antes.format(columna=columna)),
+                          (f'{fecha_ini} 00:00:00', f'{fecha_fin} 23:59:59')))
+        consultas.append((f'predicado_fecha[{nombre},despues]',
+                          plantilla.format(predicado=PREDICADO_DESPUES.format(columna=columna)),
+                          rango_utc(fecha_ini, fecha_fin)))
+    return consultas
+
+
+# Tipos de acceso que recorren la tabla o el índice completo
+ACCESOS_COMPLETOS = ('ALL', 'index')
+
+
+def _resumir_plan(filas):
+    """Métricas comparables de un EXPLAIN tabular (MySQL o MariaDB)."""
+    accesos = []
+    filas_examinadas = 0
+    escaneos = temporales = filesorts = 0
+    for fila in filas:
+        tipo = fila.get('type') or ''
+        extra = fila.get('Extra') or ''
+        accesos.append(f"{fila.get('table')}:{tipo}:{fila.get('key') or '-'}")
+        filas_examinadas += int(fila.get('rows') or 0)
+        if tipo in ACCESOS_COMPLETOS:
+            escaneos += 1
+        if 'Using temporary' in extra:
+            temporales += 1
+        if 'Using filesort' in extra:
+            filesorts += 1
+    return {
+        'accesos': accesos,
+        'filas_examinadas': filas_examinadas,
+        'escaneos_completos': escaneos,
+        'temporales': temporales,
+        'filesorts': filesorts,
+    }
+
+
+def _regresiones(actual, base, tolerancia):
+    """Motivos por los que el plan actual es peor que el de la línea base."""
+    motivos = []
+    for clave in ('escaneos_completos', 'temporales', 'filesorts'):
+        if actual[clave] > base[clave]:
+            motivos.append(f"{clave}: {base[clave]} -> {actual[clave]}")
+    limite = base['filas_examinadas'] * (1 + tolerancia)
+    if actual['filas_examinadas'] > limite and actual['filas_examinadas'] - base['filas_examinadas'] > 100:
+        motivos.append(f"filas_examinadas: {base['filas_examinadas']} -> {actual['filas_examinadas']}")
+    completos_base = {a for a in base['accesos'] if a.split(':')[1] in ACCESOS_COMPLETOS}
+    for acceso in actual['accesos']:
+        if acceso.split(':')[1] in ACCESOS_COMPLETOS and acceso not in completos_base:
+            motivos.append(f"nuevo recorrido completo: {acceso}")
+    return motivos
+
+
+def _cubre(columnas_indice, propuestas):
+    """Un índice existente sirve si empieza por todas las columnas propuestas."""
+    return columnas_indice[:len(propuestas)] == propuestas
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN (y opcionalmente EXPLAIN ANALYZE) sobre todas las consultas de "
+        "reportes (ReportGenerator, cargas del directorio y de la jerarquía de grupos y tendencia SLA), "
+        "informa filas examinadas, recorridos completos, tablas temporales y filesort, "
+        "propone índices de cobertura y compara contra una línea base guardada. Incluye los "
+        "predicados de fecha con CONVERT_TZ anteriores a rango_utc() junto a los actuales "
+        "(--consulta predicado_fecha), p. ej. sobre una base de generar_glpi_sintetico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha-ini', required=True, help='Fecha inicial (YYYY-MM-DD).')
+        parser.add_argument('--fecha-fin', required=True, help='Fecha final (YYYY-MM-DD).')
+        parser.add_argument('--tecnico', help='Técnico para las consultas por técnico. Por defecto: el primero de la lista.')
+        parser.add_argument('--consulta', action='append', dest='consultas',
+                            help='Analizar solo las consultas cuyo nombre contenga este texto (repetible).')
+        parser.add_argument('--analyze', action='store_true',
+                            help='Ejecuta además EXPLAIN ANALYZE (MySQL 8.0.18+; ejecuta la consulta real).')
+        parser.add_argument('--baseline', default=str(Path(settings.BASE_DIR) / 'explain_baseline.json'),
+                            help='Archivo JSON de la línea base de planes.')
+        parser.add_argument('--guardar-baseline', action='store_true',
+                            help='Guarda los planes actuales como nueva línea base.')
+        parser.add_argument('--tolerancia', type=float, default=0.5,
+                            help='Aumento relativo de filas examinadas tolerado frente a la línea base (0.5 = 50%%).')
+
+    # --- Catálogo de consultas ---
+
+    def _catalogo(self, cursor, options):
+        """Lista de (nombre, query, params) con los mismos constructores que usa la aplicación."""
+        fecha_ini, fecha_fin = options['fecha_ini'], options['fecha_fin']
+        tecnico = options['tecnico'] or next(iter(ReportGenerator.obtener_tecnicos()), None)
+        ids_tecnico = resolver_ids_tecnicos([tecnico]) if tecnico else []
+
+        catalogo = []
+        for motor in MOTORES_REPORTE:
+            catalogo.append((f'reporte_principal[{motor}]',
+                             *ReportGenerator.consulta_reporte_principal(fecha_ini, fecha_fin, None, motor=motor)))
+            if tecnico:
+                catalogo.append((f'reporte_principal[{motor},tecnico]',
+                                 *ReportGenerator.consulta_reporte_principal(fecha_ini, fecha_fin, [tecnico], motor=motor)))
+        if tecnico:
+            catalogo.append(('tickets_reabiertos',
+                             *ReportGenerator.consulta_tickets_reabiertos(tecnico, fecha_ini, fecha_fin)))
+            for nombre, (query, params) in ReportGenerator.consultas_tendencia_tecnico(
+                    ids_tecnico, fecha_ini, fecha_fin).items():
+                catalogo.append((f'tendencia_tecnico[{nombre}]', query, params))
+            for nombre, (query, params) in ReportGenerator.consultas_tendencia_tecnico(
+                    ids_tecnico, fecha_ini, fecha_fin, por_tecnico=True).items():
+                catalogo.append((f'tendencia_tecnicos[{nombre}]', query, params))
+            for agrupacion in AGRUPACIONES_TENDENCIA:
+                catalogo.append((f'tendencia_sla[{agrupacion}]',
+                                 *ReportGenerator.consulta_tendencia_sla(fecha_ini, fecha_fin, ids_tecnico, agrupacion)))
+        catalogo += [
+            ('directorio_usuarios', CONSULTA_DIRECTORIO_USUARIOS, ()),
+            ('jerarquia[entidades]', CONSULTA_JERARQUIA_ENTIDADES, ()),
+            ('jerarquia[grupos]', CONSULTA_JERARQUIA_GRUPOS, ()),
+            ('jerarquia[miembros]', CONSULTA_JERARQUIA_MIEMBROS, (PERFIL_TECNICO,)),
+        ]
+        catalogo += _consultas_predicado_fecha(fecha_ini, fecha_fin)
+        if options['consultas']:
+            catalogo = [c for c in catalogo if any(texto in c[0] for texto in options['consultas'])]
+        return catalogo
+
+    # --- EXPLAIN ---
+
+    @staticmethod
+    def _sin_punto_y_coma(query):
+        return query.strip().rstrip(';')
+
+    def _explain(self, conn, query, params):
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"EXPLAIN {self._sin_punto_y_coma(query)}", params)
+        filas = cursor.fetchall()
+        cursor.close()
+        return filas
+
+    def _explain_analyze(self, conn, query, params):
+        cursor = conn.cursor()
+        cursor.execute(f"EXPLAIN ANALYZE {self._sin_punto_y_coma(query)}", params)
+        arbol = '\n'.join(str(fila[0]) for fila in cursor.fetchall())
+        cursor.close()
+        return arbol
+
+    # --- Índices ---
+
+    def _indices_existentes(self, conn, tabla):
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"SHOW INDEX FROM `{tabla}`")
+        indices = {}
+        for fila in cursor.fetchall():
+            indices.setdefault(fila['Key_name'], []).append((fila['Seq_in_index'], fila['Column_name']))
+        cursor.close()
+        return {nombre: [c for _, c in sorted(cols)] for nombre, cols in indices.items()}
+
+    def _informe_indices(self, conn):
+        self.stdout.write(self.style.MIGRATE_HEADING("Índices propuestos"))
+        for tabla, nombre, columnas in INDICES_PROPUESTOS:
+            existentes = self._indices_existentes(conn, tabla)
+            cubierto = [n for n, cols in existentes.items() if _cubre(cols, columnas)]
+            if cubierto:
+                self.stdout.write(f"  {tabla}({', '.join(columnas)}): ya cubierto por {', '.join(cubierto)}")
+            else:
+                columnas_sql = ', '.join(f'`{c}`' for c in columnas)
+                self.stdout.write(
+                    f"  ALTER TABLE `{tabla}` ADD INDEX `{nombre}` ({columnas_sql}), ALGORITHM=INPLACE, LOCK=NONE;"
+                )
+
+    # --- Predicados de fecha ---
+
+    def _informe_predicados(self, resultados):
+        """Planes del predicado de fecha anterior (CONVERT_TZ) frente al de rango_utc(), lado a lado."""
+        pares = [(nombre, resultados.get(f'predicado_fecha[{nombre},antes]'),
+                  resultados.get(f'predicado_fecha[{nombre},despues]')) for nombre, _, _ in PREDICADOS_FECHA]
+        pares = [par for par in pares if par[1] and par[2]]
+        if not pares:
+            return
+        self.stdout.write(self.style.MIGRATE_HEADING("Predicados de fecha: CONVERT_TZ (antes) / rango_utc (después)"))
+        for nombre, antes, despues in pares:
+            self.stdout.write(
+                f"  {nombre}: filas examinadas {antes['filas_examinadas']} -> {despues['filas_examinadas']}, "
+                f"recorridos completos {antes['escaneos_completos']} -> {despues['escaneos_completos']}"
+            )
+            self.stdout.write(f"    {', '.join(antes['accesos'])} -> {', '.join(despues['accesos'])}")
+
+    # --- Ejecución ---
+
+    def handle(self, *args, **options):
+        resultados = {}
+        with glpi_connection() as conn:
+            cursor = conn.cursor()
+            catalogo = self._catalogo(cursor, options)
+            cursor.close()
+            if not catalogo:
+                raise CommandError("Ninguna consulta coincide con --consulta.")
+
+            for nombre, query, params in catalogo:
+                resumen = _resumir_plan(self._explain(conn, query, params))
+                resultados[nombre] = resumen
+                self.stdout.write(self.style.MIGRATE_HEADING(nombre))
+                self.stdout.write(
+                    f"  filas examinadas (estimadas): {resumen['filas_examinadas']}  "
+                    f"recorridos completos: {resumen['escaneos_completos']}  "
+                    f"temporales: {resumen['temporales']}  filesort: {resumen['filesorts']}"
+                )
+                for acceso in resumen['accesos']:
+                    self.stdout.write(f"    {acceso}")
+                if options['analyze']:
+                    try:
+                        arbol = self._explain_analyze(conn, query, params)
+                    except Exception as e:
+                        self.stderr.write(f"  EXPLAIN ANALYZE no disponible: {e}")
+                        options['analyze'] = False
+                    else:
+                        tiempos = re.findall(r'actual time=[\d.]+\.\.([\d.]+)', arbol)
+                        if tiempos:
+                            self.stdout.write(f"  tiempo real: {tiempos[0]} ms")
+                        self.stdout.write('\n'.join(f"    {linea}" for linea in arbol.splitlines()))
+
+            self._informe_predicados(resultados)
+            self._informe_indices(conn)
+
+        ruta = Path(options['baseline'])
+        if options['guardar_baseline']:
+            ruta.write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {ruta} ({len(resultados)} consultas)."))
+            return
+
+        if not ruta.exists():
+            self.stdout.write("Sin línea base: use --guardar-baseline para crearla.")
+            return
+
+        base = json.loads(ruta.read_text())
+        regresiones = {}
+        for nombre, resumen in resultados.items():
+            if nombre in base:
+                motivos = _regresiones(resumen, base[nombre], options['tolerancia'])
+                if motivos:
+                    regresiones[nombre] = motivos
+        if regresiones:
+            for nombre, motivos in regresiones.items():
+                self.stderr.write(f"- {nombre}:")
+                for motivo in motivos:
+                    self.stderr.write(f"    {motivo}")
+            raise CommandError(f"Planes con regresión frente a {ruta}: {len(regresiones)} consulta(s).")
+        self.stdout.write(self.style.SUCCESS(f"Sin regresiones frente a la línea base ({ruta})."))
@@ -0,0 +1,219 @@
+import json
+import platform
+import statistics
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from metricas.dimensiones import (PERFIL_TECNICO, directorio_usuarios, entidades_elegibles, ids_entidades_elegibles,
+                                  jerarquia_grupos, obtener_jerarquia, tecnicos_con_perfil)
+from metricas.glpi_db import glpi_connection, reiniciar_pool
+from metricas.instrumentacion import registrar
+from metricas.periodos import AGRUPACIONES_TENDENCIA
+from metricas.services import ReportGenerator, MOTORES_REPORTE
+
+RUTAS = ('reporte_principal', 'reabiertos', 'tendencia_tecnico', 'tendencia_tecnicos', 'tendencia_sla')
+
+CONSULTA_TAMANO = f"""
+    SELECT (SELECT COUNT(*) FROM glpi_tickets),
+           (SELECT COUNT(*) FROM glpi_tickets_users),
+           (SELECT COUNT(*) FROM glpi_itilsolutions),
+           (SELECT COUNT(DISTINCT users_id) FROM glpi_profiles_users WHERE profiles_id = {PERFIL_TECNICO}),
+           (SELECT MIN(`date`) FROM glpi_tickets),
+           (SELECT MAX(`date`) FROM glpi_tickets)
+"""
+
+# Técnicos con más tickets asignados: los de la muestra de las rutas por técnico
+CONSULTA_TECNICOS_MUESTRA = """
+    SELECT users_id FROM glpi_tickets_users WHERE type = 2
+    GROUP BY users_id ORDER BY COUNT(*) DESC LIMIT %s
+"""
+
+
+def _filas(resultado):
+    """Filas del resultado de una ruta (lista, DataFrame o series por técnico)."""
+    if resultado is None:
+        return 0
+    if isinstance(resultado, dict):
+        return len(resultado.get('tecnicos', ()))
+    return len(resultado)
+
+
+def _consultar(query, params=()):
+    with glpi_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        filas = cursor.fetchall()
+        cursor.close()
+    return filas
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cada ruta de reporte (reporte principal por motor, tickets reabiertos, "
+        "tendencia de un técnico, tendencia de varios técnicos y tendencia SLA) sobre "
+        "una o varias bases GLPI (p. ej. las creadas con generar_glpi_sintetico con "
+        "distintos tamaños) y varios rangos de fechas, sin caché ni instantáneas, y "
+        "escribe los resultados en JSON comparables entre ejecuciones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base', action='append', dest='bases', required=True,
+                            help='Base de datos a medir (repetible), en el servidor de DATABASES["glpi"] o --host.')
+        parser.add_argument('--host', help='Servidor MySQL (por defecto el de DATABASES["glpi"]).')
+        parser.add_argument('--port', type=int)
+        parser.add_argument('--usuario')
+        parser.add_argument('--password')
+        parser.add_argument('--rango-dias', type=int, action='append', dest='rangos',
+                            help='Días del rango, terminando en --fecha-fin (repetible; por defecto 7, 31, 92 y 365).')
+        parser.add_argument('--fecha-fin', help='Fin de los rangos (por defecto el día del último ticket de cada base).')
+        parser.add_argument('--ruta', action='append', dest='rutas', choices=RUTAS, help='Ruta a medir (repetible; por defecto todas).')
+        parser.add_argument('--motor', action='append', dest='motores', choices=MOTORES_REPORTE,
+                            help='Motor del reporte principal (repetible; por defecto todos).')
+        parser.add_argument('--agrupacion', choices=AGRUPACIONES_TENDENCIA, default='mes',
+                            help='Agrupación de la tendencia SLA (por defecto mes).')
+        parser.add_argument('--tecnicos-muestra', type=int, default=10,
+                            help='Técnicos de la tendencia de varios técnicos (por defecto 10).')
+        parser.add_argument('--repeticiones', type=int, default=3, help='Mediciones por ruta y rango (por defecto 3).')
+        parser.add_argument('--calentamiento', type=int, default=1, help='Ejecuciones previas sin medir (por defecto 1).')
+        parser.add_argument('--salida', help='Archivo JSON (por defecto benchmark_reportes_<fecha>.json).')
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1 or options['tecnicos_muestra'] < 1:
+            raise CommandError("--repeticiones y --tecnicos-muestra deben ser mayores o iguales a 1.")
+        rangos = sorted(set(options['rangos'] or [7, 31, 92, 365]))
+        if rangos[0] < 1:
+            raise CommandError("--rango-dias debe ser mayor o igual a 1.")
+        options['rangos'] = rangos
+        options['rutas'] = options['rutas'] or list(RUTAS)
+        options['motores'] = options['motores'] or list(MOTORES_REPORTE)
+
+        glpi_original = dict(settings.DATABASES['glpi'])
+        conexion = {clave: options[opcion] for clave, opcion in
+                    (('HOST', 'host'), ('PORT', 'port'), ('USER', 'usuario'), ('PASSWORD', 'password'))
+                    if options[opcion] is not None}
+        resultado = {
+            'generado': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'configuracion': {
+                'REPORT_CONCURRENCY': getattr(settings, 'REPORT_CONCURRENCY', None),
+                'GLPI_POOL': getattr(settings, 'GLPI_POOL', {}),
+                'agrupacion_tendencia_sla': options['agrupacion'],
+                'repeticiones': options['repeticiones'],
+                'calentamiento': options['calentamiento'],
+            },
+            'bases': [],
+        }
+        # Se mide siempre contra GLPI: sin caché de reportes ni instantáneas mensuales
+        sin_atajos = override_settings(
+            REPORT_SOURCE='glpi',
+            REPORT_CACHE={**getattr(settings, 'REPORT_CACHE', {}), 'ACTIVO': False},
+            INSTANTANEAS={**getattr(settings, 'INSTANTANEAS', {}), 'ACTIVAS': False},
+        )
+        try:
+            with sin_atajos:
+                for base in options['bases']:
+                    # El pool se crea con DATABASES['glpi'] la primera vez que se usa
+                    settings.DATABASES['glpi'].update(conexion, NAME=base)
+                    reiniciar_pool()
+                    for dimension in (directorio_usuarios, entidades_elegibles, jerarquia_grupos):
+                        dimension.invalidar()
+                    resultado['bases'].append(self._medir_base(base, options))
+        finally:
+            settings.DATABASES['glpi'].clear()
+            settings.DATABASES['glpi'].update(glpi_original)
+            reiniciar_pool()
+
+        salida = options['salida'] or f"benchmark_reportes_{datetime.now():%Y%m%d_%H%M%S}.json"
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False, default=str)
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {salida}"))
+
+    def _medir_base(self, base, options):
+        tickets, asignaciones, soluciones, tecnicos, primero, ultimo = _consultar(CONSULTA_TAMANO)[0]
+        if not tickets:
+            raise CommandError(f"La base {base} no tiene tickets.")
+        self.stdout.write(f"== {base}: {tickets} tickets, {tecnicos} técnicos ({primero} a {ultimo})")
+
+        # Carga de las dimensiones en memoria (fuera de las mediciones de cada ruta)
+        inicio = perf_counter()
+        tecnicos_con_perfil()
+        ids_entidades_elegibles()
+        obtener_jerarquia()
+        dimensiones_ms = (perf_counter() - inicio) * 1000
+
+        usuarios = directorio_usuarios.obtener().por_id
+        muestra = [usuarios[fila[0]]['nombre'] for fila in _consultar(CONSULTA_TECNICOS_MUESTRA, (options['tecnicos_muestra'],))
+                   if fila[0] in usuarios and usuarios[fila[0]]['nombre'] is not None]
+        if not muestra:
+            raise CommandError(f"La base {base} no tiene técnicos con tickets asignados.")
+
+        fin = (datetime.strptime(options['fecha_fin'], '%Y-%m-%d') if options['fecha_fin'] else ultimo).date()
+        rutas = []
+        for ruta in options['rutas']:
+            if ruta == 'reporte_principal':
+                rutas.extend((f'reporte_principal[{motor}]', {'REPORT_ENGINE': motor}) for motor in options['motores'])
+            else:
+                rutas.append((ruta, {}))
+
+        resultados = []
+        for dias in options['rangos']:
+            fecha_ini, fecha_fin = str(fin - timedelta(days=dias - 1)), str(fin)
+            for nombre, ajustes in rutas:
+                with override_settings(**ajustes):
+                    medida = self._medir_ruta(nombre.split('[')[0], fecha_ini, fecha_fin, muestra, options)
+                medida.update(ruta=nombre, rango_dias=dias, fecha_ini=fecha_ini, fecha_fin=fecha_fin)
+                resultados.append(medida)
+                self.stdout.write(
+                    f"  {nombre:<32}{dias:>5} d {medida['ms']['mediana']:>10.1f} ms "
+                    f"(db {medida['etapas_ms']['db']:.1f}, dataframe {medida['etapas_ms']['dataframe']:.1f}) "
+                    f"{medida['filas']:>6} filas, {medida['sentencias']} consultas"
+                )
+        return {
+            'base': base,
+            'tamano': {'tickets': tickets, 'tickets_users': asignaciones, 'itilsolutions': soluciones,
+                       'tecnicos': tecnicos, 'primer_ticket': primero, 'ultimo_ticket': ultimo},
+            'dimensiones_ms': round(dimensiones_ms, 1),
+            'tecnico_muestra': muestra[0],
+            'tecnicos_muestra': muestra,
+            'resultados': resultados,
+        }
+
+    def _medir_ruta(self, ruta, fecha_ini, fecha_fin, muestra, options):
+        """Tiempos de una ruta: calentamiento y luego ``repeticiones`` mediciones instrumentadas."""
+        if ruta == 'reporte_principal':
+            ejecutar = lambda: ReportGenerator.generar_reporte_principal(fecha_ini, fecha_fin)
+        elif ruta == 'reabiertos':
+            ejecutar = lambda: ReportGenerator.obtener_tickets_reabiertos(muestra[0], fecha_ini, fecha_fin)
+        elif ruta == 'tendencia_tecnico':
+            ejecutar = lambda: ReportGenerator.obtener_datos_tendencia_tecnico(muestra[0], fecha_ini, fecha_fin)
+        elif ruta == 'tendencia_tecnicos':
+            ejecutar = lambda: ReportGenerator.tendencia_diaria_tecnicos(muestra, fecha_ini, fecha_fin)
+        else:
+            ejecutar = lambda: ReportGenerator.tendencia_sla(fecha_ini, fecha_fin, None, options['agrupacion'])
+
+        for _ in range(max(0, options['calentamiento'])):
+            ejecutar()
+        tiempos, mejor = [], None
+        for _ in range(options['repeticiones']):
+            with registrar(ruta) as registro:
+                inicio = perf_counter()
+                filas = _filas(ejecutar())
+                transcurrido = (perf_counter() - inicio) * 1000
+            tiempos.append(transcurrido)
+            if mejor is None or transcurrido <= min(tiempos):
+                mejor = registro.resumen()
+        return {
+            'filas': filas,
+            'ms': {'min': round(min(tiempos), 1), 'mediana': round(statistics.median(tiempos), 1),
+                   'max': round(max(tiempos), 1)},
+            'mediciones_ms': [round(t, 1) for t in tiempos],
+            # Etapas, consultas y volumen leído de la medición más rápida
+            'etapas_ms': {etapa: round(ms, 1) for etapa, ms in mejor['ms'].items()},
+            'sentencias': mejor['sentencias'],
+            'filas_leidas': mejor['filas'],
+            'bytes_leidos': mejor['bytes'],
+        }
@@ -0,0 +1,107 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from metricas.glpi_db import glpi_connection
+from metricas.services import ReportGenerator, MOTORES_REPORTE, COLUMNAS_REPORTE_PRINCIPAL
+
+# Contadores de sesión de MySQL/MariaDB que se comparan entre motores
+CONTADORES_ESTADO = (
+    'Handler_read_first', 'Handler_read_key', 'Handler_read_last', 'Handler_read_next',
+    'Handler_read_prev', 'Handler_read_rnd', 'Handler_read_rnd_next',
+    'Select_scan', 'Select_full_join', 'Sort_rows', 'Created_tmp_tables', 'Created_tmp_disk_tables',
+)
+
+
+def _normalizar(valor):
+    """Normaliza valores para comparar resultados (Decimal/str/int/float)."""
+    if valor is None:
+        return None
+    try:
+        return Decimal(str(valor)).normalize()
+    except Exception:
+        return valor
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta el reporte principal con cada motor SQL (subconsultas y agregación) "
+        "sobre la misma base GLPI, verifica que ambos devuelvan el mismo resultado y "
+        "compara filas examinadas (contadores Handler_read_*), escaneos y tiempo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha-ini', required=True, help='Fecha inicial (YYYY-MM-DD).')
+        parser.add_argument('--fecha-fin', required=True, help='Fecha final (YYYY-MM-DD).')
+        parser.add_argument('--tecnico', action='append', dest='tecnicos',
+                            help='Filtrar por técnico (repetible). Sin esta opción: todos.')
+        parser.add_argument('--repeticiones', type=int, default=1,
+                            help='Veces que se ejecuta cada motor (se informa el mejor tiempo).')
+
+    def _leer_contadores(self, cursor):
+        cursor.execute("SHOW SESSION STATUS")
+        estado = {fila[0]: fila[1] for fila in cursor.fetchall()}
+        return {nombre: int(estado.get(nombre, 0) or 0) for nombre in CONTADORES_ESTADO}
+
+    def _ejecutar(self, conn, motor, options):
+        query, params = ReportGenerator.consulta_reporte_principal(
+            options['fecha_ini'], options['fecha_fin'], options['tecnicos'], motor=motor
+        )
+        cursor = conn.cursor()
+        mejor_tiempo = None
+        resultados = None
+        delta = None
+        for _ in range(max(1, options['repeticiones'])):
+            antes = self._leer_contadores(cursor)
+            inicio = time.perf_counter()
+            cursor.execute(query, params)
+            resultados = cursor.fetchall()
+            transcurrido = time.perf_counter() - inicio
+            despues = self._leer_contadores(cursor)
+            if mejor_tiempo is None or transcurrido < mejor_tiempo:
+                mejor_tiempo = transcurrido
+                delta = {k: despues[k] - antes[k] for k in CONTADORES_ESTADO}
+        cursor.close()
+        return resultados, mejor_tiempo, delta
+
+    def handle(self, *args, **options):
+        medidas = {}
+        with glpi_connection() as conn:
+            for motor in MOTORES_REPORTE:
+                medidas[motor] = self._ejecutar(conn, motor, options)
+
+        # --- Equivalencia de resultados ---
+        filas = {}
+        for motor, (resultados, _, _) in medidas.items():
+            filas[motor] = {
+                fila[0]: tuple(_normalizar(v) for v in fila[1:]) for fila in resultados
+            }
+        base, nuevo = filas['subconsultas'], filas['agregacion']
+        diferencias = []
+        for tecnico in sorted(set(base) | set(nuevo), key=str):
+            if base.get(tecnico) != nuevo.get(tecnico):
+                diferencias.append((tecnico, base.get(tecnico), nuevo.get(tecnico)))
+
+        # --- Tabla comparativa ---
+        self.stdout.write(f"Rango {options['fecha_ini']} a {options['fecha_fin']}, "
+                          f"técnicos: {len(options['tecnicos']) if options['tecnicos'] else 'todos'}")
+        self.stdout.write(f"{'Métrica':<28}{'subconsultas':>16}{'agregacion':>16}")
+        self.stdout.write(f"{'filas devueltas':<28}{len(medidas['subconsultas'][0]):>16}{len(medidas['agregacion'][0]):>16}")
+        self.stdout.write(f"{'tiempo (ms)':<28}{medidas['subconsultas'][1] * 1000:>16.1f}{medidas['agregacion'][1] * 1000:>16.1f}")
+        total = {motor: sum(v for k, v in medidas[motor][2].items() if k.startswith('Handler_read')) for motor in medidas}
+        self.stdout.write(f"{'filas examinadas (Handler)':<28}{total['subconsultas']:>16}{total['agregacion']:>16}")
+        for contador in CONTADORES_ESTADO:
+            self.stdout.write(f"{contador:<28}{medidas['subconsultas'][2][contador]:>16}{medidas['agregacion'][2][contador]:>16}")
+        if total['subconsultas']:
+            reduccion = 100 * (1 - total['agregacion'] / total['subconsultas'])
+            self.stdout.write(f"Reducción de filas examinadas: {reduccion:.1f}%")
+
+        if diferencias:
+            columnas = COLUMNAS_REPORTE_PRINCIPAL[1:]
+            for tecnico, fila_base, fila_nueva in diferencias[:50]:
+                self.stderr.write(f"- {tecnico}:")
+                self.stderr.write(f"    subconsultas: {dict(zip(columnas, fila_base)) if fila_base else 'ausente'}")
+                self.stderr.write(f"    agregacion:   {dict(zip(columnas, fila_nueva)) if fila_nueva else 'ausente'}")
+            raise CommandError(f"Los motores difieren en {len(diferencias)} técnico(s).")
+        self.stdout.write(self.style.SUCCESS("Ambos motores devuelven resultados idénticos."))
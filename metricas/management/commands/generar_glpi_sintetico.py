@@ -0,0 +1,428 @@
+import bisect
+import ipaddress
+import math
+import random
+import socket
+from datetime import datetime, timedelta
+from time import perf_counter
+
+import mysql.connector
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from metricas.auth_backend import REQUIRED_GLPI_PROFILE_IDS
+from metricas.dimensiones import PERFIL_TECNICO
+
+# Subconjunto del esquema de GLPI 10 que usan las consultas de reportes, con los
+# índices que tiene GLPI (se crean después de la carga, que así es más rápida).
+# Las fechas son TIMESTAMP en UTC, como en GLPI.
+TABLAS = {
+    'glpi_entities': """
+        id INT UNSIGNED NOT NULL PRIMARY KEY,
+        name VARCHAR(255) DEFAULT NULL,
+        entities_id INT UNSIGNED DEFAULT 0,
+        completename TEXT,
+        `level` INT NOT NULL DEFAULT 0,
+        date_mod TIMESTAMP NULL DEFAULT NULL
+    """,
+    'glpi_profiles': """
+        id INT UNSIGNED NOT NULL PRIMARY KEY,
+        name VARCHAR(255) DEFAULT NULL,
+        date_mod TIMESTAMP NULL DEFAULT NULL
+    """,
+    'glpi_users': """
+        id INT UNSIGNED NOT NULL PRIMARY KEY,
+        name VARCHAR(255) DEFAULT NULL,
+        password VARCHAR(255) DEFAULT NULL,
+        realname VARCHAR(255) DEFAULT NULL,
+        firstname VARCHAR(255) DEFAULT NULL,
+        is_active TINYINT NOT NULL DEFAULT 1,
+        entities_id INT UNSIGNED NOT NULL DEFAULT 0,
+        date_mod TIMESTAMP NULL DEFAULT NULL
+    """,
+    'glpi_profiles_users': """
+        id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        users_id INT UNSIGNED NOT NULL DEFAULT 0,
+        profiles_id INT UNSIGNED NOT NULL DEFAULT 0,
+        entities_id INT UNSIGNED NOT NULL DEFAULT 0,
+        is_recursive TINYINT NOT NULL DEFAULT 1
+    """,
+    'glpi_groups': """
+        id INT UNSIGNED NOT NULL PRIMARY KEY,
+        entities_id INT UNSIGNED NOT NULL DEFAULT 0,
+        name VARCHAR(255) DEFAULT NULL,
+        comment TEXT,
+        date_mod TIMESTAMP NULL DEFAULT NULL
+    """,
+    'glpi_groups_users': """
+        id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        users_id INT UNSIGNED NOT NULL DEFAULT 0,
+        groups_id INT UNSIGNED NOT NULL DEFAULT 0
+    """,
+    'glpi_tickets': """
+        id INT UNSIGNED NOT NULL PRIMARY KEY,
+        entities_id INT UNSIGNED NOT NULL DEFAULT 0,
+        name VARCHAR(255) DEFAULT NULL,
+        `date` TIMESTAMP NULL DEFAULT NULL,
+        closedate TIMESTAMP NULL DEFAULT NULL,
+        solvedate TIMESTAMP NULL DEFAULT NULL,
+        date_mod TIMESTAMP NULL DEFAULT NULL,
+        status INT NOT NULL DEFAULT 1,
+        time_to_resolve TIMESTAMP NULL DEFAULT NULL,
+        is_deleted TINYINT NOT NULL DEFAULT 0,
+        date_creation TIMESTAMP NULL DEFAULT NULL
+    """,
+    'glpi_tickets_users': """
+        id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        tickets_id INT UNSIGNED NOT NULL DEFAULT 0,
+        users_id INT UNSIGNED NOT NULL DEFAULT 0,
+        type INT NOT NULL DEFAULT 1
+    """,
+    'glpi_itilsolutions': """
+        id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        itemtype VARCHAR(100) NOT NULL,
+        items_id INT UNSIGNED NOT NULL DEFAULT 0,
+        date_creation TIMESTAMP NULL DEFAULT NULL,
+        date_mod TIMESTAMP NULL DEFAULT NULL,
+        date_approval TIMESTAMP NULL DEFAULT NULL,
+        users_id INT UNSIGNED NOT NULL DEFAULT 0,
+        users_id_approval INT UNSIGNED NOT NULL DEFAULT 0,
+        status INT NOT NULL DEFAULT 1
+    """,
+}
+
+INDICES = {
+    'glpi_entities': ['UNIQUE KEY unicity (entities_id, name)', 'KEY date_mod (date_mod)'],
+    'glpi_users': ['UNIQUE KEY unicityloginauth (name)', 'KEY realname (realname)', 'KEY firstname (firstname)',
+                   'KEY date_mod (date_mod)'],
+    'glpi_profiles_users': ['KEY users_id (users_id)', 'KEY profiles_id (profiles_id)', 'KEY entities_id (entities_id)'],
+    'glpi_groups': ['KEY entities_id (entities_id)', 'KEY date_mod (date_mod)'],
+    'glpi_groups_users': ['UNIQUE KEY unicity (users_id, groups_id)', 'KEY groups_id (groups_id)'],
+    'glpi_tickets': ['KEY `date` (`date`)', 'KEY closedate (closedate)', 'KEY solvedate (solvedate)',
+                     'KEY status (status)', 'KEY entities_id (entities_id)', 'KEY is_deleted (is_deleted)',
+                     'KEY time_to_resolve (time_to_resolve)', 'KEY date_mod (date_mod)',
+                     'KEY date_creation (date_creation)'],
+    'glpi_tickets_users': ['UNIQUE KEY unicity (tickets_id, type, users_id)', 'KEY `user` (users_id, type)'],
+    'glpi_itilsolutions': ['KEY item (itemtype, items_id)', 'KEY items_id (items_id)', 'KEY users_id (users_id)',
+                           'KEY users_id_approval (users_id_approval)', 'KEY status (status)',
+                           'KEY date_creation (date_creation)', 'KEY date_mod (date_mod)'],
+}
+
+NOMBRES = ('Ana', 'Luis', 'María', 'José', 'Carmen', 'Carlos', 'Rosa', 'Jesús', 'Luisa', 'Pedro', 'Elena',
+           'Miguel', 'Andrea', 'Rafael', 'Daniela', 'Jorge', 'Gabriela', 'Manuel', 'Isabel', 'Víctor',
+           'Patricia', 'Ramón', 'Adriana', 'Javier', 'Mónica', 'Héctor', 'Silvia', 'Alberto', 'Teresa', 'Óscar')
+APELLIDOS = ('González', 'Rodríguez', 'Pérez', 'Hernández', 'García', 'Martínez', 'López', 'Sánchez', 'Ramírez',
+             'Torres', 'Díaz', 'Rojas', 'Moreno', 'Morales', 'Castillo', 'Romero', 'Suárez', 'Medina', 'Vargas',
+             'Rivas', 'Mendoza', 'Silva', 'Blanco', 'Guerrero', 'Gil', 'Márquez', 'Flores', 'Contreras')
+
+# Tiempos de solución pactados (horas) y su frecuencia
+SLA_HORAS = ((4, 0.15), (8, 0.35), (24, 0.35), (72, 0.15))
+
+# Desplazamiento de la hora local de los reportes (America/Caracas, sin horario de verano)
+DESFASE_LOCAL = timedelta(hours=-4)
+
+ID_TECNICOS = 1001
+ID_SOLICITANTES = 100001
+
+
+def _nombres_unicos(cantidad, azar):
+    """(apellidos, nombre) distintos: el reporte agrupa por nombre visible."""
+    vistos = set()
+    while len(vistos) < cantidad:
+        vistos.add((f"{azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}", azar.choice(NOMBRES)))
+    nombres = sorted(vistos)
+    azar.shuffle(nombres)
+    return nombres
+
+
+def _tickets_por_dia(total, dias):
+    """Reparte ``total`` tickets entre los días: los fines de semana reciben la cuarta parte."""
+    pesos = [0.25 if dia.weekday() >= 5 else 1.0 for dia in dias]
+    suma = sum(pesos)
+    cuotas, arrastre = [], 0.0
+    for peso in pesos:
+        exacto = total * peso / suma + arrastre
+        cuota = int(exacto)
+        arrastre = exacto - cuota
+        cuotas.append(cuota)
+    cuotas[-1] += total - sum(cuotas)
+    return cuotas
+
+
+def _instantes_del_dia(dia, cantidad, azar):
+    """Instantes UTC de un día local, concentrados en horario laboral (07:00-18:00)."""
+    instantes = []
+    for _ in range(cantidad):
+        if azar.random() < 0.85:
+            segundos = azar.uniform(7 * 3600, 18 * 3600)
+        else:
+            segundos = azar.uniform(0, 24 * 3600)
+        instantes.append(dia + timedelta(seconds=segundos) - DESFASE_LOCAL)
+    instantes.sort()
+    return instantes
+
+
+def _direcciones(host):
+    """Direcciones IP de ``host`` (las de loopback cuentan como una sola), o None si no se resuelve."""
+    try:
+        infos = socket.getaddrinfo(host or 'localhost', None)
+    except (socket.gaierror, UnicodeError):
+        return None
+    direcciones = set()
+    for info in infos:
+        ip = ipaddress.ip_address(info[4][0].split('%')[0])
+        direcciones.add('loopback' if ip.is_loopback else str(ip))
+    return direcciones
+
+
+def _mismo_servidor(host, port, glpi):
+    """Si ``host:port`` puede ser el servidor de ``glpi``; un nombre que no se resuelve cuenta como el mismo."""
+    if int(port) != int(glpi.get('PORT') or 3306):
+        return False
+    propias, de_glpi = _direcciones(host), _direcciones(glpi.get('HOST'))
+    return propias is None or de_glpi is None or bool(propias & de_glpi)
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea en un MySQL/MariaDB local el subconjunto del esquema GLPI que usan los "
+        "reportes (tickets, asignaciones, usuarios, perfiles, entidades, grupos y "
+        "soluciones) y lo llena con datos sintéticos de distribución realista, para "
+        "medir los reportes con manage.py benchmark_reportes. Nunca escribe en la base "
+        "GLPI configurada en settings.DATABASES['glpi']."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=3306)
+        parser.add_argument('--usuario', default='root', help='Usuario MySQL (por defecto root).')
+        parser.add_argument('--password', default='')
+        parser.add_argument('--base', default='glpi_sintetico', help='Base de datos a crear o llenar.')
+        parser.add_argument('--tickets', type=int, default=100_000, help='Tickets a generar (1.000 a 5.000.000).')
+        parser.add_argument('--tecnicos', type=int, default=300, help='Técnicos (perfil 10) (por defecto 300).')
+        parser.add_argument('--solicitantes', type=int, default=5000, help='Usuarios solicitantes (por defecto 5000).')
+        parser.add_argument('--entidades', type=int, default=20, help='Entidades de nivel 3 (gerencias).')
+        parser.add_argument('--grupos-por-entidad', type=int, default=3)
+        parser.add_argument('--fecha-ini', default=None, help='Inicio de los tickets (por defecto 3 años antes del fin).')
+        parser.add_argument('--fecha-fin', default=None, help='"Hoy" del conjunto de datos (por defecto, hoy).')
+        parser.add_argument('--proporcion-sla', type=float, default=0.8, help='Tickets con time_to_resolve.')
+        parser.add_argument('--proporcion-reabiertos', type=float, default=0.05,
+                            help='Tickets con una solución rechazada antes de la definitiva.')
+        parser.add_argument('--lote', type=int, default=5000, help='Tickets por lote de INSERT.')
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--recrear', action='store_true', help='Borra las tablas si ya existen.')
+
+    def handle(self, *args, **options):
+        if not 1000 <= options['tickets'] <= 5_000_000:
+            raise CommandError("--tickets debe estar entre 1000 y 5000000.")
+        if options['tecnicos'] < 1 or options['entidades'] < 1 or options['grupos_por_entidad'] < 1:
+            raise CommandError("--tecnicos, --entidades y --grupos-por-entidad deben ser mayores o iguales a 1.")
+        if options['tecnicos'] > len(APELLIDOS) ** 2 * len(NOMBRES):
+            raise CommandError(f"--tecnicos admite como máximo {len(APELLIDOS) ** 2 * len(NOMBRES)} nombres distintos.")
+        glpi = settings.DATABASES['glpi']
+        if options['base'] == glpi['NAME']:
+            # --recrear borra las tablas: con el nombre de la base GLPI se rechaza en cualquier servidor
+            if options['recrear'] or _mismo_servidor(options['host'], options['port'], glpi):
+                raise CommandError("La base indicada es la base GLPI de settings.DATABASES['glpi']; "
+                                   "use otro nombre con --base.")
+
+        fin = datetime.strptime(options['fecha_fin'], '%Y-%m-%d') if options['fecha_fin'] else datetime.now()
+        fin = fin.replace(hour=0, minute=0, second=0, microsecond=0)
+        inicio = (datetime.strptime(options['fecha_ini'], '%Y-%m-%d') if options['fecha_ini']
+                  else fin.replace(year=fin.year - 3))
+        if inicio >= fin:
+            raise CommandError("--fecha-ini debe ser anterior a --fecha-fin.")
+        self.ahora = fin + timedelta(days=1) - DESFASE_LOCAL  # Fin del último día local, en UTC
+        self.azar = random.Random(options['semilla'])
+
+        try:
+            conn = mysql.connector.connect(host=options['host'], port=options['port'], user=options['usuario'],
+                                           password=options['password'])
+        except mysql.connector.Error as e:
+            raise CommandError(f"No se pudo conectar a {options['host']}:{options['port']}: {e}")
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{options['base']}` CHARACTER SET utf8mb4")
+            cursor.execute(f"USE `{options['base']}`")
+            self._crear_tablas(cursor, options['recrear'])
+            cursor.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+
+            total_inicio = perf_counter()
+            tecnicos = self._cargar_dimensiones(conn, cursor, options)
+            self._cargar_tickets(conn, cursor, tecnicos, inicio, fin, options)
+
+            self.stdout.write("Creando índices...")
+            for tabla, indices in INDICES.items():
+                cursor.execute(f"ALTER TABLE {tabla} " + ', '.join(f'ADD {indice}' for indice in indices))
+            for tabla in TABLAS:
+                cursor.execute(f"ANALYZE TABLE {tabla}")
+                cursor.fetchall()
+            self._verificar_zonas_horarias(cursor)
+            cursor.close()
+        finally:
+            conn.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"Base {options['base']} lista en {perf_counter() - total_inicio:.0f} s: {options['tickets']} tickets, "
+            f"{options['tecnicos']} técnicos, {inicio:%Y-%m-%d} a {fin:%Y-%m-%d}."
+        ))
+
+    def _crear_tablas(self, cursor, recrear):
+        cursor.execute("SHOW TABLES")
+        existentes = {fila[0] for fila in cursor.fetchall()} & set(TABLAS)
+        if existentes and not recrear:
+            raise CommandError(f"Ya existen tablas ({', '.join(sorted(existentes))}); use --recrear para reemplazarlas.")
+        for tabla, columnas in TABLAS.items():
+            cursor.execute(f"DROP TABLE IF EXISTS {tabla}")
+            cursor.execute(f"CREATE TABLE {tabla} ({columnas}) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4")
+
+    def _insertar(self, cursor, tabla, columnas, filas):
+        if filas:
+            marcadores = ', '.join(['%s'] * len(columnas))
+            cursor.executemany(f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({marcadores})", filas)
+
+    def _cargar_dimensiones(self, conn, cursor, options):
+        """Entidades, perfiles, grupos y usuarios. Devuelve los técnicos con su peso y entidad."""
+        azar = self.azar
+        marca = self.ahora - timedelta(days=30)
+
+        # Raíz (nivel 1) -> vicepresidencias (nivel 2) -> gerencias (nivel 3, las del reporte)
+        entidades = [(0, 'Entidad raíz', 0, 'Entidad raíz', 1, marca)]
+        vicepresidencias = []
+        for indice in range(max(1, options['entidades'] // 5)):
+            nombre = f"Vicepresidencia {indice + 1}"
+            vicepresidencias.append((len(entidades), f"Entidad raíz > {nombre}"))
+            entidades.append((len(entidades), nombre, 0, f"Entidad raíz > {nombre}", 2, marca))
+        gerencias = []
+        for indice in range(options['entidades']):
+            padre, ruta = vicepresidencias[indice % len(vicepresidencias)]
+            nombre = f"Gerencia {indice + 1}"
+            gerencias.append(len(entidades))
+            entidades.append((len(entidades), nombre, padre, f"{ruta} > {nombre}", 3, marca))
+        # Entidades que el reporte excluye (correo entrante y casos duplicados)
+        excluidas = [len(entidades), len(entidades) + 1]
+        entidades.append((excluidas[0], 'soporte@empresa.com', 0, 'Entidad raíz > soporte@empresa.com', 2, marca))
+        entidades.append((excluidas[1], 'Casos duplicados', 0, 'Entidad raíz > Casos duplicados', 2, marca))
+        self._insertar(cursor, 'glpi_entities', ('id', 'name', 'entities_id', 'completename', 'level', 'date_mod'), entidades)
+        self.gerencias, self.excluidas = gerencias, excluidas
+
+        perfiles = {1: 'Self-Service', 6: 'Technician', PERFIL_TECNICO: 'Técnico (reportes)'}
+        perfiles.update({perfil: f'Reportes {perfil}' for perfil in REQUIRED_GLPI_PROFILE_IDS})
+        self._insertar(cursor, 'glpi_profiles', ('id', 'name', 'date_mod'),
+                       [(perfil, nombre, marca) for perfil, nombre in perfiles.items()])
+
+        grupos, id_grupo = {}, 1
+        filas_grupos = []
+        for entidad in gerencias:
+            grupos[entidad] = []
+            for indice in range(options['grupos_por_entidad']):
+                filas_grupos.append((id_grupo, entidad, f"Soporte {entidad}-{indice + 1}", f"Grupo {indice + 1}", marca))
+                grupos[entidad].append(id_grupo)
+                id_grupo += 1
+        self._insertar(cursor, 'glpi_groups', ('id', 'entities_id', 'name', 'comment', 'date_mod'), filas_grupos)
+
+        # Técnicos: carga desigual (pocos técnicos atienden muchos tickets)
+        usuarios, perfiles_usuarios, miembros, tecnicos = [], [], [], []
+        for indice, (realname, firstname) in enumerate(_nombres_unicos(options['tecnicos'], azar)):
+            user_id = ID_TECNICOS + indice
+            entidad = gerencias[indice % len(gerencias)]
+            usuarios.append((user_id, f"tecnico{indice + 1:04d}", '', realname, firstname, 1, entidad, marca))
+            perfiles_usuarios.append((user_id, PERFIL_TECNICO, 0, 1))
+            perfiles_usuarios.append((user_id, 6, entidad, 1))
+            for grupo in azar.sample(grupos[entidad], min(len(grupos[entidad]), 1 + (azar.random() < 0.2))):
+                miembros.append((user_id, grupo))
+            tecnicos.append((user_id, entidad, 1.0 / (indice + 1) ** 0.6))
+        for indice in range(options['solicitantes']):
+            user_id = ID_SOLICITANTES + indice
+            usuarios.append((user_id, f"usuario{indice + 1:06d}", '', azar.choice(APELLIDOS), azar.choice(NOMBRES),
+                             1, azar.choice(gerencias), marca))
+            perfiles_usuarios.append((user_id, 1, 0, 1))
+        self._insertar(cursor, 'glpi_users', ('id', 'name', 'password', 'realname', 'firstname', 'is_active',
+                                              'entities_id', 'date_mod'), usuarios)
+        self._insertar(cursor, 'glpi_profiles_users', ('users_id', 'profiles_id', 'entities_id', 'is_recursive'),
+                       perfiles_usuarios)
+        self._insertar(cursor, 'glpi_groups_users', ('users_id', 'groups_id'), miembros)
+        conn.commit()
+        azar.shuffle(tecnicos)
+        return tecnicos
+
+    def _cargar_tickets(self, conn, cursor, tecnicos, inicio, fin, options):
+        """Tickets en orden cronológico (como los ids de GLPI), con asignaciones y soluciones."""
+        azar = self.azar
+        pesos_acumulados, acumulado = [], 0.0
+        for _, _, peso in tecnicos:
+            acumulado += peso
+            pesos_acumulados.append(acumulado)
+        horas_sla, pesos_sla = zip(*SLA_HORAS)
+        solicitantes = options['solicitantes']
+
+        dias = [inicio + timedelta(days=n) for n in range((fin - inicio).days + 1)]
+        cuotas = _tickets_por_dia(options['tickets'], dias)
+        tickets, asignaciones, soluciones = [], [], []
+        id_ticket = 0
+        inicio_carga = perf_counter()
+
+        def volcar():
+            self._insertar(cursor, 'glpi_tickets', ('id', 'entities_id', 'name', 'date', 'closedate', 'solvedate',
+                                                    'date_mod', 'status', 'time_to_resolve', 'is_deleted',
+                                                    'date_creation'), tickets)
+            self._insertar(cursor, 'glpi_tickets_users', ('tickets_id', 'users_id', 'type'), asignaciones)
+            self._insertar(cursor, 'glpi_itilsolutions', ('itemtype', 'items_id', 'date_creation', 'date_mod',
+                                                          'date_approval', 'users_id', 'users_id_approval', 'status'),
+                           soluciones)
+            conn.commit()
+            tickets.clear()
+            asignaciones.clear()
+            soluciones.clear()
+
+        for dia, cuota in zip(dias, cuotas):
+            for fecha in _instantes_del_dia(dia, cuota, azar):
+                id_ticket += 1
+                tecnico, entidad_tecnico, _ = tecnicos[min(
+                    len(tecnicos) - 1, bisect.bisect_right(pesos_acumulados, azar.random() * acumulado))]
+                sorteo = azar.random()
+                entidad = (entidad_tecnico if sorteo < 0.9
+                           else azar.choice(self.excluidas) if sorteo < 0.91 else azar.choice(self.gerencias))
+                solicitante = ID_SOLICITANTES + azar.randrange(solicitantes) if solicitantes else tecnico
+
+                # Duración lognormal: mediana de 8 horas y cola larga de semanas
+                duracion = timedelta(hours=azar.lognormvariate(math.log(8), 1.3))
+                limite = (fecha + timedelta(hours=azar.choices(horas_sla, pesos_sla)[0])
+                          if azar.random() < options['proporcion_sla'] else None)
+                solucion = fecha + duracion
+                if solucion > self.ahora:
+                    estado, solucion, cierre = azar.choice((2, 2, 4)), None, None
+                else:
+                    cierre = solucion + timedelta(days=azar.uniform(1, 7))
+                    estado, cierre = (6, cierre) if cierre <= self.ahora else (5, None)
+                modificado = cierre or solucion or fecha
+                tickets.append((id_ticket, entidad, f"Ticket {id_ticket}", fecha, cierre, solucion, modificado, estado,
+                                limite, int(azar.random() < 0.01), fecha))
+                asignaciones.append((id_ticket, solicitante, 1))
+                asignaciones.append((id_ticket, tecnico, 2))
+                if azar.random() < 0.05:
+                    otro = tecnicos[azar.randrange(len(tecnicos))][0]
+                    if otro != tecnico:
+                        asignaciones.append((id_ticket, otro, 2))
+
+                # Reapertura: una solución rechazada por el solicitante antes de la definitiva
+                if azar.random() < options['proporcion_reabiertos']:
+                    propuesta = fecha + duracion * azar.uniform(0.2, 0.6)
+                    rechazo = propuesta + timedelta(hours=azar.uniform(1, 48))
+                    if rechazo <= self.ahora:
+                        soluciones.append(('Ticket', id_ticket, propuesta, rechazo, rechazo, tecnico, solicitante, 4))
+                if solucion is not None:
+                    soluciones.append(('Ticket', id_ticket, solucion, cierre or solucion, cierre, tecnico,
+                                       solicitante if cierre else 0, 3 if cierre else 2))
+                if len(tickets) >= options['lote']:
+                    volcar()
+                    self.stdout.write(f"  {id_ticket} tickets ({id_ticket / (perf_counter() - inicio_carga):,.0f}/s)")
+        volcar()
+
+    def _verificar_zonas_horarias(self, cursor):
+        """Las consultas de tendencia usan CONVERT_TZ con 'America/Caracas'."""
+        cursor.execute("SELECT CONVERT_TZ('2024-01-01 12:00:00', 'UTC', 'America/Caracas')")
+        if cursor.fetchone()[0] is None:
+            self.stderr.write(self.style.WARNING(
+                "El servidor no tiene cargadas las zonas horarias (CONVERT_TZ devuelve NULL): las "
+                "tendencias saldrán vacías. Cárguelas con mysql_tzinfo_to_sql /usr/share/zoneinfo | mysql -u root mysql"
+            ))
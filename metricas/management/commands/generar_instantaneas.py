@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from metricas.instantaneas import generar_mes, meses_pendientes
+from metricas.services import ReportGenerator
+
+
+def _mes(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f"Mes inválido '{valor}' (formato YYYY-MM).")
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las instantáneas mensuales (reporte principal, tickets reabiertos y "
+        "tendencia SLA de todos los técnicos) de los meses cerrados que aún no las "
+        "tienen. Pensado para cron, p. ej. a diario de madrugada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer mes (YYYY-MM). Por defecto: INSTANTANEAS["MESES_ATRAS"] meses.')
+        parser.add_argument('--hasta', help='Último mes (YYYY-MM). Por defecto: el último mes cerrado.')
+        parser.add_argument('--regenerar', action='store_true',
+                            help='Vuelve a calcular también los meses que ya tienen instantánea.')
+
+    def handle(self, *args, **options):
+        desde = _mes(options['desde']) if options['desde'] else None
+        hasta = _mes(options['hasta']) if options['hasta'] else None
+        if desde and hasta and desde > hasta:
+            raise CommandError("--desde no puede ser posterior a --hasta.")
+
+        meses = meses_pendientes(desde, hasta, regenerar=options['regenerar'])
+        if not meses:
+            self.stdout.write("No hay meses cerrados pendientes.")
+            return
+
+        for mes in meses:
+            conteos = generar_mes(mes)
+            self.stdout.write(f"{mes:%Y-%m}: " + ', '.join(f"{tipo}={filas}" for tipo, filas in conteos.items()))
+
+        # Los reportes de meses cerrados se guardan en caché sin vencimiento: se
+        # invalidan para que las próximas consultas usen las instantáneas
+        ReportGenerator.invalidar_cache_reporte()
+        self.stdout.write(self.style.SUCCESS(f"Instantáneas generadas para {len(meses)} mes(es)."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from metricas.report_cache import get_cache
+from metricas.services import ReportGenerator, ESPACIOS_CACHE_REPORTE, ESPACIO_CLAVES_REPORTE
+
+
+class Command(BaseCommand):
+    help = (
+        "Invalida la caché de resultados del reporte principal, de sus PDF y gráficas (memoria de "
+        "todos los workers y disco). Sin opciones la vacía por completo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha-ini', help='Fecha inicial del rango a invalidar (YYYY-MM-DD).')
+        parser.add_argument('--fecha-fin', help='Fecha final del rango a invalidar (YYYY-MM-DD).')
+        parser.add_argument('--tecnico', action='append', dest='tecnicos',
+                            help='Técnico del reporte a invalidar (repetible). Sin esta opción: todos.')
+        parser.add_argument('--purgar-vencidas', action='store_true',
+                            help='Solo borra del disco las entradas ya vencidas.')
+
+    def handle(self, *args, **options):
+        if options['purgar_vencidas']:
+            espacios = ESPACIOS_CACHE_REPORTE + (ESPACIO_CLAVES_REPORTE,)
+            borradas = sum(get_cache(namespace).purgar_vencidas() for namespace in espacios)
+            self.stdout.write(self.style.SUCCESS(f"Entradas vencidas eliminadas: {borradas}"))
+            return
+
+        fecha_ini, fecha_fin = options['fecha_ini'], options['fecha_fin']
+        if bool(fecha_ini) != bool(fecha_fin):
+            raise CommandError("Indique --fecha-ini y --fecha-fin juntas.")
+        if options['tecnicos'] and not fecha_ini:
+            raise CommandError("--tecnico requiere --fecha-ini y --fecha-fin.")
+
+        ReportGenerator.invalidar_cache_reporte(fecha_ini, fecha_fin, options['tecnicos'])
+        if fecha_ini:
+            self.stdout.write(self.style.SUCCESS(f"Caché invalidada para {fecha_ini} a {fecha_fin}."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Caché del reporte principal invalidada por completo."))
@@ -0,0 +1,142 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PRESUPUESTO_IMPORTACION = {
+    'MODULO': 'metricas.views',
+    'MAX_MS': 1500,      # Tiempo máximo de `import metricas.views` tras django.setup()
+    'MAX_RSS_MB': None,  # RSS máximo del proceso tras la importación (None = sin límite)
+    # Dependencias que solo deben cargarse al usarse (graficas, dataframes, exportaciones)
+    'MODULOS_DIFERIDOS': ['pandas', 'numpy', 'plotly', 'matplotlib', 'openpyxl', 'reportlab'],
+}
+
+# Módulos que cargaban las vistas antes de diferir las dependencias pesadas (--comparar)
+MODULOS_CARGA_COMPLETA = [
+    'pandas', 'plotly.graph_objects', 'plotly.io', 'plotly.express', 'plotly.subplots',
+    'matplotlib.ticker', 'matplotlib.font_manager', 'openpyxl', 'reportlab.platypus',
+    'reportlab.graphics.charts.barcharts',
+]
+
+# Se ejecuta en un intérprete nuevo: el tiempo y la memoria son los de un worker recién iniciado
+SCRIPT_MEDICION = """
+import importlib, json, resource, sys, time
+import django
+inicio = time.perf_counter()
+django.setup()
+setup = time.perf_counter()
+importlib.import_module(sys.argv[1])
+for modulo in sys.argv[3:]:
+    try:
+        importlib.import_module(modulo)
+    except ImportError:
+        pass
+fin = time.perf_counter()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss_mb = rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+print(json.dumps({
+    'setup_ms': (setup - inicio) * 1000,
+    'importacion_ms': (fin - setup) * 1000,
+    'rss_mb': rss_mb,
+    'cargados': sorted({m.split('.')[0] for m in sys.modules} & set(json.loads(sys.argv[2]))),
+}))
+"""
+
+
+def _presupuesto():
+    return {**DEFAULT_PRESUPUESTO_IMPORTACION, **getattr(settings, 'PRESUPUESTO_IMPORTACION', {})}
+
+
+def _medir(modulo, diferidos, extra=(), detalle=False):
+    """Mide una importación en un subproceso; con ``detalle`` añade la salida de -X importtime."""
+    comando = [sys.executable]
+    if detalle:
+        comando += ['-X', 'importtime']
+    comando += ['-c', SCRIPT_MEDICION, modulo, json.dumps(diferidos), *extra]
+    entorno = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'reportes_glpi.settings')}
+    proceso = subprocess.run(comando, capture_output=True, text=True, env=entorno, cwd=settings.BASE_DIR)
+    if proceso.returncode != 0:
+        raise CommandError(f"La importación de {modulo} falló:\n{proceso.stderr[-2000:]}")
+    medicion = json.loads(proceso.stdout.strip().splitlines()[-1])
+    if detalle:
+        medicion['importtime'] = proceso.stderr
+    return medicion
+
+
+def _mas_lentos(salida_importtime, cantidad):
+    """Módulos con mayor tiempo propio según -X importtime: [(ms, módulo)]."""
+    tiempos = []
+    for linea in salida_importtime.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, _, nombre = linea[len('import time:'):].split('|')
+        tiempos.append((int(propio) / 1000, nombre.strip()))
+    return sorted(tiempos, reverse=True)[:cantidad]
+
+
+def _mediana(mediciones, clave):
+    return statistics.median(m[clave] for m in mediciones)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide en procesos nuevos el tiempo y la memoria (RSS) de importar metricas.views, "
+        "como al arrancar un worker de gunicorn, y termina con error si se supera el "
+        "presupuesto de PRESUPUESTO_IMPORTACION o si se cargan dependencias que deben "
+        "importarse solo al usarse (pandas, plotly, matplotlib, openpyxl, reportlab)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5,
+                            help='Procesos medidos; se informa la mediana (por defecto 5).')
+        parser.add_argument('--max-ms', type=float,
+                            help='Presupuesto de tiempo en ms (por defecto PRESUPUESTO_IMPORTACION["MAX_MS"]).')
+        parser.add_argument('--comparar', action='store_true',
+                            help='Mide también la carga con todas las dependencias pesadas (como antes de diferirlas).')
+        parser.add_argument('--detalle', type=int, default=0, metavar='N',
+                            help='Muestra los N módulos con mayor tiempo de importación propio.')
+
+    def handle(self, *args, **options):
+        presupuesto = _presupuesto()
+        modulo = presupuesto['MODULO']
+        diferidos = list(presupuesto['MODULOS_DIFERIDOS'])
+        max_ms = options['max_ms'] if options['max_ms'] is not None else presupuesto['MAX_MS']
+        repeticiones = max(1, options['repeticiones'])
+
+        mediciones = [_medir(modulo, diferidos) for _ in range(repeticiones)]
+        importacion_ms = _mediana(mediciones, 'importacion_ms')
+        rss_mb = _mediana(mediciones, 'rss_mb')
+        self.stdout.write(
+            f"import {modulo}: {importacion_ms:.0f} ms (mediana de {repeticiones}; "
+            f"django.setup() {_mediana(mediciones, 'setup_ms'):.0f} ms), RSS {rss_mb:.1f} MB"
+        )
+
+        if options['comparar']:
+            completas = [_medir(modulo, diferidos, MODULOS_CARGA_COMPLETA) for _ in range(repeticiones)]
+            completa_ms = _mediana(completas, 'importacion_ms')
+            completa_mb = _mediana(completas, 'rss_mb')
+            self.stdout.write(
+                f"con dependencias pesadas: {completa_ms:.0f} ms, RSS {completa_mb:.1f} MB "
+                f"(ahorro por worker: {completa_ms - importacion_ms:.0f} ms, {completa_mb - rss_mb:.1f} MB)"
+            )
+
+        if options['detalle']:
+            medicion = _medir(modulo, diferidos, detalle=True)
+            for ms, nombre in _mas_lentos(medicion['importtime'], options['detalle']):
+                self.stdout.write(f"  {ms:8.1f} ms  {nombre}")
+
+        errores = []
+        cargados = sorted({m for medicion in mediciones for m in medicion['cargados']})
+        if cargados:
+            errores.append(f"{modulo} carga dependencias que deben importarse al usarse: {', '.join(cargados)}")
+        if importacion_ms > max_ms:
+            errores.append(f"la importación tarda {importacion_ms:.0f} ms (presupuesto {max_ms:.0f} ms)")
+        if presupuesto['MAX_RSS_MB'] is not None and rss_mb > presupuesto['MAX_RSS_MB']:
+            errores.append(f"el RSS es {rss_mb:.1f} MB (presupuesto {presupuesto['MAX_RSS_MB']} MB)")
+        if errores:
+            raise CommandError("Presupuesto de importación superado: " + "; ".join(errores))
+        self.stdout.write(self.style.SUCCESS(f"Dentro del presupuesto ({max_ms:.0f} ms)."))
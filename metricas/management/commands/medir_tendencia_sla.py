@@ -0,0 +1,76 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from metricas.periodos import AGRUPACIONES_TENDENCIA, periodos_del_rango
+from metricas.services import pivotar_tendencia_sla
+
+
+def _filas_sinteticas(tecnicos, periodos, semilla):
+    """Filas (periodo, tecnico, cerrados_dentro_sla, cerrados_con_sla) como las de la consulta."""
+    azar = random.Random(semilla)
+    filas = []
+    for indice in range(tecnicos):
+        tecnico = f"Tecnico {indice:04d}"
+        for periodo in periodos:
+            con_sla = azar.randint(0, 40)
+            filas.append((periodo, tecnico, azar.randint(0, con_sla), con_sla))
+    return filas
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el cálculo y pivote de la tendencia SLA (ReportGenerator.tendencia_sla) con "
+        "datos sintéticos, sin consultar GLPI, y lo compara con el pivote fila a fila en "
+        "Python que usa el modo streaming."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tecnicos', type=int, default=300, help='Técnicos sintéticos (por defecto 300).')
+        parser.add_argument('--fecha-ini', default='2022-01-01', help='Inicio del rango (YYYY-MM-DD).')
+        parser.add_argument('--fecha-fin', default='2024-12-31', help='Fin del rango (YYYY-MM-DD).')
+        parser.add_argument('--agrupacion', choices=AGRUPACIONES_TENDENCIA, default='dia',
+                            help='Agrupación de los periodos (por defecto dia).')
+        parser.add_argument('--repeticiones', type=int, default=3, help='Se informa el mejor tiempo (por defecto 3).')
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['tecnicos'] < 1:
+            raise CommandError("--tecnicos debe ser mayor o igual a 1.")
+        # numpy y pandas se cargan aquí, fuera de las mediciones
+        from metricas.dataframes import pivotar_cumplimiento_sla
+
+        periodos = periodos_del_rango(options['fecha_ini'], options['fecha_fin'], options['agrupacion'])
+        filas = _filas_sinteticas(options['tecnicos'], periodos, options['semilla'])
+        self.stdout.write(
+            f"{options['tecnicos']} técnicos x {len(periodos)} periodos ({options['agrupacion']}): {len(filas)} filas"
+        )
+
+        def mejor_tiempo(funcion):
+            tiempos = []
+            for _ in range(max(1, options['repeticiones'])):
+                inicio = perf_counter()
+                resultado = funcion()
+                tiempos.append(perf_counter() - inicio)
+            return min(tiempos), resultado
+
+        t_vectorizado, cuadro = mejor_tiempo(lambda: pivotar_cumplimiento_sla(filas))
+        # El pivote fila a fila recibe diccionarios ordenados por técnico, como en streaming
+        diccionarios = [
+            {'periodo': p, 'tecnico': t, 'cerrados_dentro_sla': d, 'cerrados_con_sla': c}
+            for p, t, d, c in sorted(filas, key=lambda fila: fila[1])
+        ]
+        t_por_fila, referencia = mejor_tiempo(lambda: list(pivotar_tendencia_sla(diccionarios, periodos)))
+
+        # np.round y round() pueden diferir en el último decimal
+        iguales = len(cuadro) == len(referencia) and all(
+            a.keys() == b.keys() and a['tecnico'] == b['tecnico']
+            and all(abs(a[p] - b[p]) <= 0.01 + 1e-9 for p in periodos)
+            for a, b in zip(cuadro, referencia)
+        )
+        if not iguales:
+            raise CommandError("El pivote vectorizado y el pivote fila a fila no coinciden.")
+        self.stdout.write(f"vectorizado (numpy): {t_vectorizado * 1000:8.1f} ms  ({len(filas) / t_vectorizado:,.0f} filas/s)")
+        self.stdout.write(f"fila a fila (Python): {t_por_fila * 1000:8.1f} ms  ({len(filas) / t_por_fila:,.0f} filas/s)")
+        self.stdout.write(self.style.SUCCESS(f"Aceleración: x{t_por_fila / t_vectorizado:.1f}"))
@@ -0,0 +1,72 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+
+from metricas.trabajos import config_trabajos, ejecutar_en_hilo, limpiar, nombre_worker, reclamar
+
+# Segundos entre limpiezas de resultados vencidos y trabajos perdidos
+INTERVALO_LIMPIEZA = 300
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de trabajos de reportes: reclama trabajos pendientes, los "
+        "ejecuta con paralelismo acotado y guarda sus resultados. Se ejecuta como un "
+        "proceso aparte de gunicorn (p. ej. con systemd o supervisor)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int,
+                            help='Trabajos simultáneos (por defecto TRABAJOS_REPORTES["CONCURRENCIA"]).')
+        parser.add_argument('--intervalo', type=float,
+                            help='Segundos entre búsquedas de trabajos (por defecto TRABAJOS_REPORTES["INTERVALO_SONDEO"]).')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesa los trabajos pendientes y termina.')
+
+    def handle(self, *args, **options):
+        config = config_trabajos()
+        concurrencia = options['concurrencia'] or config['CONCURRENCIA']
+        intervalo = options['intervalo'] or config['INTERVALO_SONDEO']
+        if concurrencia < 1:
+            raise CommandError("--concurrencia debe ser mayor o igual a 1.")
+
+        worker = nombre_worker()
+        self.stdout.write(f"Worker {worker}: concurrencia {concurrencia}, sondeo cada {intervalo} s")
+        limpiar()
+        ultima_limpieza = time.monotonic()
+        procesados = 0
+        activos = set()
+
+        with ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix='trabajo-reporte') as executor:
+            try:
+                while True:
+                    # Reclama trabajos mientras haya hilos libres
+                    while len(activos) < concurrencia:
+                        trabajo = reclamar(worker)
+                        if trabajo is None:
+                            break
+                        self.stdout.write(f"Trabajo {trabajo.pk} ({trabajo.tipo}) iniciado")
+                        activos.add(executor.submit(ejecutar_en_hilo, trabajo.pk))
+
+                    if options['una_vez'] and not activos:
+                        break
+
+                    if time.monotonic() - ultima_limpieza > INTERVALO_LIMPIEZA:
+                        limpiar()
+                        ultima_limpieza = time.monotonic()
+
+                    # Espera a que termine algún trabajo o a la siguiente búsqueda
+                    terminados, activos = wait(activos, timeout=intervalo, return_when=FIRST_COMPLETED)
+                    if not terminados and not activos:
+                        time.sleep(intervalo)
+                    for futuro in terminados:
+                        trabajo = futuro.result()
+                        procesados += 1
+                        self.stdout.write(f"Trabajo {trabajo.pk} ({trabajo.tipo}): {trabajo.estado}")
+            except KeyboardInterrupt:
+                self.stdout.write(f"Deteniendo: se esperan {len(activos)} trabajo(s) en curso...")
+                wait(activos)
+                procesados += len(activos)
+
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} terminado: {procesados} trabajo(s) procesados."))
@@ -0,0 +1,68 @@
+# Generated by Django 5.2 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metricas", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgregadoDiarioTecnico",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fecha", models.DateField()),
+                ("users_id", models.IntegerField()),
+                ("recibidos", models.IntegerField(default=0)),
+                ("cerrados", models.IntegerField(default=0)),
+                ("cerrados_dentro_sla", models.IntegerField(default=0)),
+                ("cerrados_con_sla", models.IntegerField(default=0)),
+                ("reabiertos", models.IntegerField(default=0)),
+                ("pendientes_sla_resueltos", models.IntegerField(default=0)),
+                ("pendientes_sla_abiertos", models.IntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["users_id", "fecha"],
+                        name="agregado_diario_usuario_fecha",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("fecha", "users_id"),
+                        name="agregado_diario_fecha_usuario",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="EstadoSincronizacion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("nombre", models.CharField(max_length=50, unique=True)),
+                ("marca_agua", models.DateTimeField(blank=True, null=True)),
+                ("ultima_ejecucion", models.DateTimeField(blank=True, null=True)),
+                ("dias_recalculados", models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-17 13:05
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metricas", "0003_trabajoreporte"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InstantaneaMensual",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mes", models.DateField()),
+                ("tipo", models.CharField(max_length=30)),
+                (
+                    "datos",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                ("generado", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("mes", "tipo"), name="instantanea_mes_tipo"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,6 +1,106 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 class ExampleModel(models.Model):
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
 
+
+class AgregadoDiarioTecnico(models.Model):
+    """
+    Conteos diarios por técnico sincronizados desde GLPI (ver metricas/agregados.py).
+    La fecha es el día local (America/Caracas) del evento que se cuenta: apertura
+    para recibidos y pendientes, cierre para cerrados y aprobación para reabiertos.
+    """
+    fecha = models.DateField()
+    users_id = models.IntegerField()  # id del usuario GLPI
+    recibidos = models.IntegerField(default=0)
+    cerrados = models.IntegerField(default=0)
+    cerrados_dentro_sla = models.IntegerField(default=0)
+    cerrados_con_sla = models.IntegerField(default=0)  # Cerrados con time_to_resolve definido
+    reabiertos = models.IntegerField(default=0)
+    # Pendientes SLA de los tickets abiertos ese día: meses de atraso de los ya
+    # resueltos fuera de plazo y cantidad de los que siguen sin resolver (su atraso
+    # depende de la fecha final del reporte y se calcula al consultar).
+    pendientes_sla_resueltos = models.IntegerField(default=0)
+    pendientes_sla_abiertos = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'users_id'], name='agregado_diario_fecha_usuario'),
+        ]
+        indexes = [
+            models.Index(fields=['users_id', 'fecha'], name='agregado_diario_usuario_fecha'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - usuario {self.users_id}"
+
+
+class EstadoSincronizacion(models.Model):
+    """Marca de agua (date_mod de GLPI) de cada proceso de sincronización incremental."""
+    nombre = models.CharField(max_length=50, unique=True)
+    marca_agua = models.DateTimeField(null=True, blank=True)  # Máximo date_mod procesado (hora GLPI)
+    ultima_ejecucion = models.DateTimeField(null=True, blank=True)
+    dias_recalculados = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.nombre}: {self.marca_agua}"
+
+
+class TrabajoReporte(models.Model):
+    """
+    Reporte o exportación encolado para ejecutarse fuera de la petición HTTP
+    (ver metricas/trabajos.py y ``manage.py procesar_trabajos``).
+    """
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADO = 'completado'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (COMPLETADO, 'Completado'),
+        (ERROR, 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=30)  # Clave de trabajos.TIPOS_TRABAJO
+    parametros = models.JSONField(default=dict)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE)
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+    expira = models.DateTimeField(null=True, blank=True)  # Momento en que se borra el resultado
+    worker = models.CharField(max_length=100, blank=True)  # Proceso que lo ejecuta (host:pid)
+    resultado = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)  # Resultados en JSON
+    archivo = models.CharField(max_length=255, blank=True)  # Ruta del archivo generado (Excel/PDF)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'creado'], name='trabajo_estado_creado'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
+
+
+class InstantaneaMensual(models.Model):
+    """
+    Resultado congelado de un reporte para un mes cerrado y todos los técnicos
+    (ver metricas/instantaneas.py y ``manage.py generar_instantaneas``).
+    """
+    mes = models.DateField()  # Primer día del mes
+    tipo = models.CharField(max_length=30)  # 'reporte_principal', 'reabiertos' o 'tendencia_sla'
+    datos = models.JSONField(encoder=DjangoJSONEncoder)  # Lista de filas con las claves del reporte
+    generado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'tipo'], name='instantanea_mes_tipo'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.mes:%Y-%m}"
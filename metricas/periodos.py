@@ -0,0 +1,85 @@
+"""
+Periodos de la tendencia SLA.
+
+Agrupaciones disponibles y sus etiquetas (las mismas en SQL, en el almacén local,
+en las instantáneas y en el encabezado del cuadro):
+
+- ``dia``: 'YYYY-MM-DD'
+- ``semana``: semana ISO, 'YYYY-Www' (el año es el de la semana ISO)
+- ``mes``: 'YYYY-MM'
+- ``trimestre``: 'YYYY-Tn'
+- ``año``: 'YYYY'
+
+Las etiquetas ordenan cronológicamente como texto.
+"""
+from datetime import date, datetime, timedelta
+
+AGRUPACIONES_TENDENCIA = ('dia', 'semana', 'mes', 'trimestre', 'año')
+
+# Agrupaciones que se componen sumando meses completos (instantáneas mensuales)
+AGRUPACIONES_MENSUALES = ('mes', 'trimestre', 'año')
+
+# Expresión MySQL de la etiqueta a partir de una fecha local (``{fecha}``)
+EXPRESIONES_SQL_PERIODO = {
+    'dia': "DATE_FORMAT({fecha}, '%Y-%m-%d')",
+    'semana': "DATE_FORMAT({fecha}, '%x-W%v')",
+    'mes': "DATE_FORMAT({fecha}, '%Y-%m')",
+    'trimestre': "CONCAT(YEAR({fecha}), '-T', QUARTER({fecha}))",
+    'año': "DATE_FORMAT({fecha}, '%Y')",
+}
+
+MENSAJE_AGRUPACION_INVALIDA = 'La agrupación debe ser "dia", "semana", "mes", "trimestre" o "año".'
+
+
+def _a_fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor)
+    # Las etiquetas de mes ('YYYY-MM') se toman como el primer día del mes
+    return datetime.strptime(texto, '%Y-%m' if len(texto) == 7 else '%Y-%m-%d').date()
+
+
+def etiqueta_periodo(fecha, agrupacion):
+    """Etiqueta del periodo que contiene ``fecha`` (date, 'YYYY-MM-DD' o 'YYYY-MM')."""
+    fecha = _a_fecha(fecha)
+    if agrupacion == 'dia':
+        return fecha.isoformat()
+    if agrupacion == 'semana':
+        anio, semana, _ = fecha.isocalendar()
+        return f"{anio:04d}-W{semana:02d}"
+    if agrupacion == 'mes':
+        return f"{fecha.year:04d}-{fecha.month:02d}"
+    if agrupacion == 'trimestre':
+        return f"{fecha.year:04d}-T{(fecha.month - 1) // 3 + 1}"
+    if agrupacion == 'año':
+        return f"{fecha.year:04d}"
+    raise ValueError(MENSAJE_AGRUPACION_INVALIDA)
+
+
+def periodos_del_rango(fecha_ini, fecha_fin, agrupacion='mes'):
+    """Etiquetas de todos los periodos que tocan el rango, en orden."""
+    inicio, fin = _a_fecha(fecha_ini), _a_fecha(fecha_fin)
+    if agrupacion not in AGRUPACIONES_TENDENCIA:
+        raise ValueError(MENSAJE_AGRUPACION_INVALIDA)
+    if inicio > fin:
+        return []
+    # Paso que nunca salta un periodo: un día, o una semana para las semanas
+    paso = timedelta(days=7) if agrupacion == 'semana' else timedelta(days=1)
+    periodos = []
+    dia = inicio
+    while dia <= fin:
+        etiqueta = etiqueta_periodo(dia, agrupacion)
+        if not periodos or periodos[-1] != etiqueta:
+            periodos.append(etiqueta)
+        if agrupacion in AGRUPACIONES_MENSUALES:
+            # Salta al primer día del mes siguiente
+            dia = (dia.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            dia += paso
+    # Con paso semanal la semana del último día puede quedar fuera
+    ultima = etiqueta_periodo(fin, agrupacion)
+    if periodos[-1:] != [ultima]:
+        periodos.append(ultima)
+    return periodos
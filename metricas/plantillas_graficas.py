@@ -0,0 +1,142 @@
+"""
+Protocolo compacto de las gráficas del reporte principal.
+
+Las figuras completas de Plotly repiten en cada respuesta la plantilla
+``plotly_white``, fuentes, márgenes y el texto de cada barra; casi todo el JSON es
+diseño constante. En el formato compacto el servidor envía solo las series::
+
+    {"plantilla": "reporte_principal", "version": "1",
+     "series": {"tecnicos": [...], "cumplimiento_sla": [...], "recibidos": [...],
+                "cerrados": [...], "pendientes": [...]}}
+
+y el diseño de cada gráfica (``PLANTILLAS``) se sirve aparte en
+``/graficas/plantillas/<version>/`` con caché de larga duración; ``index.html``
+arma las figuras combinando ambos. Al cambiar ``PLANTILLAS`` hay que subir
+``VERSION_PLANTILLAS`` para que los navegadores descarguen la nueva.
+
+Este módulo no importa plotly: generar las series no construye figuras.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+VERSION_PLANTILLAS = '1'
+
+META_SLA = 90
+
+COLORES = {
+    'primary': '#4CAF50',     # Verde
+    'accent': '#FFC107',      # Amarillo/Naranja
+    'recibidos': '#2196F3',   # Azul para recibidos
+    'cerrados': '#4CAF50',    # Verde para cerrados
+    'pendientes': '#F44336',  # Rojo para pendientes
+}
+
+# Parte de la plantilla plotly_white que usan estas gráficas (plotly.js no la incluye)
+_EJE_PLOTLY_WHITE = {
+    'gridcolor': '#EBF0F8', 'linecolor': '#EBF0F8', 'zerolinecolor': '#EBF0F8',
+    'zerolinewidth': 2, 'ticks': '', 'automargin': True, 'title': {'standoff': 15},
+}
+
+_DISENO_COMUN = {
+    'paper_bgcolor': 'white',
+    'plot_bgcolor': 'white',
+    'colorway': ['#636efa', '#EF553B', '#00cc96', '#ab63fa', '#FFA15A', '#19d3f3', '#FF6692', '#B6E880'],
+    'hoverlabel': {'align': 'left'},
+    'height': 600,
+    'margin': {'l': 70, 'r': 40, 't': 100, 'b': 150},
+    'font': {'family': 'Arial, sans-serif', 'size': 12, 'color': 'black'},
+    'hovermode': 'x unified',
+}
+
+
+def _eje(titulo, **extra):
+    return {**_EJE_PLOTLY_WHITE, 'title': {**_EJE_PLOTLY_WHITE['title'], 'text': titulo},
+            'tickfont': {'size': 11}, **extra}
+
+
+# Por gráfica: diseño fijo, trazas (con la serie que grafican y el formato del texto
+# de cada barra) y cómo calcular el máximo del eje Y a partir de los datos
+PLANTILLAS = {
+    'reporte_principal': {
+        'sla': {
+            'layout': {
+                **_DISENO_COMUN,
+                'title': {'text': '<b>Cumplimiento de SLA por Técnico</b>', 'font': {'size': 20}},
+                'xaxis': _eje('Técnico', tickangle=-45),
+                'yaxis': _eje('Cumplimiento (%)'),
+                'legend': {'title': {'text': 'Leyenda'}},
+                'shapes': [{
+                    'type': 'line', 'xref': 'paper', 'x0': 0, 'x1': 1, 'y0': META_SLA, 'y1': META_SLA,
+                    'line': {'width': 2, 'dash': 'dash', 'color': COLORES['accent']},
+                }],
+                'annotations': [{
+                    'xref': 'paper', 'x': 1, 'y': META_SLA, 'xanchor': 'right', 'yanchor': 'top',
+                    'text': f'Meta SLA ({META_SLA}%)', 'showarrow': False,
+                }],
+            },
+            'trazas': [
+                {'serie': 'cumplimiento_sla', 'texto': 'porcentaje', 'type': 'bar', 'name': 'Cumplimiento SLA',
+                 'marker': {'color': COLORES['primary']}, 'textposition': 'outside', 'hoverinfo': 'x+y'},
+            ],
+            # max(minimo, mayor valor * factor) + margen
+            'rango_y': {'minimo': 110, 'factor': 1.2, 'margen': 5},
+        },
+        'volumen': {
+            'layout': {
+                **_DISENO_COMUN,
+                'title': {'text': '<b>Volumen de Tickets por Técnico</b>', 'font': {'size': 20}},
+                'xaxis': _eje('Técnico', tickangle=-45),
+                'yaxis': _eje('Cantidad de Tickets'),
+                'legend': {'title': {'text': 'Tipo de Ticket'}},
+                'barmode': 'group',
+            },
+            'trazas': [
+                {'serie': 'recibidos', 'texto': 'entero', 'type': 'bar', 'name': 'Recibidos',
+                 'marker': {'color': COLORES['recibidos']}, 'textposition': 'auto', 'hoverinfo': 'x+y'},
+                {'serie': 'cerrados', 'texto': 'entero', 'type': 'bar', 'name': 'Cerrados',
+                 'marker': {'color': COLORES['cerrados']}, 'textposition': 'auto', 'hoverinfo': 'x+y'},
+                {'serie': 'pendientes', 'texto': 'entero', 'type': 'bar', 'name': 'Pendientes SLA',
+                 'marker': {'color': COLORES['pendientes']}, 'textposition': 'auto', 'hoverinfo': 'x+y'},
+            ],
+            'rango_y': {'minimo': 0, 'factor': 1.2, 'margen': 5},
+        },
+    },
+}
+
+
+def _numero(item, columna):
+    valor = item.get(columna, 0)
+    try:
+        # Maneja None y cadenas vacías explícitamente
+        return float(valor) if valor not in (None, '') else 0.0
+    except (ValueError, TypeError):
+        # Si la conversión falla (ej. si es un string no numérico), registra y usa 0
+        logger.warning(f"Valor inválido para '{columna}': {valor}. Usando 0.")
+        return 0.0
+
+
+def nombre_corto(nombre_completo):
+    """Primer nombre y primer apellido, para que las etiquetas del eje X se lean."""
+    partes_nombre = (nombre_completo or '').split()
+    return f"{partes_nombre[0]} {partes_nombre[1]}" if len(partes_nombre) > 1 else (nombre_completo or '')
+
+
+def series_reporte_principal(report_data):
+    """Series de las gráficas a partir de las filas del reporte principal."""
+    return {
+        'tecnicos': [nombre_corto(item.get('Tecnico_Asignado', 'Desconocido')) for item in report_data],
+        'cumplimiento_sla': [round(_numero(item, 'Cumplimiento SLA'), 2) for item in report_data],
+        'recibidos': [int(_numero(item, 'Cant_tickets_recibidos')) for item in report_data],
+        'cerrados': [int(_numero(item, 'Cant_tickets_cerrados')) for item in report_data],
+        'pendientes': [int(_numero(item, 'tickets_pendientes_SLA')) for item in report_data],
+    }
+
+
+def grafica_compacta(report_data):
+    """Respuesta en formato compacto (series + id y versión de la plantilla)."""
+    return {
+        'plantilla': 'reporte_principal',
+        'version': VERSION_PLANTILLAS,
+        'series': series_reporte_principal(report_data),
+    }
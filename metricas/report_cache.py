@@ -0,0 +1,332 @@
+"""
+Caché de resultados de reportes en dos niveles.
+
+- Nivel 1: LRU en memoria del proceso (acceso inmediato, acotado en entradas).
+- Nivel 2: directorio en disco compartido por todos los workers de gunicorn
+  (no hay Redis disponible). Cada entrada es un archivo pickle escrito de forma
+  atómica (archivo temporal + ``os.replace``).
+
+La vigencia depende del rango consultado (ver ``ttl_para_rango``): los rangos que
+tocan el día de hoy caducan pronto, los de días ya pasados del mes en curso duran
+algo más y los que solo abarcan meses cerrados no caducan. El disco se acota con
+``MAX_ENTRADAS_DISCO`` por espacio de nombres: al superarlo se borran las entradas
+escritas o leídas hace más tiempo (por fecha de modificación del archivo).
+
+Las invalidaciones borran los archivos de disco y actualizan un archivo marcador
+de generación; los demás procesos lo detectan y vacían su nivel en memoria.
+
+La configuración se lee de ``settings.REPORT_CACHE`` (ver ``DEFAULT_CACHE_CONFIG``).
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ZONA_HORARIA_REPORTES = ZoneInfo('America/Caracas')
+
+DEFAULT_CACHE_CONFIG = {
+    'ACTIVO': True,
+    'DIRECTORIO': None,            # Por defecto BASE_DIR / 'cache_reportes'
+    'MAX_ENTRADAS_MEMORIA': 64,    # Entradas por espacio de nombres en cada proceso
+    'MAX_ENTRADAS_DISCO': 1000,    # Archivos por espacio de nombres en disco (None = sin límite)
+    'TTL_ABIERTO': 300,            # Rangos que incluyen hoy (o fechas futuras)
+    'TTL_RECIENTE': 3600,          # Rangos ya pasados pero dentro del mes en curso
+    'TTL_CERRADO': None,           # Rangos de meses cerrados: sin vencimiento
+    'TTL_CLAVES_REPORTE': 24 * 3600,  # Claves de reporte devueltas al cliente (ver services)
+}
+
+_MARCADOR_GENERACION = '.generacion'
+
+# Escrituras de cada proceso entre comprobaciones de MAX_ENTRADAS_DISCO
+_ESCRITURAS_POR_RECORTE = 50
+
+
+def _config():
+    return {**DEFAULT_CACHE_CONFIG, **getattr(settings, 'REPORT_CACHE', {})}
+
+
+def _a_fecha(valor):
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+def ttl_para_rango(fecha_ini, fecha_fin, hoy=None):
+    """
+    Segundos de vigencia para un resultado calculado sobre [fecha_ini, fecha_fin]
+    (None = permanente). ``hoy`` se toma en la hora local de Caracas.
+    """
+    config = _config()
+    hoy = hoy or datetime.now(ZONA_HORARIA_REPORTES).date()
+    fin = _a_fecha(fecha_fin)
+    if fin >= hoy:
+        return config['TTL_ABIERTO']
+    if fin < hoy.replace(day=1):
+        return config['TTL_CERRADO']
+    return config['TTL_RECIENTE']
+
+
+class ReportCache:
+    """Caché de dos niveles (memoria LRU + disco) para un espacio de nombres."""
+
+    def __init__(self, namespace, directorio, max_entradas=64, max_entradas_disco=None):
+        self.namespace = namespace
+        self.directorio = Path(directorio) / namespace
+        self.max_entradas = max(1, int(max_entradas))
+        self.max_entradas_disco = max(1, int(max_entradas_disco)) if max_entradas_disco is not None else None
+
+        self._memoria = OrderedDict()  # clave -> (expira, valor)
+        self._lock = threading.Lock()
+        self._generacion = None
+
+        self._hits_memoria = 0
+        self._hits_disco = 0
+        self._misses = 0
+        self._escrituras = 0
+        self._invalidaciones = 0
+
+    # --- Claves ---
+
+    def clave(self, **params):
+        """Clave estable (independiente del orden de los parámetros)."""
+        texto = json.dumps(params, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha1(f'{self.namespace}:{texto}'.encode('utf-8')).hexdigest()
+
+    def _ruta(self, clave):
+        return self.directorio / f'{clave}.pkl'
+
+    # --- Coherencia entre procesos ---
+
+    def _leer_generacion(self):
+        try:
+            return os.stat(self.directorio / _MARCADOR_GENERACION).st_mtime_ns
+        except OSError:
+            return None
+
+    def _sincronizar_generacion(self):
+        """Vacía el nivel en memoria si otro proceso invalidó entradas."""
+        generacion = self._leer_generacion()
+        if generacion != self._generacion:
+            self._memoria.clear()
+            self._generacion = generacion
+
+    def _avanzar_generacion(self):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        marcador = self.directorio / _MARCADOR_GENERACION
+        marcador.write_text(str(time.time_ns()))
+        self._generacion = self._leer_generacion()
+
+    # --- Lectura / escritura ---
+
+    def get(self, clave):
+        """Devuelve el valor almacenado o None si no existe o ya venció."""
+        ahora = time.time()
+        with self._lock:
+            self._sincronizar_generacion()
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                expira, valor = entrada
+                if expira is None or expira > ahora:
+                    self._memoria.move_to_end(clave)
+                    self._hits_memoria += 1
+                    return valor
+                del self._memoria[clave]
+
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'rb') as f:
+                entrada = pickle.load(f)
+        except FileNotFoundError:
+            entrada = None
+        except Exception as e:
+            logger.warning(f"Entrada de caché ilegible en {ruta}; se descarta: {e}")
+            self._borrar_archivo(ruta)
+            entrada = None
+
+        if entrada is not None:
+            expira = entrada['expira']
+            if expira is None or expira > ahora:
+                with self._lock:
+                    self._guardar_en_memoria(clave, expira, entrada['valor'])
+                    self._hits_disco += 1
+                self._tocar_archivo(ruta)
+                return entrada['valor']
+            self._borrar_archivo(ruta)
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, clave, valor, ttl=None, params=None):
+        """Guarda un valor en ambos niveles. ``ttl`` en segundos (None = permanente)."""
+        expira = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._guardar_en_memoria(clave, expira, valor)
+            self._escrituras += 1
+            recortar = self._escrituras % _ESCRITURAS_POR_RECORTE == 0
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump({'expira': expira, 'params': params, 'valor': valor}, f,
+                                protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self._ruta(clave))
+            except BaseException:
+                self._borrar_archivo(tmp)
+                raise
+        except OSError as e:
+            # El nivel en disco es una optimización: un fallo no debe romper el reporte
+            logger.warning(f"No se pudo escribir la caché '{self.namespace}' en disco: {e}")
+        if recortar:
+            self.recortar_disco()
+
+    def _guardar_en_memoria(self, clave, expira, valor):
+        self._memoria[clave] = (expira, valor)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    @staticmethod
+    def _borrar_archivo(ruta):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _tocar_archivo(ruta):
+        """Actualiza la fecha de modificación: las entradas leídas son las últimas en borrarse."""
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+
+    # --- Invalidación ---
+
+    def invalidar(self, clave):
+        """Elimina una entrada en todos los procesos."""
+        with self._lock:
+            self._memoria.pop(clave, None)
+            self._invalidaciones += 1
+        self._borrar_archivo(self._ruta(clave))
+        self._avanzar_generacion()
+
+    def invalidar_todo(self):
+        """Elimina todas las entradas del espacio de nombres en todos los procesos."""
+        with self._lock:
+            self._memoria.clear()
+            self._invalidaciones += 1
+        if self.directorio.exists():
+            for ruta in self.directorio.glob('*.pkl'):
+                self._borrar_archivo(ruta)
+        self._avanzar_generacion()
+
+    def purgar_vencidas(self):
+        """
+        Borra del disco las entradas vencidas y, si aún superan ``max_entradas_disco``,
+        las más antiguas. Devuelve cuántas se borraron.
+        """
+        borradas = 0
+        ahora = time.time()
+        if not self.directorio.exists():
+            return borradas
+        for ruta in self.directorio.glob('*.pkl'):
+            try:
+                with open(ruta, 'rb') as f:
+                    expira = pickle.load(f)['expira']
+            except Exception:
+                expira = 0
+            if expira is not None and expira <= ahora:
+                self._borrar_archivo(ruta)
+                borradas += 1
+        return borradas + self.recortar_disco()
+
+    def recortar_disco(self):
+        """
+        Borra las entradas de disco con la fecha de modificación más antigua hasta
+        quedar en ``max_entradas_disco``. No abre los archivos. Devuelve cuántas se borraron.
+        """
+        if self.max_entradas_disco is None:
+            return 0
+        archivos = []
+        try:
+            with os.scandir(self.directorio) as entradas:
+                for entrada in entradas:
+                    if entrada.name.endswith('.pkl'):
+                        try:
+                            archivos.append((entrada.stat().st_mtime_ns, entrada.path))
+                        except OSError:
+                            pass
+        except OSError:
+            return 0
+        sobrantes = len(archivos) - self.max_entradas_disco
+        if sobrantes <= 0:
+            return 0
+        archivos.sort()
+        for _, ruta in archivos[:sobrantes]:
+            self._borrar_archivo(ruta)
+        # Los demás procesos pueden tener en memoria entradas que ya no están en disco;
+        # se mantienen hasta que venzan o salgan del LRU (no hace falta avanzar la generación)
+        return sobrantes
+
+    def stats(self):
+        """Contadores de este proceso."""
+        with self._lock:
+            consultas = self._hits_memoria + self._hits_disco + self._misses
+            return {
+                'entradas_memoria': len(self._memoria),
+                'hits_memoria': self._hits_memoria,
+                'hits_disco': self._hits_disco,
+                'misses': self._misses,
+                'tasa_aciertos': round((self._hits_memoria + self._hits_disco) / consultas, 4) if consultas else 0.0,
+                'escrituras': self._escrituras,
+                'invalidaciones': self._invalidaciones,
+            }
+
+
+# --- Registro de cachés por espacio de nombres ---
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace):
+    """Devuelve (creándola si hace falta) la caché del espacio de nombres indicado."""
+    cache = _caches.get(namespace)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(namespace)
+            if cache is None:
+                config = _config()
+                directorio = config['DIRECTORIO'] or Path(settings.BASE_DIR) / 'cache_reportes'
+                cache = ReportCache(namespace, directorio, config['MAX_ENTRADAS_MEMORIA'],
+                                    config['MAX_ENTRADAS_DISCO'])
+                _caches[namespace] = cache
+    return cache
+
+
+def ttl_claves_reporte():
+    """Vigencia de las claves de reporte: mientras el usuario mira el reporte sin regenerarlo."""
+    return _config()['TTL_CLAVES_REPORTE']
+
+
+def cache_activa():
+    return bool(_config()['ACTIVO'])
+
+
+def cache_stats():
+    """Contadores de todas las cachés creadas en este proceso."""
+    return {namespace: cache.stats() for namespace, cache in list(_caches.items())}
@@ -0,0 +1,218 @@
+"""
+Reporte principal en PDF generado en el servidor con reportlab.
+
+Sustituye la exportación con jsPDF en el navegador: la tabla de indicadores y las
+gráficas de cumplimiento SLA y de volumen (recibidos/cerrados) se dibujan como
+gráficos vectoriales de ``reportlab.graphics``, sin rasterizar nada. El PDF se
+guarda en la caché de reportes (espacio ``reporte_pdf``) con los mismos parámetros
+y vigencia que el reporte principal, de modo que volver a exportar el mismo
+reporte solo lee el archivo ya generado.
+"""
+import io
+import logging
+from datetime import datetime
+
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A3, landscape
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from .plantillas_graficas import nombre_corto
+from .report_cache import get_cache, cache_activa, ttl_para_rango, ZONA_HORARIA_REPORTES
+from .services import ReportGenerator
+
+logger = logging.getLogger(__name__)
+
+# Técnicos por gráfica: con más barras las etiquetas dejan de leerse
+TECNICOS_POR_GRAFICA = 40
+
+# Mismos colores y umbrales que la tabla de la interfaz
+COLOR_ENCABEZADO = colors.Color(42 / 255, 157 / 255, 143 / 255)
+COLOR_FILA_ALTERNA = colors.Color(245 / 255, 245 / 255, 245 / 255)
+COLOR_TOTALES = colors.Color(220 / 255, 220 / 255, 220 / 255)
+COLOR_BIEN = colors.Color(0, 100 / 255, 0)
+COLOR_MAL = colors.Color(170 / 255, 0, 0)
+COLOR_RECIBIDOS = colors.Color(38 / 255, 70 / 255, 83 / 255)
+COLOR_CERRADOS = colors.Color(233 / 255, 196 / 255, 106 / 255)
+UMBRAL_CUMPLIMIENTO = 90
+UMBRAL_REABIERTOS = 5
+
+TITULOS_TABLA = [
+    'Técnico', 'Cerrados SLA', 'Total SLA', 'Pendientes', 'Cumplimiento',
+    'Total Cerrados', 'Recibidos', 'Reabiertos', '% Reabiertos',
+]
+
+
+def _entero(valor):
+    try:
+        return int(valor or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _decimal(valor):
+    try:
+        return float(valor or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _totales(filas):
+    """Fila de totales calculada igual que en la interfaz (cumplimiento global incluye pendientes)."""
+    cerrados_sla = sum(_entero(f['Cerrados_dentro_SLA']) for f in filas)
+    con_sla = sum(_entero(f['Cerrados_con_SLA']) for f in filas)
+    pendientes = sum(_entero(f['tickets_pendientes_SLA']) for f in filas)
+    cerrados = sum(_entero(f['Cant_tickets_cerrados']) for f in filas)
+    recibidos = sum(_entero(f['Cant_tickets_recibidos']) for f in filas)
+    reabiertos = sum(_entero(f['Reabiertos']) for f in filas)
+    cumplimiento = cerrados_sla / (con_sla + pendientes) * 100 if con_sla + pendientes else 0
+    proporcion = reabiertos / cerrados * 100 if cerrados else 0
+    return ['TOTAL', cerrados_sla, con_sla, pendientes, f'{cumplimiento:.2f}%',
+            cerrados, recibidos, reabiertos, f'{proporcion:.2f}%']
+
+
+def _tabla_indicadores(filas):
+    datos = [TITULOS_TABLA]
+    estilos = [
+        ('BACKGROUND', (0, 0), (-1, 0), COLOR_ENCABEZADO),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (4, 1), (4, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (8, 1), (8, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.Color(80 / 255, 80 / 255, 80 / 255)),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, COLOR_FILA_ALTERNA]),
+        ('BACKGROUND', (0, -1), (-1, -1), COLOR_TOTALES),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ]
+    for indice, fila in enumerate(filas, start=1):
+        cumplimiento = _decimal(fila['Cumplimiento SLA'])
+        proporcion = _decimal(fila['Proporción Reabiertos/Cerrados (%)'])
+        datos.append([
+            fila['Tecnico_Asignado'],
+            _entero(fila['Cerrados_dentro_SLA']),
+            _entero(fila['Cerrados_con_SLA']),
+            _entero(fila['tickets_pendientes_SLA']),
+            f'{cumplimiento:.2f}%',
+            _entero(fila['Cant_tickets_cerrados']),
+            _entero(fila['Cant_tickets_recibidos']),
+            _entero(fila['Reabiertos']),
+            f'{proporcion:.2f}%',
+        ])
+        estilos.append(('TEXTCOLOR', (4, indice), (4, indice),
+                        COLOR_BIEN if cumplimiento >= UMBRAL_CUMPLIMIENTO else COLOR_MAL))
+        estilos.append(('TEXTCOLOR', (8, indice), (8, indice),
+                        COLOR_BIEN if proporcion <= UMBRAL_REABIERTOS else COLOR_MAL))
+    datos.append(_totales(filas))
+    anchos = [9 * cm] + [3.6 * cm] * 8
+    # repeatRows repite el encabezado en cada página
+    return Table(datos, colWidths=anchos, repeatRows=1, style=TableStyle(estilos))
+
+
+def _grafica_barras(titulo, nombres, series, colores, etiquetas, ancho, alto, valor_maximo=None):
+    """Gráfica de barras vectorial con una serie por lista de ``series``."""
+    dibujo = Drawing(ancho, alto)
+    dibujo.add(String(ancho / 2, alto - 16, titulo, fontName='Helvetica-Bold', fontSize=13, textAnchor='middle'))
+
+    grafica = VerticalBarChart()
+    grafica.x, grafica.y = 50, 110
+    grafica.width, grafica.height = ancho - 80, alto - 160
+    grafica.data = series
+    grafica.categoryAxis.categoryNames = nombres
+    grafica.categoryAxis.labels.angle = 60
+    grafica.categoryAxis.labels.boxAnchor = 'ne'
+    grafica.categoryAxis.labels.fontSize = 7
+    grafica.valueAxis.valueMin = 0
+    if valor_maximo is not None:
+        grafica.valueAxis.valueMax = valor_maximo
+    grafica.valueAxis.labels.fontSize = 8
+    grafica.groupSpacing = 4
+    for indice, color in enumerate(colores):
+        grafica.bars[indice].fillColor = color
+        grafica.bars[indice].strokeColor = None
+    dibujo.add(grafica)
+
+    if len(series) > 1:
+        leyenda = Legend()
+        leyenda.x, leyenda.y = ancho - 160, alto - 30
+        leyenda.fontSize = 9
+        leyenda.colorNamePairs = list(zip(colores, etiquetas))
+        dibujo.add(leyenda)
+    return dibujo
+
+
+def _graficas(filas, ancho, alto):
+    """Gráficas de cumplimiento SLA y de volumen, en bloques de TECNICOS_POR_GRAFICA técnicos."""
+    elementos = []
+    for inicio in range(0, len(filas), TECNICOS_POR_GRAFICA):
+        bloque = filas[inicio:inicio + TECNICOS_POR_GRAFICA]
+        nombres = [nombre_corto(f['Tecnico_Asignado']) for f in bloque]
+        sufijo = f" ({inicio + 1}-{inicio + len(bloque)} de {len(filas)})" if len(filas) > TECNICOS_POR_GRAFICA else ''
+        elementos.append(_grafica_barras(
+            f'Cumplimiento SLA (%){sufijo}', nombres,
+            [[_decimal(f['Cumplimiento SLA']) for f in bloque]],
+            [COLOR_ENCABEZADO], ['Cumplimiento SLA'], ancho, alto / 2 - 10, valor_maximo=100,
+        ))
+        elementos.append(_grafica_barras(
+            f'Tickets recibidos y cerrados{sufijo}', nombres,
+            [[_entero(f['Cant_tickets_recibidos']) for f in bloque],
+             [_entero(f['Cant_tickets_cerrados']) for f in bloque]],
+            [COLOR_RECIBIDOS, COLOR_CERRADOS], ['Recibidos', 'Cerrados'], ancho, alto / 2 - 10,
+        ))
+        elementos.append(PageBreak())
+    return elementos[:-1]
+
+
+def renderizar_pdf(filas, fecha_ini, fecha_fin):
+    """Bytes del PDF (A3 apaisado) con la tabla de indicadores y las gráficas del reporte."""
+    salida = io.BytesIO()
+    margen = 1.5 * cm
+    documento = SimpleDocTemplate(
+        salida, pagesize=landscape(A3), leftMargin=margen, rightMargin=margen,
+        topMargin=margen, bottomMargin=margen,
+        title='Reporte de Indicadores de Rendimiento', author='Reportes GLPI',
+    )
+    estilos = getSampleStyleSheet()
+    elementos = [
+        Paragraph('Reporte de Indicadores de Rendimiento', estilos['Title']),
+        Paragraph(f'Rango de fechas: {fecha_ini} a {fecha_fin}', estilos['Heading2']),
+        Paragraph(f'Generado: {datetime.now(ZONA_HORARIA_REPORTES):%Y-%m-%d %H:%M}', estilos['Normal']),
+        Spacer(1, 0.5 * cm),
+        _tabla_indicadores(filas),
+    ]
+    if filas:
+        elementos.append(PageBreak())
+        elementos.extend(_graficas(filas, documento.width, documento.height))
+    documento.build(elementos)
+    return salida.getvalue()
+
+
+def generar_pdf_reporte(fecha_ini, fecha_fin, tecnicos=None):
+    """
+    PDF del reporte principal (bytes). Se sirve desde la caché ``reporte_pdf`` si
+    existe; si no, se genera a partir de ``generar_reporte_principal`` (que a su vez
+    usa la caché de resultados) y se guarda con la vigencia del rango.
+    """
+    if not cache_activa():
+        return renderizar_pdf(ReportGenerator.generar_reporte_principal(fecha_ini, fecha_fin, tecnicos), fecha_ini, fecha_fin)
+
+    cache = get_cache('reporte_pdf')
+    params_cache = ReportGenerator._params_cache_reporte(fecha_ini, fecha_fin, tecnicos)
+    clave = cache.clave(**params_cache)
+    pdf = cache.get(clave)
+    if pdf is not None:
+        logger.debug(f"PDF del reporte {fecha_ini} a {fecha_fin} servido desde caché")
+        return pdf
+
+    filas = ReportGenerator.generar_reporte_principal(fecha_ini, fecha_fin, tecnicos)
+    pdf = renderizar_pdf(filas, fecha_ini, fecha_fin)
+    cache.set(clave, pdf, ttl_para_rango(fecha_ini, fecha_fin), params=params_cache)
+    logger.info(f"PDF del reporte {fecha_ini} a {fecha_fin} generado: {len(filas)} técnicos, {len(pdf)} bytes")
+    return pdf
@@ -1,45 +1,235 @@
 import mysql.connector
-import pandas as pd
 from django.conf import settings
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta, timezone as dt_timezone
 import calendar
+import json
+import re
 import logging # Añadir logging
+import contextvars
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+from django.core.exceptions import ImproperlyConfigured
+from .glpi_db import glpi_connection, get_pool
+from .instrumentacion import etapa, sentencia
+from .report_cache import get_cache, cache_activa, ttl_para_rango, ttl_claves_reporte, ZONA_HORARIA_REPORTES
+from .dimensiones import (resolver_ids_tecnicos, ids_entidades_elegibles, condicion_in, condicion_tecnicos,
+                          filtro_tecnicos, tecnicos_con_perfil, EquipoGLPI, PERFIL_TECNICO)
+from .agregados import reporte_principal_local, tendencia_tecnico_local, tendencia_tecnicos_local, tendencia_sla_local
+from .instantaneas import (reporte_principal_instantaneas, reabiertos_instantaneas, tendencia_sla_instantaneas,
+                           cubre_rango, instantaneas_activas)
+from .periodos import periodos_del_rango, EXPRESIONES_SQL_PERIODO
+from .plantillas_graficas import grafica_compacta
 
 class DatabaseConnector:
     @staticmethod
-    def get_connection():
-        return mysql.connector.connect(
-            user=settings.DATABASES['glpi']['USER'],
-            password=settings.DATABASES['glpi']['PASSWORD'],
-            host=settings.DATABASES['glpi']['HOST'],
-            database=settings.DATABASES['glpi']['NAME'],
-            port=int(settings.DATABASES['glpi']['PORT'])
-        )
+    def connection():
+        """
+        Presta una conexión del pool GLPI del proceso (ver metricas/glpi_db.py).
+        Debe usarse como context manager: ``with DatabaseConnector.connection() as conn:``
+        """
+        return glpi_connection()
 
 # Configurar logger para services
 logger = logging.getLogger(__name__)
 
+# Motores SQL disponibles para el reporte principal (settings.REPORT_ENGINE)
+MOTORES_REPORTE = ('subconsultas', 'agregacion')
+
+# Origen de los datos de reportes (settings.REPORT_SOURCE): GLPI en vivo o el
+# almacén local de agregados diarios (ver metricas/agregados.py)
+FUENTES_REPORTE = ('glpi', 'local')
+
+# Columnas del reporte principal, en el orden en que las devuelven ambos motores
+COLUMNAS_REPORTE_PRINCIPAL = [
+    "Tecnico_Asignado", "Cerrados_dentro_SLA", "Cerrados_con_SLA",
+    "tickets_pendientes_SLA", "Cumplimiento SLA", "Cant_tickets_cerrados",
+    "Cant_tickets_recibidos", "Reabiertos", "Proporción Reabiertos/Cerrados (%)"
+]
+
+# Espacios de la caché de reportes derivados del reporte principal (resultados, PDF
+# generado y JSON de las gráficas, ver metricas/reporte_pdf.py y metricas/plantillas_graficas.py);
+# se invalidan juntos
+ESPACIOS_CACHE_REPORTE = ('reporte_principal', 'reporte_pdf', 'reporte_graficas')
+
+# Espacio de la caché que asocia cada clave de reporte (devuelta por /generar-reporte/)
+# con los parámetros del reporte
+ESPACIO_CLAVES_REPORTE = 'reporte_claves'
+
+# Columnas del detalle de tickets reabiertos
+COLUMNAS_TICKETS_REABIERTOS = ['Nro_Ticket', 'Fecha_Reapertura', 'Fecha_Apertura', 'Tecnico_Asignado']
+
+# Columnas de la consulta de tendencia SLA, en orden
+COLUMNAS_TENDENCIA_SLA = ['periodo', 'tecnico', 'cerrados_dentro_sla', 'cerrados_con_sla', 'pendientes_sla', 'cumplimiento']
+
+
+def _a_fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+def rango_utc(fecha_ini, fecha_fin):
+    """
+    Límites UTC del rango de días locales (hora de Caracas) [fecha_ini, fecha_fin].
+
+    Devuelve ``(desde, hasta)`` como datetimes sin zona horaria en UTC, que es como
+    GLPI guarda sus columnas de fecha, para usarlos en un intervalo semiabierto:
+
+        AND gt.date >= %s AND gt.date < %s
+
+    La conversión se hace una sola vez en Python: la columna se compara sin
+    envolverla en CONVERT_TZ y el predicado puede usar su índice. Esto solo quita
+    CONVERT_TZ de los filtros: las proyecciones y GROUP BY por día local lo siguen
+    usando y requieren las tablas de zonas horarias de MySQL. ``hasta`` es la medianoche
+    local del día siguiente a fecha_fin, así no se pierden los segundos
+    fraccionarios posteriores a las 23:59:59.
+    """
+    inicio = datetime.combine(_a_fecha(fecha_ini), time.min, tzinfo=ZONA_HORARIA_REPORTES)
+    fin = datetime.combine(_a_fecha(fecha_fin) + timedelta(days=1), time.min, tzinfo=ZONA_HORARIA_REPORTES)
+    return (inicio.astimezone(dt_timezone.utc).replace(tzinfo=None),
+            fin.astimezone(dt_timezone.utc).replace(tzinfo=None))
+
+
+def concurrencia_consultas():
+    """Máximo de consultas GLPI simultáneas por petición (settings.REPORT_CONCURRENCY)."""
+    concurrencia = getattr(settings, 'REPORT_CONCURRENCY', 1)
+    if not isinstance(concurrencia, int) or concurrencia < 1:
+        raise ImproperlyConfigured(f"REPORT_CONCURRENCY={concurrencia!r} debe ser un entero mayor o igual a 1.")
+    return concurrencia
+
+
+def _ejecutar_consulta(nombre, query, params, dictionary):
+    """Ejecuta una consulta con su propia conexión del pool. Devuelve (filas, segundos)."""
+    inicio = perf_counter()
+    with glpi_connection() as conn, sentencia(nombre):
+        cursor = conn.cursor(dictionary=dictionary)
+        cursor.execute(query, params)
+        filas = cursor.fetchall()
+        cursor.close()
+    return filas, perf_counter() - inicio
+
+
+def ejecutar_consultas(consultas, concurrencia=None, dictionary=True):
+    """
+    Ejecuta consultas independientes ``{nombre: (query, params)}`` y devuelve
+    ``{nombre: filas}``.
+
+    Con concurrencia mayor que 1 cada consulta se ejecuta en un hilo con su propia
+    conexión del pool, hasta ``concurrencia`` a la vez (por defecto
+    settings.REPORT_CONCURRENCY, acotada al tamaño del pool). Con 1 se ejecutan en
+    secuencia. Se registra el tiempo real frente a la suma de los tiempos individuales.
+    """
+    concurrencia = concurrencia or concurrencia_consultas()
+    hilos = max(1, min(concurrencia, len(consultas), get_pool().size))
+    inicio = perf_counter()
+    if hilos == 1:
+        medidas = {nombre: _ejecutar_consulta(nombre, query, params, dictionary)
+                   for nombre, (query, params) in consultas.items()}
+    else:
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='consulta-glpi') as executor:
+            # Cada hilo corre con una copia del contexto: sus sentencias cuentan en la
+            # instrumentación de la petición (ver metricas/instrumentacion.py)
+            futuros = {nombre: executor.submit(contextvars.copy_context().run, _ejecutar_consulta,
+                                               nombre, query, params, dictionary)
+                       for nombre, (query, params) in consultas.items()}
+            medidas = {nombre: futuro.result() for nombre, futuro in futuros.items()}
+    total = perf_counter() - inicio
+
+    suma = sum(segundos for _, segundos in medidas.values())
+    detalle = ', '.join(f"{nombre}={segundos * 1000:.0f}" for nombre, (_, segundos) in medidas.items())
+    logger.info(
+        f"{len(consultas)} consultas con {hilos} hilo(s): {total * 1000:.0f} ms reales, "
+        f"{suma * 1000:.0f} ms en secuencia ({detalle} ms); ahorro {(suma - total) * 1000:.0f} ms"
+    )
+    return {nombre: filas for nombre, (filas, _) in medidas.items()}
+
+
+def tamano_lote_streaming():
+    """Filas que se leen por cada fetchmany() en modo streaming (settings.REPORT_STREAM_BATCH_SIZE)."""
+    tamano = getattr(settings, 'REPORT_STREAM_BATCH_SIZE', 500)
+    if not isinstance(tamano, int) or tamano < 1:
+        raise ImproperlyConfigured(f"REPORT_STREAM_BATCH_SIZE={tamano!r} debe ser un entero mayor o igual a 1.")
+    return tamano
+
+
+def iterar_consulta(query, params, columnas=None, tamano_lote=None, nombre=None):
+    """
+    Generador que ejecuta una consulta GLPI y entrega sus filas por lotes de
+    ``fetchmany`` desde un cursor sin búfer: el resultado completo nunca está en
+    memoria del proceso. Con ``columnas`` cada fila se entrega como dict con esas
+    claves; sin ellas, como dict con los nombres de columna del SELECT.
+
+    La conexión del pool queda prestada hasta que el generador se agota o se
+    cierra; si se cierra antes de leer todas las filas (p. ej. el cliente cortó la
+    respuesta) la conexión se descarta en lugar de devolverse con resultados sin leer.
+    ``nombre`` identifica la sentencia en la instrumentación (metricas/instrumentacion.py).
+    """
+    tamano_lote = tamano_lote or tamano_lote_streaming()
+    filas_totales = 0
+    inicio = perf_counter()
+    with glpi_connection() as conn:
+        cursor = conn.cursor(buffered=False, dictionary=columnas is None)
+        try:
+            with sentencia(nombre):
+                cursor.execute(query, params)
+            while True:
+                lote = cursor.fetchmany(tamano_lote)
+                if not lote:
+                    break
+                filas_totales += len(lote)
+                for fila in lote:
+                    yield dict(zip(columnas, fila)) if columnas is not None else fila
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                # Con resultados sin leer el conector puede negarse a cerrar el cursor;
+                # el pool descartará la conexión al devolverla
+                pass
+    logger.info(f"Consulta en streaming: {filas_totales} filas en {(perf_counter() - inicio) * 1000:.0f} ms")
+
+
+def periodos_tendencia_sla(fecha_ini, fecha_fin, agrupacion='mes'):
+    """Periodos del rango con las etiquetas de la consulta de tendencia SLA (ver metricas/periodos.py)."""
+    return periodos_del_rango(fecha_ini, fecha_fin, agrupacion)
+
+
+def pivotar_tendencia_sla(filas, periodos):
+    """
+    Pivota en streaming las filas de la tendencia SLA (ordenadas por técnico) en
+    una fila por técnico: ``{'tecnico': ..., periodo: cumplimiento, ...}``.
+    Se calcula igual que la vista sin streaming; los periodos sin datos del
+    técnico quedan en 0.0. Solo mantiene en memoria las filas de un técnico.
+    """
+    actual = None
+    for fila in filas:
+        if actual is None or fila['tecnico'] != actual['tecnico']:
+            if actual is not None:
+                yield actual
+            actual = {'tecnico': fila['tecnico'], **dict.fromkeys(periodos, 0.0)}
+        cerrados_con_sla = fila['cerrados_con_sla']
+        cumplimiento = round((fila['cerrados_dentro_sla'] / cerrados_con_sla * 100), 2) if cerrados_con_sla > 0 else 0.0
+        actual[str(fila['periodo'])] = float(cumplimiento)
+    if actual is not None:
+        yield actual
+
+
 class ReportGenerator:
     @staticmethod
     def obtener_tecnicos():
-        conn = DatabaseConnector.get_connection()
-        cursor = conn.cursor()
-        query = """
-            SELECT DISTINCT CONCAT(gu.realname, ' ', gu.firstname) 
-            FROM glpi_users gu
-            JOIN glpi_profiles_users gpu ON gu.id = gpu.users_id
-            JOIN glpi_profiles gp ON gpu.profiles_id = gp.id
-            WHERE gp.id = 10
-            ORDER BY gu.realname, gu.firstname
-        """
-        cursor.execute(query)
-        tecnicos = [r[0] for r in cursor.fetchall()]
-        cursor.close()
-        conn.close()
-        return tecnicos
+        """Nombres de los técnicos (perfil 10), servidos desde el directorio de usuarios en memoria."""
+        return tecnicos_con_perfil(PERFIL_TECNICO)
 
     @staticmethod
-    def generar_reporte_principal(fecha_ini=None, fecha_fin=None, tecnicos=None):
+    def generar_reporte_principal(fecha_ini=None, fecha_fin=None, tecnicos=None, usar_cache=True):
+        """
+        Reporte principal de métricas por técnico.
+        Los resultados se guardan en la caché de reportes (memoria + disco) con una
+        vigencia que depende del rango (ver report_cache.ttl_para_rango).
+        Con ``usar_cache=False`` se recalcula y se reemplaza la entrada en caché.
+        """
         # Si no se proporcionan fechas, usar el mes en curso
         if fecha_ini is None:
             # Primer día del mes actual
@@ -51,21 +241,208 @@ class ReportGenerator:
             today = date.today()
             _, last_day = calendar.monthrange(today.year, today.month)
             fecha_fin = date(today.year, today.month, last_day).strftime('%Y-%m-%d')
-        
-        conn = DatabaseConnector.get_connection()
-        cursor = conn.cursor()
 
-        # Construcción segura de la condición de técnicos
-        tecnicos_condicion = ""
-        params_tecnicos = []
-        if tecnicos:
-            placeholders = ', '.join(['%s'] * len(tecnicos))
-            tecnicos_condicion = f"AND CONCAT(gu.realname, ' ', gu.firstname) IN ({placeholders})"
-            params_tecnicos = tecnicos.copy()
+        if not cache_activa():
+            return ReportGenerator._calcular_reporte_principal(fecha_ini, fecha_fin, tecnicos)
 
-        # Contar correctamente las subconsultas que usan la condición (5 veces)
-        num_condiciones = 5  # ¡Corregido de 6 a 5!
-        params_tecnicos_repetidos = params_tecnicos * num_condiciones
+        cache = get_cache('reporte_principal')
+        params_cache = ReportGenerator._params_cache_reporte(fecha_ini, fecha_fin, tecnicos)
+        clave = cache.clave(**params_cache)
+        if usar_cache:
+            resultado = cache.get(clave)
+            if resultado is not None:
+                logger.debug(f"Reporte principal {fecha_ini} a {fecha_fin} servido desde caché")
+                return resultado
+
+        resultado = ReportGenerator._calcular_reporte_principal(fecha_ini, fecha_fin, tecnicos)
+        cache.set(clave, resultado, ttl_para_rango(fecha_ini, fecha_fin), params=params_cache)
+        return resultado
+
+    @staticmethod
+    def _params_cache_reporte(fecha_ini, fecha_fin, tecnicos):
+        """Parámetros que identifican un reporte principal en la caché."""
+        equipo = tecnicos if isinstance(tecnicos, EquipoGLPI) else None
+        params = {
+            'fecha_ini': fecha_ini,
+            'fecha_fin': fecha_fin,
+            # map(str): el JSON del cliente puede traer números o listas, que no se ordenan ni se hashean
+            'tecnicos': sorted(set(map(str, tecnicos))) if tecnicos and equipo is None else None,
+            'motor': ReportGenerator.motor_reporte(),
+            'fuente': ReportGenerator.fuente_reporte(),
+            'instantaneas': instantaneas_activas(),
+        }
+        if equipo is not None:
+            # Los miembros actuales entran en la clave: si el equipo cambia, no se sirve el resultado anterior
+            params.update(grupo_id=equipo.grupo_id, subgrupo_id=equipo.subgrupo_id, miembros=equipo.ids_usuarios())
+        return params
+
+    @staticmethod
+    def tecnicos_de_parametros(parametros):
+        """``tecnicos`` (lista, None o EquipoGLPI) a partir de los parámetros de una clave de reporte."""
+        if parametros.get('grupo_id') is not None or parametros.get('subgrupo_id') is not None:
+            return EquipoGLPI(grupo_id=parametros.get('grupo_id'), subgrupo_id=parametros.get('subgrupo_id'))
+        return parametros.get('tecnicos')
+
+    @staticmethod
+    def registrar_clave_reporte(fecha_ini, fecha_fin, tecnicos=None):
+        """
+        Clave opaca del reporte que el cliente usa para pedir derivados del resultado
+        ya calculado en el servidor (gráficas) sin volver a enviar la tabla. Es la
+        misma para los mismos parámetros y se guarda en la caché ``reporte_claves``
+        durante TTL_CLAVES_REPORTE. Devuelve None si la caché está desactivada.
+        """
+        if not cache_activa():
+            return None
+        cache = get_cache(ESPACIO_CLAVES_REPORTE)
+        params_cache = ReportGenerator._params_cache_reporte(fecha_ini, fecha_fin, tecnicos)
+        clave = cache.clave(**params_cache)
+        if cache.get(clave) is None:
+            cache.set(clave, params_cache, ttl_claves_reporte(), params=params_cache)
+        return clave
+
+    @staticmethod
+    def parametros_clave_reporte(clave):
+        """Parámetros ({'fecha_ini', 'fecha_fin', 'tecnicos', ...}) de una clave de reporte, o None si venció."""
+        if not cache_activa() or not re.fullmatch(r'[0-9a-f]{40}', clave or ''):
+            return None
+        return get_cache(ESPACIO_CLAVES_REPORTE).get(clave)
+
+    @staticmethod
+    def graficas_reporte_principal(fecha_ini, fecha_fin, tecnicos=None):
+        """
+        Gráficas del reporte principal en formato compacto (solo series, ver
+        metricas/plantillas_graficas.py), ya serializadas como texto JSON a partir del
+        resultado en el servidor. Se guardan en la caché ``reporte_graficas`` con los
+        parámetros y la vigencia del reporte: repetir la consulta no vuelve a serializar.
+        """
+        if not cache_activa():
+            return ReportGenerator._serializar_graficas(ReportGenerator.generar_reporte_principal(fecha_ini, fecha_fin, tecnicos))
+
+        cache = get_cache('reporte_graficas')
+        params_cache = ReportGenerator._params_cache_reporte(fecha_ini, fecha_fin, tecnicos)
+        clave = cache.clave(**params_cache)
+        graficas = cache.get(clave)
+        if graficas is not None:
+            logger.debug(f"Gráficas del reporte {fecha_ini} a {fecha_fin} servidas desde caché")
+            return graficas
+
+        graficas = ReportGenerator._serializar_graficas(ReportGenerator.generar_reporte_principal(fecha_ini, fecha_fin, tecnicos))
+        cache.set(clave, graficas, ttl_para_rango(fecha_ini, fecha_fin), params=params_cache)
+        return graficas
+
+    @staticmethod
+    def _serializar_graficas(report_data):
+        """Series compactas de las gráficas como texto JSON (etapa 'graficas' de la petición)."""
+        with etapa('graficas'):
+            return json.dumps(grafica_compacta(report_data))
+
+    @staticmethod
+    def invalidar_cache_reporte(fecha_ini=None, fecha_fin=None, tecnicos=None):
+        """
+        Invalida resultados cacheados del reporte principal en todos los procesos.
+        Sin argumentos invalida toda la caché; con fechas (y opcionalmente técnicos)
+        invalida solo esa combinación.
+        """
+        caches = [get_cache(namespace) for namespace in ESPACIOS_CACHE_REPORTE]
+        if fecha_ini is None and fecha_fin is None and tecnicos is None:
+            for cache in caches:
+                cache.invalidar_todo()
+            logger.info("Caché del reporte principal invalidada por completo")
+            return
+        if fecha_ini is None or fecha_fin is None:
+            raise ValueError("Para invalidar una entrada concreta se requieren fecha_ini y fecha_fin.")
+        params_cache = ReportGenerator._params_cache_reporte(fecha_ini, fecha_fin, tecnicos)
+        for cache in caches:
+            cache.invalidar(cache.clave(**params_cache))
+        logger.info(f"Caché del reporte principal invalidada para {fecha_ini} a {fecha_fin}")
+
+    @staticmethod
+    def _calcular_reporte_principal(fecha_ini, fecha_fin, tecnicos=None):
+        # Rangos de meses cerrados con instantánea: no se consulta GLPI
+        resultados = reporte_principal_instantaneas(fecha_ini, fecha_fin, tecnicos)
+        if resultados is not None:
+            return resultados
+
+        if ReportGenerator.fuente_reporte() == 'local':
+            ids_tecnicos = resolver_ids_tecnicos(tecnicos) if tecnicos else None
+            resultados = reporte_principal_local(fecha_ini, fecha_fin, ids_tecnicos)
+        else:
+            query, params = ReportGenerator.consulta_reporte_principal(fecha_ini, fecha_fin, tecnicos)
+
+            with DatabaseConnector.connection() as conn, sentencia('reporte_principal'):
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                resultados = cursor.fetchall()
+                cursor.close()
+
+        # Filas como diccionarios sin pasar por pandas (no se importa al cargar la aplicación)
+        return [dict(zip(COLUMNAS_REPORTE_PRINCIPAL, fila)) for fila in resultados]
+
+    @staticmethod
+    def iterar_reporte_principal(fecha_ini, fecha_fin, tecnicos=None):
+        """
+        Filas del reporte principal para respuestas en streaming.
+        Si el reporte ya está en caché (o sale de instantáneas mensuales o del almacén
+        local, de tamaño acotado) se entrega la lista completa; si no, las filas se leen
+        de GLPI por lotes sin acumularlas, por lo que el resultado no se guarda en caché.
+        """
+        if cache_activa():
+            cache = get_cache('reporte_principal')
+            resultado = cache.get(cache.clave(**ReportGenerator._params_cache_reporte(fecha_ini, fecha_fin, tecnicos)))
+            if resultado is not None:
+                return iter(resultado)
+        if ReportGenerator.fuente_reporte() == 'local' or cubre_rango('reporte_principal', fecha_ini, fecha_fin):
+            return iter(ReportGenerator.generar_reporte_principal(fecha_ini, fecha_fin, tecnicos))
+        query, params = ReportGenerator.consulta_reporte_principal(fecha_ini, fecha_fin, tecnicos)
+        return iterar_consulta(query, params, columnas=COLUMNAS_REPORTE_PRINCIPAL, nombre='reporte_principal')
+
+    @staticmethod
+    def motor_reporte():
+        """Motor SQL configurado para el reporte principal (settings.REPORT_ENGINE)."""
+        motor = getattr(settings, 'REPORT_ENGINE', 'subconsultas')
+        if motor not in MOTORES_REPORTE:
+            raise ImproperlyConfigured(
+                f"REPORT_ENGINE='{motor}' no es válido; opciones: {', '.join(MOTORES_REPORTE)}."
+            )
+        return motor
+
+    @staticmethod
+    def fuente_reporte():
+        """Origen de los datos de reportes (settings.REPORT_SOURCE): 'glpi' o 'local'."""
+        fuente = getattr(settings, 'REPORT_SOURCE', 'glpi')
+        if fuente not in FUENTES_REPORTE:
+            raise ImproperlyConfigured(
+                f"REPORT_SOURCE='{fuente}' no es válido; opciones: {', '.join(FUENTES_REPORTE)}."
+            )
+        return fuente
+
+    @staticmethod
+    def consulta_reporte_principal(fecha_ini, fecha_fin, tecnicos=None, motor=None):
+        """Devuelve (query, params) del reporte principal para el motor indicado o el configurado."""
+        motor = motor or ReportGenerator.motor_reporte()
+        if motor == 'agregacion':
+            return ReportGenerator._consulta_reporte_agregacion(fecha_ini, fecha_fin, tecnicos)
+        return ReportGenerator._consulta_reporte_subconsultas(fecha_ini, fecha_fin, tecnicos)
+
+    @staticmethod
+    def _consulta_reporte_subconsultas(fecha_ini, fecha_fin, tecnicos=None):
+        """
+        Motor original: cinco subconsultas (recibidos, cerrados, cerrados con SLA,
+        reabiertos y pendientes) unidas por el nombre del técnico.
+        """
+        # Filtros por ids enteros (técnicos resueltos por nombre o equipo y entidades elegibles)
+        filtro_asignado, params_tecnicos = "", []
+        filtro_reabiertos = ""
+        tecnicos = filtro_tecnicos(tecnicos)
+        if tecnicos is not None:
+            filtro_asignado, params_tecnicos = condicion_tecnicos('t_users_tec.users_id', tecnicos)
+            filtro_reabiertos, _ = condicion_tecnicos('gi.users_id', tecnicos)
+        filtro_entidades, params_entidades = condicion_in('gt.entities_id', ids_entidades_elegibles())
+
+        # Límites UTC precalculados: las columnas de fecha se comparan sin funciones
+        desde, hasta = rango_utc(fecha_ini, fecha_fin)
+        desde_apertura = desde - timedelta(days=90)  # Ventana de apertura de los cerrados
+        cierre_pendientes = _a_fecha(fecha_fin) + timedelta(days=1)  # Cierre supuesto de los no resueltos
 
         query = f"""
             SELECT
@@ -94,19 +471,15 @@ class ReportGenerator:
                     COUNT(DISTINCT gt.id) AS total_tickets_del_mes
                 FROM
                     glpi_tickets gt
-                JOIN glpi_entities ge ON gt.entities_id = ge.id
                 JOIN glpi_tickets_users t_users_tec ON gt.id = t_users_tec.tickets_id AND t_users_tec.type = 2
                 JOIN glpi_users gu ON t_users_tec.users_id = gu.id
                 JOIN glpi_profiles_users gpu ON gu.id = gpu.users_id
                 JOIN glpi_profiles gp ON gpu.profiles_id = gp.id
                 WHERE
                     gt.is_deleted = 0
-                    AND ge.completename IS NOT NULL
-                    AND LOCATE('@', ge.completename) = 0
-                    AND LOCATE('CASOS DUPLICADOS', UPPER(ge.completename)) = 0 
-                    AND gt.date BETWEEN CONVERT_TZ(%s, 'America/Caracas', 'UTC')
-                                    AND CONVERT_TZ(%s, 'America/Caracas', 'UTC')
-                    {tecnicos_condicion}
+                    {filtro_entidades}
+                    AND gt.date >= %s AND gt.date < %s
+                    {filtro_asignado}
                 GROUP BY tecnico_asignado
             ) AS recibidos
             LEFT JOIN (
@@ -121,11 +494,9 @@ class ReportGenerator:
                 WHERE
                     gt.is_deleted = 0
                     AND gt.status > 4
-                    AND gt.solvedate BETWEEN CONVERT_TZ(%s, 'America/Caracas', 'UTC')
-                                        AND CONVERT_TZ(%s, 'America/Caracas', 'UTC')
-                    AND gt.date BETWEEN CONVERT_TZ(%s, 'America/Caracas', 'UTC') - INTERVAL 90 DAY
-                                    AND CONVERT_TZ(%s, 'America/Caracas', 'UTC')
-                    {tecnicos_condicion}
+                    AND gt.solvedate >= %s AND gt.solvedate < %s
+                    AND gt.date >= %s AND gt.date < %s
+                    {filtro_asignado}
                 GROUP BY tecnico_asignado
             ) AS cerrados_count ON recibidos.tecnico_asignado = cerrados_count.tecnico_asignado
             LEFT JOIN (
@@ -141,11 +512,9 @@ class ReportGenerator:
                 WHERE
                     gt.is_deleted = 0
                     AND gt.status > 4
-                    AND gt.solvedate BETWEEN CONVERT_TZ(%s, 'America/Caracas', 'UTC')
-                                        AND CONVERT_TZ(%s, 'America/Caracas', 'UTC')
-                    AND gt.date BETWEEN CONVERT_TZ(%s, 'America/Caracas', 'UTC') - INTERVAL 90 DAY
-                                AND CONVERT_TZ(%s, 'America/Caracas', 'UTC')
-                    {tecnicos_condicion}
+                    AND gt.solvedate >= %s AND gt.solvedate < %s
+                    AND gt.date >= %s AND gt.date < %s
+                    {filtro_asignado}
                 GROUP BY tecnico_asignado
             ) AS cerrados_sla ON recibidos.tecnico_asignado = cerrados_sla.tecnico_asignado
             LEFT JOIN (
@@ -159,8 +528,8 @@ class ReportGenerator:
                 WHERE
                     gi.status = 4
                     AND gi.users_id_approval > 0
-                    AND CONVERT_TZ(gi.date_approval, 'UTC', 'America/Caracas') BETWEEN %s AND %s
-                    {tecnicos_condicion}
+                    AND gi.date_approval >= %s AND gi.date_approval < %s
+                    {filtro_reabiertos}
                 GROUP BY tecnico_asignado
             ) AS reabiertos ON recibidos.tecnico_asignado = reabiertos.tecnico_asignado
             LEFT JOIN (
@@ -168,10 +537,10 @@ class ReportGenerator:
                     CONCAT(gu.realname, ' ', gu.firstname) AS tecnico_asignado,
                     SUM(
                         (
-                            (YEAR(CASE WHEN gt.solvedate IS NULL THEN DATE(%s) + INTERVAL 1 DAY ELSE gt.solvedate END) - YEAR(gt.`date`)) * 12
+                            (YEAR(CASE WHEN gt.solvedate IS NULL THEN %s ELSE gt.solvedate END) - YEAR(gt.`date`)) * 12
                         ) + 
                         (
-                            MONTH(CASE WHEN gt.solvedate IS NULL THEN DATE(%s) + INTERVAL 1 DAY ELSE gt.solvedate END) - MONTH(gt.`date`)
+                            MONTH(CASE WHEN gt.solvedate IS NULL THEN %s ELSE gt.solvedate END) - MONTH(gt.`date`)
                         )
                     ) AS T_pendiente_sla_vencido
                 FROM
@@ -181,15 +550,14 @@ class ReportGenerator:
                 JOIN glpi_users gu ON t_users_tec.users_id = gu.id
                 WHERE
                     gt.is_deleted = 0
-                    AND gt.date BETWEEN CONVERT_TZ(%s, 'America/Caracas', 'UTC')
-                                    AND CONVERT_TZ(%s, 'America/Caracas', 'UTC')
+                    AND gt.date >= %s AND gt.date < %s
                     AND (
                         (gt.solvedate > gt.time_to_resolve
                         AND MONTH(gt.time_to_resolve) = MONTH(gt.date)
                         AND MONTH(gt.solvedate) != MONTH(gt.date))
                         OR gt.solvedate IS NULL
                     )
-                    {tecnicos_condicion}
+                    {filtro_asignado}
                 GROUP BY tecnico_asignado
             ) AS pendientes_sla ON recibidos.tecnico_asignado = pendientes_sla.tecnico_asignado
             ORDER BY recibidos.tecnico_asignado;
@@ -198,43 +566,282 @@ class ReportGenerator:
         # Parámetros en el orden CORRECTO (técnicos intercalados)
         params = [
             # Primer bloque (recibidos)
-            f'{fecha_ini} 00:00:00', f'{fecha_fin} 23:59:59',
+            *params_entidades,
+            desde, hasta,
             *params_tecnicos,
             
             # Segundo bloque (cerrados_count)
-            f'{fecha_ini} 00:00:00', f'{fecha_fin} 23:59:59',
-            f'{fecha_ini} 00:00:00', f'{fecha_fin} 23:59:59',
+            desde, hasta,
+            desde_apertura, hasta,
             *params_tecnicos,
             
             # Tercer bloque (cerrados_sla)
-            f'{fecha_ini} 00:00:00', f'{fecha_fin} 23:59:59',
-            f'{fecha_ini} 00:00:00', f'{fecha_fin} 23:59:59',
+            desde, hasta,
+            desde_apertura, hasta,
             *params_tecnicos,
             
             # Cuarto bloque (reabiertos)
-            f'{fecha_ini} 00:00:00', f'{fecha_fin} 23:59:59',
+            desde, hasta,
             *params_tecnicos,
             
             # Quinto bloque (pendientes_sla)
-            fecha_fin, fecha_fin,
-            f'{fecha_ini} 00:00:00', f'{fecha_fin} 23:59:59',
+            cierre_pendientes, cierre_pendientes,
+            desde, hasta,
             *params_tecnicos,
         ]
-        
-        #params = params_tecnicos_repetidos + params_fechas
-        
-        cursor.execute(query, params)
-        resultados = cursor.fetchall()
-        
-        df = pd.DataFrame(resultados, columns=[
-            "Tecnico_Asignado", "Cerrados_dentro_SLA", "Cerrados_con_SLA",
-            "tickets_pendientes_SLA", "Cumplimiento SLA", "Cant_tickets_cerrados",
-            "Cant_tickets_recibidos", "Reabiertos", "Proporción Reabiertos/Cerrados (%)"
-        ])
 
-        cursor.close()
-        conn.close()
-        return df.to_dict(orient='records')
+        return query, params
+
+    @staticmethod
+    def _consulta_reporte_agregacion(fecha_ini, fecha_fin, tecnicos=None):
+        """
+        Motor de una sola pasada: recorre una vez los tickets asignados cuya fecha de
+        apertura cae en [fecha_ini - 90 días, fecha_fin] y calcula todos los KPI con
+        agregados condicionales agrupados por id de usuario; los reabiertos salen de
+        una agregación aparte sobre glpi_itilsolutions, también por id de usuario.
+
+        Reproduce las mismas columnas y reglas que el motor de subconsultas. La única
+        diferencia posible son técnicos homónimos (mismo nombre, distinto id) asignados
+        al mismo ticket: aquí se suman sus conteos en lugar de contar el ticket una vez.
+        """
+        ini, fin = rango_utc(fecha_ini, fecha_fin)
+        ini_apertura = ini - timedelta(days=90)
+        cierre_pendientes = _a_fecha(fecha_fin) + timedelta(days=1)
+
+        filtro_tickets, params_tecnicos = "", []
+        filtro_reabiertos = ""
+        tecnicos = filtro_tecnicos(tecnicos)
+        if tecnicos is not None:
+            filtro_tickets, params_tecnicos = condicion_tecnicos('gtu.users_id', tecnicos)
+            filtro_reabiertos, _ = condicion_tecnicos('gi.users_id', tecnicos)
+        ids_entidades = ids_entidades_elegibles()
+        # Dentro del CASE no vale "AND 1 = 0": la lista vacía se traduce a una condición falsa
+        if ids_entidades:
+            entidad_elegible = f"gt.entities_id IN ({', '.join(['%s'] * len(ids_entidades))})"
+        else:
+            entidad_elegible = "1 = 0"
+
+        query = f"""
+            SELECT
+                kpi.tecnico_asignado,
+                kpi.cerrados_dentro_sla AS Cant_tickets_cerrados_dentro_SLA,
+                kpi.cerrados_con_sla AS Cant_tickets_cerrados_con_SLA,
+                kpi.pendientes_sla AS tickets_pendientes_SLA,
+                ROUND(
+                    (kpi.cerrados_dentro_sla / (kpi.cerrados_con_sla + kpi.pendientes_sla)) * 100,
+                    2
+                ) AS `Cumplimiento SLA`,
+                kpi.cerrados AS Cant_tickets_cerrados,
+                kpi.recibidos AS Cant_tickets_recibidos,
+                kpi.reabiertos AS cuenta_de_tickets_reabiertos,
+                CASE
+                    WHEN kpi.reabiertos = 0 THEN '0'
+                    ELSE ROUND(
+                        (kpi.reabiertos / COALESCE(NULLIF(kpi.cerrados, 0), 1)) * 100,
+                        2
+                    )
+                END AS `Proporción Reabiertos/Cerrados (%)`
+            FROM (
+                SELECT
+                    CONCAT(gu.realname, ' ', gu.firstname) AS tecnico_asignado,
+                    -- Los CAST conservan los mismos tipos (entero/decimal) que el motor de subconsultas
+                    CAST(SUM(CASE WHEN perfil.users_id IS NOT NULL THEN t.recibidos ELSE 0 END) AS SIGNED) AS recibidos,
+                    CAST(SUM(t.cerrados) AS SIGNED) AS cerrados,
+                    SUM(t.cerrados_dentro_sla) AS cerrados_dentro_sla,
+                    CAST(SUM(t.cerrados) AS SIGNED) AS cerrados_con_sla,
+                    SUM(t.pendientes_sla) AS pendientes_sla,
+                    CAST(COALESCE(SUM(r.reabiertos), 0) AS SIGNED) AS reabiertos
+                FROM (
+                    SELECT
+                        gtu.users_id,
+                        COUNT(DISTINCT CASE
+                            WHEN gt.date >= %s AND gt.date < %s
+                                 AND {entidad_elegible}
+                            THEN gt.id END) AS recibidos,
+                        COUNT(DISTINCT CASE
+                            WHEN gt.status > 4
+                                 AND gt.solvedate >= %s AND gt.solvedate < %s
+                            THEN gt.id END) AS cerrados,
+                        SUM(CASE
+                            WHEN gt.status > 4
+                                 AND gt.solvedate >= %s AND gt.solvedate < %s
+                                 AND gt.solvedate <= gt.time_to_resolve
+                            THEN 1 ELSE 0 END) AS cerrados_dentro_sla,
+                        SUM(CASE
+                            WHEN gt.date >= %s AND gt.date < %s
+                                 AND (
+                                    (gt.solvedate > gt.time_to_resolve
+                                    AND MONTH(gt.time_to_resolve) = MONTH(gt.date)
+                                    AND MONTH(gt.solvedate) != MONTH(gt.date))
+                                    OR gt.solvedate IS NULL
+                                 )
+                            THEN
+                                (YEAR(COALESCE(gt.solvedate, %s)) - YEAR(gt.`date`)) * 12
+                                + (MONTH(COALESCE(gt.solvedate, %s)) - MONTH(gt.`date`))
+                            ELSE 0 END) AS pendientes_sla
+                    FROM glpi_tickets gt
+                    JOIN glpi_entities ge ON gt.entities_id = ge.id
+                    JOIN glpi_tickets_users gtu ON gt.id = gtu.tickets_id AND gtu.type = 2
+                    WHERE
+                        gt.is_deleted = 0
+                        AND gt.date >= %s AND gt.date < %s
+                        {filtro_tickets}
+                    GROUP BY gtu.users_id
+                ) AS t
+                JOIN glpi_users gu ON gu.id = t.users_id
+                LEFT JOIN (
+                    SELECT DISTINCT gpu.users_id
+                    FROM glpi_profiles_users gpu
+                    JOIN glpi_profiles gp ON gpu.profiles_id = gp.id
+                ) AS perfil ON perfil.users_id = t.users_id
+                LEFT JOIN (
+                    SELECT
+                        gi.users_id,
+                        COUNT(DISTINCT gi.items_id) AS reabiertos
+                    FROM glpi_itilsolutions gi
+                    INNER JOIN glpi_tickets gt ON gi.items_id = gt.id
+                    WHERE
+                        gi.status = 4
+                        AND gi.users_id_approval > 0
+                        AND gi.date_approval >= %s AND gi.date_approval < %s
+                        {filtro_reabiertos}
+                    GROUP BY gi.users_id
+                ) AS r ON r.users_id = t.users_id
+                GROUP BY tecnico_asignado
+                HAVING SUM(CASE WHEN perfil.users_id IS NOT NULL THEN t.recibidos ELSE 0 END) > 0
+            ) AS kpi
+            ORDER BY kpi.tecnico_asignado;
+        """
+
+        params = [
+            ini, fin,            # recibidos
+            *ids_entidades,      # recibidos: entidades elegibles
+            ini, fin,            # cerrados
+            ini, fin,            # cerrados dentro de SLA
+            ini, fin,            # pendientes: fecha de apertura
+            cierre_pendientes, cierre_pendientes,  # pendientes: cierre supuesto de los no resueltos
+            ini_apertura, fin,   # rango de la pasada única (apertura - 90 días)
+            *params_tecnicos,
+            ini, fin,            # reabiertos
+            *params_tecnicos,
+        ]
+        return query, params
+
+    @staticmethod
+    def consulta_tendencia_sla(fecha_ini, fecha_fin, ids_tecnicos, agrupacion='mes', timezone='America/Caracas',
+                               orden_por_tecnico=False):
+        """
+        Devuelve (query, params) del cumplimiento de SLA por periodo (cualquier
+        agrupación de metricas/periodos.py) y técnico (ids de usuario GLPI o
+        EquipoGLPI; None = todos), usada por la tendencia SLA. Con ``orden_por_tecnico`` las filas de
+        cada técnico salen contiguas (para pivotarlas en streaming).
+        """
+        orden = "tecnico, periodo" if orden_por_tecnico else "periodo, tecnico"
+        filtro_tecnicos, params_tecnicos = condicion_tecnicos('gtu.users_id', ids_tecnicos) if ids_tecnicos is not None else ('', [])
+        group_by_clause = EXPRESIONES_SQL_PERIODO[agrupacion].format(fecha="DATE(CONVERT_TZ(gt.solvedate, 'UTC', %s))")
+
+        query_sla_tendencia = f"""
+            SELECT
+                {group_by_clause} AS periodo,
+                CONCAT(gu.realname, ' ', gu.firstname) AS tecnico,
+                SUM(CASE WHEN gt.solvedate <= gt.time_to_resolve THEN 1 ELSE 0 END) AS cerrados_dentro_sla,
+                COUNT(DISTINCT gt.id) AS cerrados_con_sla,
+                SUM(CASE 
+                    WHEN gt.solvedate IS NULL 
+                         AND gt.time_to_resolve < UTC_TIMESTAMP() 
+                         AND gt.date >= %s AND gt.date < %s
+                    THEN 1 
+                    ELSE 0 
+                END) AS pendientes_sla,
+                ROUND(
+                    (
+                        SUM(CASE WHEN gt.solvedate <= gt.time_to_resolve THEN 1 ELSE 0 END) /
+                        (COUNT(DISTINCT gt.id) + SUM(CASE 
+                                                        WHEN gt.solvedate IS NULL 
+                                                             AND gt.time_to_resolve < UTC_TIMESTAMP() 
+                                                             AND gt.date >= %s AND gt.date < %s
+                                                        THEN 1 
+                                                        ELSE 0 
+                                                    END))
+                    ) * 100, 2
+                ) AS cumplimiento
+            FROM glpi_tickets gt
+            JOIN glpi_tickets_users gtu ON gt.id = gtu.tickets_id AND gtu.type = 2
+            JOIN glpi_users gu ON gtu.users_id = gu.id
+            WHERE
+                gt.is_deleted = 0
+                AND gt.status > 4
+                AND gt.time_to_resolve IS NOT NULL -- Common condition for SLA-relevant tickets
+                {filtro_tecnicos}
+                AND (
+                    ( 
+                        gt.status > 4 -- This implies solvedate is NOT NULL
+                        AND gt.solvedate >= %s AND gt.solvedate < %s
+                    )
+                    OR
+                    ( 
+                        gt.solvedate IS NULL
+                        AND gt.time_to_resolve < UTC_TIMESTAMP() 
+                    )
+                )
+            GROUP BY periodo, tecnico
+            ORDER BY {orden};
+        """
+        # Parameters order:
+        # 1. timezone (for group_by_clause)
+        # 2. desde, hasta UTC (for gt.date in pendientes_sla SUM) - REPEATED FOR THE SQL COMPLIANCE CALCULATION
+        # 3. desde, hasta UTC (for gt.date in cumplimiento SQL calculation)
+        # 4. ids de los técnicos seleccionados (for IN clause)
+        # 5. desde, hasta UTC (for gt.solvedate in WHERE clause)
+        desde, hasta = rango_utc(fecha_ini, fecha_fin)
+        params_for_gt_date_filter = [desde, hasta]
+        params_for_solvedate_filter = [desde, hasta]
+
+        params_sla_tendencia = ([timezone] + params_for_gt_date_filter + params_for_gt_date_filter +
+                                params_tecnicos + params_for_solvedate_filter)
+        return query_sla_tendencia, params_sla_tendencia
+
+    @staticmethod
+    def filas_tendencia_sla(fecha_ini, fecha_fin, tecnicos=None, agrupacion='mes'):
+        """
+        Filas (periodo, tecnico, cerrados_dentro_sla, cerrados_con_sla) de la tendencia
+        SLA sin pivotar, desde instantáneas mensuales si cubren el rango, el almacén
+        local o GLPI. Puede haber varias filas por técnico y periodo (p. ej. meses de
+        un mismo trimestre en las instantáneas); el pivote las suma.
+        """
+        filas = tendencia_sla_instantaneas(fecha_ini, fecha_fin, tecnicos, agrupacion)
+        if filas is not None:
+            logger.debug(f"Tendencia SLA {fecha_ini} a {fecha_fin} servida desde instantáneas mensuales")
+        elif ReportGenerator.fuente_reporte() == 'local':
+            ids_tecnicos = resolver_ids_tecnicos(tecnicos) if tecnicos else None
+            filas = tendencia_sla_local(fecha_ini, fecha_fin, ids_tecnicos, agrupacion)
+        else:
+            # Ids resueltos o, para un equipo, la subconsulta por grupo
+            query, params = ReportGenerator.consulta_tendencia_sla(fecha_ini, fecha_fin, filtro_tecnicos(tecnicos), agrupacion)
+            with DatabaseConnector.connection() as conn, sentencia('tendencia_sla'):
+                # Tuplas en el orden de COLUMNAS_TENDENCIA_SLA: sin diccionarios por fila
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                filas = cursor.fetchall()
+                cursor.close()
+            return [fila[:4] for fila in filas]
+        return [(f['periodo'], f['tecnico'], f['cerrados_dentro_sla'], f['cerrados_con_sla']) for f in filas]
+
+    @staticmethod
+    def tendencia_sla(fecha_ini, fecha_fin, tecnicos=None, agrupacion='mes', todos_los_periodos=False):
+        """
+        Cuadro de tendencia SLA: una fila por técnico con el cumplimiento de cada
+        periodo (cerrados dentro de SLA / cerrados con SLA * 100; 0.0 sin datos).
+        Los periodos son los presentes en los datos, o todos los del rango con
+        ``todos_los_periodos``. El cálculo y el pivote se hacen sobre arreglos numpy
+        (ver metricas/dataframes.py), sin trabajo por fila en Python.
+        """
+        filas = ReportGenerator.filas_tendencia_sla(fecha_ini, fecha_fin, tecnicos, agrupacion)
+        # numpy se importa solo aquí (ver manage.py medir_importacion)
+        from .dataframes import pivotar_cumplimiento_sla
+        periodos = periodos_del_rango(fecha_ini, fecha_fin, agrupacion) if todos_los_periodos else None
+        with etapa('dataframe'):
+            return pivotar_cumplimiento_sla(filas, periodos)
 
     @staticmethod
     def obtener_tickets_reabiertos(tecnico, fecha_ini=None, fecha_fin=None):
@@ -249,11 +856,50 @@ class ReportGenerator:
             today = date.today()
             _, last_day = calendar.monthrange(today.year, today.month)
             fecha_fin = date(today.year, today.month, last_day).strftime('%Y-%m-%d')
-            
-        conn = DatabaseConnector.get_connection()
-        cursor = conn.cursor()
 
-        query = """
+        tickets = reabiertos_instantaneas(tecnico, fecha_ini, fecha_fin)
+        if tickets is not None:
+            return tickets
+
+        query, params = ReportGenerator.consulta_tickets_reabiertos(tecnico, fecha_ini, fecha_fin)
+
+        with DatabaseConnector.connection() as conn, sentencia('reabiertos'):
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            resultados = cursor.fetchall()
+            cursor.close()
+
+        return [dict(zip(COLUMNAS_TICKETS_REABIERTOS, row)) for row in resultados]
+
+    @staticmethod
+    def iterar_tickets_reabiertos(tecnico, fecha_ini, fecha_fin):
+        """Igual que obtener_tickets_reabiertos, pero entrega los tickets a medida que se leen de GLPI."""
+        tickets = reabiertos_instantaneas(tecnico, fecha_ini, fecha_fin)
+        if tickets is not None:
+            return iter(tickets)
+        query, params = ReportGenerator.consulta_tickets_reabiertos(tecnico, fecha_ini, fecha_fin)
+        return iterar_consulta(query, params, columnas=COLUMNAS_TICKETS_REABIERTOS, nombre='reabiertos')
+
+    @staticmethod
+    def consulta_tickets_reabiertos(tecnico, fecha_ini, fecha_fin):
+        """Devuelve (query, params) del detalle de tickets reabiertos de un técnico (o de un EquipoGLPI)."""
+        if isinstance(tecnico, EquipoGLPI):
+            return ReportGenerator.consulta_detalle_reabiertos(tecnico, fecha_ini, fecha_fin)
+        # El técnico llega por nombre; se filtra por sus ids de usuario GLPI
+        return ReportGenerator.consulta_detalle_reabiertos(resolver_ids_tecnicos([tecnico]), fecha_ini, fecha_fin)
+
+    @staticmethod
+    def consulta_detalle_reabiertos(ids_tecnicos, fecha_ini, fecha_fin, por_tecnico=False):
+        """
+        Devuelve (query, params) del detalle de tickets reabiertos de varios técnicos
+        (ids de usuario GLPI o EquipoGLPI; None = todos), ordenado por técnico y ticket. Con
+        ``por_tecnico`` se agrupa por ticket y técnico: un ticket cuya solución
+        rechazada era de varios técnicos aparece una vez por cada uno.
+        """
+        filtro_tecnico, params_tecnico = condicion_tecnicos('gi.users_id', ids_tecnicos) if ids_tecnicos is not None else ('', [])
+        agrupacion = "Nro_Ticket, gi.users_id" if por_tecnico else "Nro_Ticket"
+
+        query = f"""
             SELECT gi.items_id AS Nro_Ticket,
                 MAX(DATE_FORMAT(gi.date_approval, GET_FORMAT(DATE,'ISO'))) AS Fecha_Reapertura,
                 MAX(DATE_FORMAT(gt.date_creation, GET_FORMAT(DATE,'ISO'))) AS Fecha_Apertura,
@@ -263,23 +909,17 @@ class ReportGenerator:
             INNER JOIN glpi_users gu ON gu.id = gi.users_id
             WHERE gi.status = 4 
                 AND gi.users_id_approval > 0 
-                AND CONVERT_TZ(gi.date_approval,'UTC', 'America/Caracas') BETWEEN %s AND %s
-                AND CONCAT(gu.realname, ' ', gu.firstname) = %s
-            GROUP BY Nro_Ticket;
+                AND gi.date_approval >= %s AND gi.date_approval < %s
+                {filtro_tecnico}
+            GROUP BY {agrupacion}
+            ORDER BY Tecnico_Asignado, Nro_Ticket;
         """
 
         params = (
-            f'{fecha_ini} 00:00:00', 
-            f'{fecha_fin} 23:59:59', 
-            tecnico
+            *rango_utc(fecha_ini, fecha_fin),
+            *params_tecnico
         )
-
-        cursor.execute(query, params)
-        resultados = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        return [dict(zip(['Nro_Ticket', 'Fecha_Reapertura', 'Fecha_Apertura', 'Tecnico_Asignado'], row)) for row in resultados]
+        return query, params
 
     @staticmethod
     def obtener_datos_tendencia_tecnico(tecnico, fecha_ini, fecha_fin):
@@ -287,116 +927,22 @@ class ReportGenerator:
         Obtiene datos diarios de tickets recibidos, cerrados, cerrados dentro de SLA
         y cerrados con SLA para un técnico específico dentro de un rango de fechas.
         """
-        conn = None
-        cursor = None
         timezone = 'America/Caracas' # O la timezone configurada
 
         try:
-            conn = DatabaseConnector.get_connection()
-            cursor = conn.cursor(dictionary=True) # Usar dictionary=True para facilitar el manejo
-
-            # Convertir fechas a formato datetime para la consulta
-            fecha_ini_dt = f'{fecha_ini} 00:00:00'
-            fecha_fin_dt = f'{fecha_fin} 23:59:59'
-
-            # Query para tickets recibidos por día
-            query_recibidos = f"""
-                SELECT
-                    DATE(CONVERT_TZ(gt.date, 'UTC', %s)) AS dia,
-                    COUNT(DISTINCT gt.id) AS recibidos
-                FROM glpi_tickets gt
-                JOIN glpi_tickets_users gtu ON gt.id = gtu.tickets_id AND gtu.type = 2 -- Asignado
-                JOIN glpi_users gu ON gtu.users_id = gu.id
-                WHERE
-                    gt.is_deleted = 0
-                    AND CONCAT(gu.realname, ' ', gu.firstname) = %s
-                    AND gt.date BETWEEN CONVERT_TZ(%s, %s, 'UTC') AND CONVERT_TZ(%s, %s, 'UTC')
-                GROUP BY dia
-                ORDER BY dia;
-            """
-            params_recibidos = (timezone, tecnico, fecha_ini_dt, timezone, fecha_fin_dt, timezone)
-            cursor.execute(query_recibidos, params_recibidos)
-            recibidos_data = cursor.fetchall()
-
-            # Query para tickets cerrados por día
-            query_cerrados = f"""
-                SELECT
-                    DATE(CONVERT_TZ(gt.solvedate, 'UTC', %s)) AS dia,
-                    COUNT(DISTINCT gt.id) AS cerrados
-                FROM glpi_tickets gt
-                JOIN glpi_tickets_users gtu ON gt.id = gtu.tickets_id AND gtu.type = 2 -- Asignado
-                JOIN glpi_users gu ON gtu.users_id = gu.id
-                WHERE
-                    gt.is_deleted = 0
-                    AND gt.status > 4 
-                    AND CONCAT(gu.realname, ' ', gu.firstname) = %s
-                    AND gt.solvedate BETWEEN CONVERT_TZ(%s, %s, 'UTC') AND CONVERT_TZ(%s, %s, 'UTC')
-                GROUP BY dia
-                ORDER BY dia;
-            """
-            params_cerrados = (timezone, tecnico, fecha_ini_dt, timezone, fecha_fin_dt, timezone)
-            cursor.execute(query_cerrados, params_cerrados)
-            cerrados_data = cursor.fetchall()
-
-            # Query para datos de SLA por día de cierre
-            query_sla = f"""
-                SELECT
-                    DATE(CONVERT_TZ(gt.solvedate, 'UTC', %s)) AS dia,
-                    SUM(CASE WHEN gt.solvedate <= gt.time_to_resolve THEN 1 ELSE 0 END) AS cerrados_dentro_sla,
-                    COUNT(DISTINCT gt.id) AS cerrados_con_sla -- Cuenta tickets cerrados que tenían un SLA
-                FROM glpi_tickets gt
-                JOIN glpi_tickets_users gtu ON gt.id = gtu.tickets_id AND gtu.type = 2 -- Asignado
-                JOIN glpi_users gu ON gtu.users_id = gu.id
-                WHERE
-                    gt.is_deleted = 0
-                    AND gt.status > 4
-                    AND gt.time_to_resolve IS NOT NULL -- Asegura que el ticket tenía un SLA definido
-                    AND CONCAT(gu.realname, ' ', gu.firstname) = %s
-                    AND gt.solvedate BETWEEN CONVERT_TZ(%s, %s, 'UTC') AND CONVERT_TZ(%s, %s, 'UTC')
-                GROUP BY dia
-                ORDER BY dia;
-            """
-            params_sla = (timezone, tecnico, fecha_ini_dt, timezone, fecha_fin_dt, timezone)
-            cursor.execute(query_sla, params_sla)
-            sla_data = cursor.fetchall()
-
-            # Combinar los datos usando Pandas para facilidad
-            df_recibidos = pd.DataFrame(recibidos_data)
-            df_cerrados = pd.DataFrame(cerrados_data)
-            df_sla = pd.DataFrame(sla_data)
-
-            # Asegurarse de que la columna 'dia' sea datetime
-            if not df_recibidos.empty:
-                df_recibidos['dia'] = pd.to_datetime(df_recibidos['dia'])
-            if not df_cerrados.empty:
-                df_cerrados['dia'] = pd.to_datetime(df_cerrados['dia'])
-            if not df_sla.empty:
-                df_sla['dia'] = pd.to_datetime(df_sla['dia'])
-
-            # Crear un DataFrame base con todas las fechas del rango para asegurar continuidad
-            date_range = pd.date_range(start=fecha_ini, end=fecha_fin, freq='D')
-            df_base = pd.DataFrame({'dia': date_range})
-
-            # Fusionar los dataframes con el base usando outer merge
-            df_merged = df_base
-            if not df_recibidos.empty: df_merged = pd.merge(df_merged, df_recibidos, on='dia', how='left')
-            if not df_cerrados.empty: df_merged = pd.merge(df_merged, df_cerrados, on='dia', how='left')
-            if not df_sla.empty: df_merged = pd.merge(df_merged, df_sla, on='dia', how='left')
+            # Los técnicos llegan por nombre; se consultan por sus ids de usuario GLPI
+            ids_tecnico = resolver_ids_tecnicos([tecnico])
+            if ReportGenerator.fuente_reporte() == 'local':
+                recibidos_data, cerrados_data, sla_data = tendencia_tecnico_local(fecha_ini, fecha_fin, ids_tecnico)
             else:
-                # Si todos están vacíos, df_merged será solo el df_base con fechas
-                df_merged['recibidos'] = 0
-                df_merged['cerrados'] = 0
-                df_merged['cerrados_dentro_sla'] = 0
-                df_merged['cerrados_con_sla'] = 0
+                recibidos_data, cerrados_data, sla_data = ReportGenerator._datos_tendencia_tecnico_glpi(
+                    ids_tecnico, fecha_ini, fecha_fin, timezone
+                )
 
-            df_merged = df_merged.fillna(0).sort_values(by='dia')
-            # Convertir columnas numéricas a enteros
-            df_merged['recibidos'] = df_merged['recibidos'].astype(int)
-            df_merged['cerrados'] = df_merged['cerrados'].astype(int)
-            df_merged['cerrados_dentro_sla'] = df_merged['cerrados_dentro_sla'].astype(int)
-            df_merged['cerrados_con_sla'] = df_merged['cerrados_con_sla'].astype(int)
-
-            return df_merged # Devolver el DataFrame combinado
+            # Combinar los datos con pandas; el módulo se importa solo cuando se usa
+            from .dataframes import combinar_tendencia_diaria
+            with etapa('dataframe'):
+                return combinar_tendencia_diaria(recibidos_data, cerrados_data, sla_data, fecha_ini, fecha_fin)
 
         except mysql.connector.Error as err:
             logger.error(f"Error de base de datos al obtener datos de tendencia para {tecnico}: {err}")
@@ -404,8 +950,124 @@ class ReportGenerator:
         except Exception as e:
             logger.error(f"Error inesperado al obtener datos de tendencia para {tecnico}: {e}", exc_info=True)
             raise
-        finally:
-            if cursor:
-                cursor.close()
-            if conn and conn.is_connected():
-                conn.close()
\ No newline at end of file
+
+    @staticmethod
+    def tendencia_diaria_tecnicos(tecnicos, fecha_ini, fecha_fin):
+        """
+        Series diarias de recibidos, cerrados, cerrados dentro de SLA y cerrados con
+        SLA de varios técnicos a la vez, en formato columnar (ver
+        ``dataframes.series_diarias_tecnicos``). Una consulta agrupada por técnico y
+        día por métrica, sin importar cuántos técnicos se pidan (la versión de un
+        técnico, ``obtener_datos_tendencia_tecnico``, hace tres por técnico). Los
+        técnicos sin usuario GLPI se omiten; devuelve None si no queda ninguno.
+        """
+        timezone = 'America/Caracas' # O la timezone configurada
+
+        # Cada técnico pedido (nombre o id) es una fila; un nombre puede tener varios ids
+        etiquetas, ids_por_fila = [], []
+        for tecnico in dict.fromkeys(tecnicos):
+            ids_tecnico = resolver_ids_tecnicos([tecnico])
+            if ids_tecnico:
+                etiquetas.append(str(tecnico))
+                ids_por_fila.append(ids_tecnico)
+        if not etiquetas:
+            return None
+        ids_tecnicos = sorted({user_id for ids_tecnico in ids_por_fila for user_id in ids_tecnico})
+
+        if ReportGenerator.fuente_reporte() == 'local':
+            datos = tendencia_tecnicos_local(fecha_ini, fecha_fin, ids_tecnicos)
+        else:
+            consultas = ReportGenerator.consultas_tendencia_tecnico(
+                ids_tecnicos, fecha_ini, fecha_fin, timezone, por_tecnico=True
+            )
+            # Tuplas (users_id, dia, valores...): sin diccionarios por fila
+            datos = ejecutar_consultas(consultas, dictionary=False)
+
+        # numpy se importa solo aquí (ver manage.py medir_importacion)
+        from .dataframes import series_diarias_tecnicos
+        with etapa('dataframe'):
+            return series_diarias_tecnicos(datos, etiquetas, ids_por_fila, fecha_ini, fecha_fin)
+
+    @staticmethod
+    def _datos_tendencia_tecnico_glpi(ids_tecnico, fecha_ini, fecha_fin, timezone):
+        """Consultas diarias en vivo contra GLPI: (recibidos_data, cerrados_data, sla_data)."""
+        consultas = ReportGenerator.consultas_tendencia_tecnico(ids_tecnico, fecha_ini, fecha_fin, timezone)
+
+        # Las tres consultas son independientes: se solapan según settings.REPORT_CONCURRENCY
+        datos = ejecutar_consultas(consultas)
+
+        return datos['recibidos'], datos['cerrados'], datos['sla']
+
+    @staticmethod
+    def consultas_tendencia_tecnico(ids_tecnico, fecha_ini, fecha_fin, timezone='America/Caracas', por_tecnico=False):
+        """
+        Consultas diarias de la tendencia de un técnico: diccionario
+        {'recibidos' | 'cerrados' | 'sla': (query, params)}. Con ``por_tecnico`` cada
+        consulta agrupa también por usuario y su primera columna es ``users_id``: una
+        sola consulta por métrica sirve para todos los técnicos de ``ids_tecnico``.
+        """
+        # Filtro por ids de usuario GLPI del técnico (en lugar de comparar el nombre)
+        filtro_tecnico, params_tecnico = condicion_in('gtu.users_id', ids_tecnico)
+        columna_tecnico = "gtu.users_id," if por_tecnico else ""
+        agrupacion = "gtu.users_id, dia" if por_tecnico else "dia"
+
+        # Límites UTC del rango local para comparar directamente contra las columnas
+        desde, hasta = rango_utc(fecha_ini, fecha_fin)
+
+        # Query para tickets recibidos por día
+        query_recibidos = f"""
+            SELECT {columna_tecnico}
+                DATE(CONVERT_TZ(gt.date, 'UTC', %s)) AS dia,
+                COUNT(DISTINCT gt.id) AS recibidos
+            FROM glpi_tickets gt
+            JOIN glpi_tickets_users gtu ON gt.id = gtu.tickets_id AND gtu.type = 2 -- Asignado
+            WHERE
+                gt.is_deleted = 0
+                {filtro_tecnico}
+                AND gt.date >= %s AND gt.date < %s
+            GROUP BY {agrupacion}
+            ORDER BY {agrupacion};
+        """
+        params_recibidos = (timezone, *params_tecnico, desde, hasta)
+
+        # Query para tickets cerrados por día
+        query_cerrados = f"""
+            SELECT {columna_tecnico}
+                DATE(CONVERT_TZ(gt.solvedate, 'UTC', %s)) AS dia,
+                COUNT(DISTINCT gt.id) AS cerrados
+            FROM glpi_tickets gt
+            JOIN glpi_tickets_users gtu ON gt.id = gtu.tickets_id AND gtu.type = 2 -- Asignado
+            WHERE
+                gt.is_deleted = 0
+                AND gt.status > 4 
+                {filtro_tecnico}
+                AND gt.solvedate >= %s AND gt.solvedate < %s
+            GROUP BY {agrupacion}
+            ORDER BY {agrupacion};
+        """
+        params_cerrados = (timezone, *params_tecnico, desde, hasta)
+
+        # Query para datos de SLA por día de cierre
+        query_sla = f"""
+            SELECT {columna_tecnico}
+                DATE(CONVERT_TZ(gt.solvedate, 'UTC', %s)) AS dia,
+                SUM(CASE WHEN gt.solvedate <= gt.time_to_resolve THEN 1 ELSE 0 END) AS cerrados_dentro_sla,
+                COUNT(DISTINCT gt.id) AS cerrados_con_sla -- Cuenta tickets cerrados que tenían un SLA
+            FROM glpi_tickets gt
+            JOIN glpi_tickets_users gtu ON gt.id = gtu.tickets_id AND gtu.type = 2 -- Asignado
+            WHERE
+                gt.is_deleted = 0
+                AND gt.status > 4
+                AND gt.time_to_resolve IS NOT NULL -- Asegura que el ticket tenía un SLA definido
+                {filtro_tecnico}
+                AND gt.solvedate >= %s AND gt.solvedate < %s
+            GROUP BY {agrupacion}
+            ORDER BY {agrupacion};
+        """
+        params_sla = (timezone, *params_tecnico, desde, hasta)
+
+        return {
+            'recibidos': (query_recibidos, params_recibidos),
+            'cerrados': (query_cerrados, params_cerrados),
+            'sla': (query_sla, params_sla),
+        }
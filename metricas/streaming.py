@@ -0,0 +1,95 @@
+"""
+Respuestas JSON en streaming para reportes grandes.
+
+Por defecto las vistas arman la lista completa de filas y la serializan con
+``JsonResponse``. Con el parámetro opcional ``stream`` (en el cuerpo JSON, en el
+formulario o en la query string) la respuesta se escribe de forma incremental con
+``StreamingHttpResponse`` a partir de un iterador de filas (normalmente
+``services.iterar_consulta``), con la misma forma ``{"data": [...]}``; así el
+frontend existente no cambia y el resultado nunca está entero en memoria.
+
+Antes de devolver la respuesta se lee la primera fila: los errores de conexión o
+de SQL siguen produciendo el error HTTP de siempre. Si la lectura falla a mitad
+de camino (el código 200 ya se envió) se cierra el arreglo y se añade una clave
+``"error"`` para que el cliente pueda detectarlo.
+"""
+import json
+import logging
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+# Filas que se serializan juntas en cada fragmento enviado al cliente
+FILAS_POR_FRAGMENTO = 200
+
+_VALORES_VERDADEROS = {'1', 'true', 'si', 'sí', 'yes', 'on'}
+
+
+def solicita_streaming(request, data=None):
+    """Indica si la petición pidió respuesta en streaming (``stream`` en los datos o en la query string)."""
+    valor = (data or {}).get('stream')
+    if valor is None:
+        valor = request.GET.get('stream')
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() in _VALORES_VERDADEROS if valor is not None else False
+
+
+def primera_fila(filas):
+    """
+    Lee la primera fila de un iterador. Devuelve ``(fila o None, iterador)``, donde
+    el iterador devuelto vuelve a entregar esa primera fila.
+    """
+    filas = iter(filas)
+    primeras = list(islice(filas, 1))
+    if not primeras:
+        _cerrar(filas)
+        return None, iter(())
+    return primeras[0], _encadenar(primeras[0], filas)
+
+
+def _cerrar(filas):
+    # Cerrar el generador devuelve (o descarta) la conexión GLPI que tenga prestada
+    cerrar = getattr(filas, 'close', None)
+    if cerrar is not None:
+        cerrar()
+
+
+def _encadenar(primera, filas):
+    try:
+        yield primera
+        yield from filas
+    finally:
+        _cerrar(filas)
+
+
+def _fragmentos_json(filas, clave):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    yield '{%s: [' % json.dumps(clave)
+    separador = ''
+    try:
+        while True:
+            lote = list(islice(filas, FILAS_POR_FRAGMENTO))
+            if not lote:
+                break
+            yield separador + ', '.join(encoder.encode(fila) for fila in lote)
+            separador = ', '
+    except Exception as e:
+        logger.error(f"Error durante la respuesta en streaming: {e}", exc_info=True)
+        yield '], "error": %s}' % json.dumps('La respuesta se interrumpió por un error al leer los datos.')
+        return
+    finally:
+        _cerrar(filas)
+    yield ']}'
+
+
+def respuesta_json_streaming(filas, clave='data'):
+    """``StreamingHttpResponse`` con ``{clave: [filas...]}`` escrito a medida que se leen las filas."""
+    _, filas = primera_fila(filas)
+    respuesta = StreamingHttpResponse(_fragmentos_json(filas, clave), content_type='application/json')
+    # Evita que un proxy intermedio acumule la respuesta completa antes de reenviarla
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
@@ -0,0 +1,283 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus.
+
+Cada worker de gunicorn acumula en memoria, a partir de la instrumentación de cada
+petición (ver metricas/instrumentacion.py):
+
+- histogramas de la duración de cada vista (``metricas_peticion_segundos``) y de
+  cada etapa (``metricas_etapa_segundos``): ``db`` (consultas GLPI), ``dataframe``
+  (pandas/numpy), ``graficas`` (figuras plotly y series de gráficas) y
+  ``serializacion`` (JSON);
+- contadores de peticiones por código, errores (respuestas 5xx y consultas GLPI
+  fallidas) y consultas GLPI por vista.
+
+Cada ``INTERVALO_ESCRITURA`` segundos el worker escribe una instantánea de sus
+valores, junto con los contadores de la caché de reportes y del pool GLPI, en
+``DIRECTORIO/<pid>.json`` (escritura atómica, como la caché en disco). La vista
+``/metrics/`` suma las instantáneas de todos los workers: los valores son
+acumulados desde el arranque de cada proceso, así que los archivos de workers
+terminados se siguen sumando (los totales no retroceden, salvo que un proceso
+nuevo reutilice el pid) hasta que superan ``RETENCION`` segundos sin cambios y se
+borran.
+
+La configuración se lee de ``settings.TELEMETRIA`` (ver ``DEFAULT_TELEMETRIA_CONFIG``).
+"""
+import atexit
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from .glpi_db import pool_stats
+from .report_cache import cache_stats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TELEMETRIA_CONFIG = {
+    'ACTIVA': True,
+    'DIRECTORIO': None,          # Por defecto BASE_DIR / 'telemetria'
+    'INTERVALO_ESCRITURA': 5,    # Segundos entre instantáneas de cada worker
+    'RETENCION': 7 * 24 * 3600,  # Instantáneas sin cambios más antiguas se borran
+    'CUBETAS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),  # Segundos
+    'TOKEN': None,               # Si se define, /metrics/ exige "Authorization: Bearer <TOKEN>"
+    # Sin TOKEN, solo estas direcciones leen /metrics/. Vacío (por defecto): sin TOKEN se
+    # deniega todo. Detrás de un proxy inverso en el mismo servidor REMOTE_ADDR es el
+    # del proxy (127.0.0.1), así que una lista con localhost deja /metrics/ abierto.
+    'IPS_PERMITIDAS': (),
+}
+
+# Etapas de metricas_etapa_segundos (las de la cabecera Server-Timing)
+ETAPAS_HISTOGRAMA = ('db', 'dataframe', 'graficas', 'serializacion')
+
+AYUDA = {
+    'metricas_peticion_segundos': ('histogram', 'Duración total de la petición por vista.'),
+    'metricas_etapa_segundos': ('histogram', 'Tiempo de cada etapa de la petición por vista (db: consultas GLPI, '
+                                             'dataframe: pandas/numpy, graficas: plotly, serializacion: JSON).'),
+    'metricas_peticiones_total': ('counter', 'Peticiones atendidas por vista y código HTTP.'),
+    'metricas_errores_total': ('counter', 'Errores por vista: respuestas 5xx y consultas GLPI fallidas.'),
+    'metricas_consultas_glpi_total': ('counter', 'Consultas GLPI ejecutadas por vista.'),
+    'metricas_cache_consultas_total': ('counter', 'Consultas a la caché de reportes por espacio y resultado.'),
+    'metricas_pool_prestamos_total': ('counter', 'Conexiones GLPI prestadas por el pool.'),
+    'metricas_pool_esperas_total': ('counter', 'Préstamos que esperaron una conexión GLPI libre.'),
+    'metricas_pool_espera_segundos_total': ('counter', 'Tiempo total esperando conexiones GLPI.'),
+    'metricas_pool_timeouts_total': ('counter', 'Préstamos que agotaron la espera de una conexión GLPI.'),
+    'metricas_pool_descartadas_total': ('counter', 'Conexiones GLPI descartadas por errores o resultados sin leer.'),
+}
+
+
+def _config():
+    return {**DEFAULT_TELEMETRIA_CONFIG, **getattr(settings, 'TELEMETRIA', {})}
+
+
+def telemetria_activa():
+    return bool(_config()['ACTIVA'])
+
+
+def directorio_telemetria():
+    return Path(_config()['DIRECTORIO'] or Path(settings.BASE_DIR) / 'telemetria')
+
+
+class RegistroMetricas:
+    """Histogramas y contadores de este proceso. Thread-safe."""
+
+    def __init__(self, cubetas):
+        self.cubetas = tuple(float(limite) for limite in cubetas)
+        self.pid = os.getpid()
+        self._histogramas = {}  # (familia, etiquetas) -> [conteos por cubeta..., suma, cuenta]
+        self._contadores = {}   # (familia, etiquetas) -> valor
+        self._escrito_en = 0.0
+        self._lock = threading.Lock()
+
+    def observar(self, familia, etiquetas, valor):
+        clave = (familia, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            datos = self._histogramas.get(clave)
+            if datos is None:
+                datos = self._histogramas[clave] = [0] * len(self.cubetas) + [0.0, 0]
+            for indice, limite in enumerate(self.cubetas):
+                if valor <= limite:
+                    datos[indice] += 1
+                    break
+            datos[-2] += valor
+            datos[-1] += 1
+
+    def sumar(self, familia, etiquetas, valor=1):
+        clave = (familia, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def instantanea(self):
+        """Valores de este proceso, más los contadores de la caché de reportes y del pool GLPI."""
+        with self._lock:
+            histogramas = [{'familia': familia, 'etiquetas': dict(etiquetas), 'valores': list(datos)}
+                           for (familia, etiquetas), datos in self._histogramas.items()]
+            contadores = [{'familia': familia, 'etiquetas': dict(etiquetas), 'valor': valor}
+                          for (familia, etiquetas), valor in self._contadores.items()]
+        for espacio, stats in cache_stats().items():
+            for resultado in ('hits_memoria', 'hits_disco', 'misses'):
+                contadores.append({'familia': 'metricas_cache_consultas_total',
+                                   'etiquetas': {'espacio': espacio, 'resultado': resultado},
+                                   'valor': stats.get(resultado, 0)})
+        pool = pool_stats()
+        for familia, clave, escala in (('metricas_pool_prestamos_total', 'borrows', 1),
+                                       ('metricas_pool_esperas_total', 'waits', 1),
+                                       ('metricas_pool_espera_segundos_total', 'wait_time_total_ms', 0.001),
+                                       ('metricas_pool_timeouts_total', 'timeouts', 1),
+                                       ('metricas_pool_descartadas_total', 'discarded', 1)):
+            contadores.append({'familia': familia, 'etiquetas': {}, 'valor': pool.get(clave, 0) * escala})
+        return {'pid': self.pid, 'cubetas': list(self.cubetas), 'histogramas': histogramas, 'contadores': contadores}
+
+    def escribir(self, forzar=False):
+        """Guarda la instantánea del proceso si pasó INTERVALO_ESCRITURA desde la anterior."""
+        ahora = time.monotonic()
+        if not forzar and ahora - self._escrito_en < _config()['INTERVALO_ESCRITURA']:
+            return
+        self._escrito_en = ahora
+        directorio = directorio_telemetria()
+        try:
+            directorio.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as archivo:
+                    json.dump(self.instantanea(), archivo)
+                os.replace(tmp, directorio / f"{self.pid}.json")
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except Exception as e:
+            logger.warning(f"No se pudo escribir la instantánea de métricas en {directorio}: {e}")
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+
+def registro_metricas():
+    """Registro del proceso actual (uno nuevo tras un fork: cada worker escribe su archivo)."""
+    global _registro
+    if _registro is None or _registro.pid != os.getpid():
+        with _registro_lock:
+            if _registro is None or _registro.pid != os.getpid():
+                _registro = RegistroMetricas(_config()['CUBETAS'])
+    return _registro
+
+
+def _escribir_al_salir():
+    if _registro is not None and _registro.pid == os.getpid():
+        _registro.escribir(forzar=True)
+
+
+atexit.register(_escribir_al_salir)
+
+
+def observar_peticion(request, respuesta, resumen):
+    """Registra una petición a partir del resumen de ``RegistroPeticion`` (lo llama MiddlewareInstrumentacion)."""
+    if not telemetria_activa():
+        return
+    coincidencia = getattr(request, 'resolver_match', None)
+    vista = (coincidencia.url_name or coincidencia.view_name) if coincidencia else 'sin_ruta'
+    registro = registro_metricas()
+    registro.observar('metricas_peticion_segundos', {'vista': vista}, resumen['total_ms'] / 1000)
+    for etapa in ETAPAS_HISTOGRAMA:
+        registro.observar('metricas_etapa_segundos', {'vista': vista, 'etapa': etapa},
+                          resumen['ms'].get(etapa, 0.0) / 1000)
+    registro.sumar('metricas_peticiones_total', {'vista': vista, 'codigo': str(respuesta.status_code)})
+    if respuesta.status_code >= 500:
+        registro.sumar('metricas_errores_total', {'vista': vista, 'tipo': 'http_5xx'})
+    if resumen['errores']:
+        registro.sumar('metricas_errores_total', {'vista': vista, 'tipo': 'consulta_glpi'}, resumen['errores'])
+    if resumen['sentencias']:
+        registro.sumar('metricas_consultas_glpi_total', {'vista': vista}, resumen['sentencias'])
+    registro.escribir()
+
+
+def _leer_instantaneas():
+    """Instantáneas de todos los workers; borra las que superan RETENCION sin cambios."""
+    config = _config()
+    instantaneas = []
+    limite = time.time() - config['RETENCION']
+    for ruta in directorio_telemetria().glob('*.json'):
+        try:
+            if ruta.stat().st_mtime < limite:
+                ruta.unlink()
+                continue
+            with open(ruta, encoding='utf-8') as archivo:
+                instantaneas.append(json.load(archivo))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Instantánea de métricas ilegible {ruta}: {e}")
+    return instantaneas
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(etiquetas, **extra):
+    pares = {**etiquetas, **extra}
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in sorted(pares.items())) + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def texto_prometheus():
+    """Suma las instantáneas de todos los workers y las devuelve en formato de texto de Prometheus 0.0.4."""
+    registro = registro_metricas()
+    registro.escribir(forzar=True)
+    cubetas = registro.cubetas
+
+    histogramas, contadores = {}, {}
+    for instantanea in _leer_instantaneas():
+        if tuple(instantanea.get('cubetas', ())) != cubetas:
+            # Worker con otra configuración de cubetas (p. ej. antes de un despliegue)
+            logger.warning(f"Instantánea de métricas del proceso {instantanea.get('pid')} con otras cubetas; se omite.")
+            continue
+        for histograma in instantanea['histogramas']:
+            clave = (histograma['familia'], tuple(sorted(histograma['etiquetas'].items())))
+            acumulado = histogramas.setdefault(clave, [0] * len(histograma['valores']))
+            for indice, valor in enumerate(histograma['valores']):
+                acumulado[indice] += valor
+        for contador in instantanea['contadores']:
+            clave = (contador['familia'], tuple(sorted(contador['etiquetas'].items())))
+            contadores[clave] = contadores.get(clave, 0) + contador['valor']
+
+    lineas = []
+    for familia, (tipo, ayuda) in AYUDA.items():
+        series_histograma = sorted((clave, valores) for clave, valores in histogramas.items() if clave[0] == familia)
+        series_contador = sorted((clave, valor) for clave, valor in contadores.items() if clave[0] == familia)
+        if not series_histograma and not series_contador:
+            continue
+        lineas.append(f"# HELP {familia} {ayuda}")
+        lineas.append(f"# TYPE {familia} {tipo}")
+        for (_, etiquetas), valores in series_histograma:
+            etiquetas = dict(etiquetas)
+            acumulado = 0
+            for limite, conteo in zip(cubetas, valores):
+                acumulado += conteo
+                lineas.append(f"{familia}_bucket{_etiquetas(etiquetas, le=_numero(limite))} {acumulado}")
+            lineas.append(f"{familia}_bucket{_etiquetas(etiquetas, le='+Inf')} {valores[-1]}")
+            lineas.append(f"{familia}_sum{_etiquetas(etiquetas)} {_numero(valores[-2])}")
+            lineas.append(f"{familia}_count{_etiquetas(etiquetas)} {valores[-1]}")
+        for (_, etiquetas), valor in series_contador:
+            lineas.append(f"{familia}{_etiquetas(dict(etiquetas))} {_numero(valor)}")
+    return '\n'.join(lineas) + '\n'
+
+
+def acceso_permitido(request):
+    """
+    /metrics/ con TOKEN: cabecera Authorization Bearer; sin TOKEN: solo desde
+    IPS_PERMITIDAS, que por defecto está vacía (se deniega todo).
+    """
+    config = _config()
+    if config['TOKEN']:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {config['TOKEN']}")
+    return request.META.get('REMOTE_ADDR') in config['IPS_PERMITIDAS']
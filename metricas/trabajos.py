@@ -0,0 +1,220 @@
+"""
+Cola de trabajos en segundo plano para reportes y exportaciones largas.
+
+Un reporte de un año con todos los técnicos ocupa un worker síncrono de gunicorn
+durante toda la consulta. Con esta cola la petición solo registra el trabajo
+(``TrabajoReporte`` en la base de datos por defecto) y devuelve su id; el cliente
+consulta el estado y descarga el resultado cuando está listo. Los trabajos los
+ejecuta un proceso aparte:
+
+    python manage.py procesar_trabajos
+
+que reclama trabajos pendientes con un UPDATE condicional (válido también en
+SQLite, sin SELECT ... FOR UPDATE), los ejecuta en un pool de hilos acotado por
+``CONCURRENCIA`` y guarda el resultado: JSON en la propia fila y los archivos
+(Excel/PDF) en ``DIRECTORIO``. Los resultados se borran al cumplirse ``RETENCION``
+y los trabajos que quedan en proceso más de ``TIEMPO_MAXIMO`` (worker caído) se
+marcan con error.
+
+La configuración se lee de ``settings.TRABAJOS_REPORTES`` (ver ``DEFAULT_TRABAJOS_CONFIG``).
+"""
+import logging
+import os
+import re
+import shutil
+import socket
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import TrabajoReporte
+from .periodos import AGRUPACIONES_TENDENCIA, MENSAJE_AGRUPACION_INVALIDA
+from .services import ReportGenerator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRABAJOS_CONFIG = {
+    'DIRECTORIO': None,          # Por defecto BASE_DIR / 'trabajos_reportes'
+    'CONCURRENCIA': 2,           # Trabajos simultáneos por proceso worker
+    'INTERVALO_SONDEO': 2,       # Segundos entre búsquedas de trabajos pendientes
+    'RETENCION': 24 * 3600,      # Segundos que se conserva un resultado
+    'TIEMPO_MAXIMO': 2 * 3600,   # Segundos en proceso tras los que se da por perdido
+}
+
+
+def config_trabajos():
+    return {**DEFAULT_TRABAJOS_CONFIG, **getattr(settings, 'TRABAJOS_REPORTES', {})}
+
+
+def directorio_resultados():
+    return Path(config_trabajos()['DIRECTORIO'] or Path(settings.BASE_DIR) / 'trabajos_reportes')
+
+
+def nombre_worker():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# --- Tipos de trabajo ---
+
+def _reporte_principal(trabajo, parametros):
+    datos = ReportGenerator.generar_reporte_principal(
+        parametros['fecha_ini'], parametros['fecha_fin'], parametros['tecnicos']
+    )
+    return {'data': datos}, None
+
+
+def _exportar_excel(trabajo, parametros):
+    # openpyxl y reportlab se importan al ejecutar el trabajo: las vistas importan
+    # este módulo para encolar y no deben cargarlos
+    from .exportacion import generar_excel_reporte
+    ruta = directorio_resultados() / f"trabajo_{trabajo.pk}.xlsx"
+    with generar_excel_reporte(parametros['fecha_ini'], parametros['fecha_fin'],
+                               parametros['tecnicos'], parametros['agrupacion']) as origen:
+        with open(ruta, 'wb') as destino:
+            shutil.copyfileobj(origen, destino)
+    return None, ruta
+
+
+def _exportar_pdf(trabajo, parametros):
+    from .reporte_pdf import generar_pdf_reporte
+    ruta = directorio_resultados() / f"trabajo_{trabajo.pk}.pdf"
+    ruta.write_bytes(generar_pdf_reporte(parametros['fecha_ini'], parametros['fecha_fin'], parametros['tecnicos']))
+    return None, ruta
+
+
+# tipo -> (función que lo ejecuta, extensión y content type del archivo resultante)
+TIPOS_TRABAJO = {
+    'reporte_principal': (_reporte_principal, None, None),
+    'excel': (_exportar_excel, 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'pdf': (_exportar_pdf, 'pdf', 'application/pdf'),
+}
+
+
+def normalizar_parametros(tipo, datos):
+    """
+    Valida los datos enviados por el cliente y devuelve los parámetros que se
+    guardan con el trabajo. Lanza ValueError con un mensaje para el usuario.
+    """
+    if tipo not in TIPOS_TRABAJO:
+        raise ValueError(f"Tipo de trabajo inválido; opciones: {', '.join(TIPOS_TRABAJO)}.")
+    fecha_ini, fecha_fin = datos.get('fecha_ini'), datos.get('fecha_fin')
+    if not fecha_ini or not fecha_fin:
+        raise ValueError('Las fechas de inicio y fin son requeridas.')
+    if not re.match(r'^\d{4}-\d{2}-\d{2}$', fecha_ini) or not re.match(r'^\d{4}-\d{2}-\d{2}$', fecha_fin):
+        raise ValueError('Formato de fecha inválido (debe ser YYYY-MM-DD).')
+    agrupacion = datos.get('agrupacion', 'mes')
+    if agrupacion not in AGRUPACIONES_TENDENCIA:
+        raise ValueError(MENSAJE_AGRUPACION_INVALIDA)
+    tecnicos = datos.get('tecnicos')
+    # 'todos', None o una lista vacía: todos los técnicos
+    tecnicos = tecnicos if isinstance(tecnicos, list) and tecnicos else None
+    return {'fecha_ini': fecha_ini, 'fecha_fin': fecha_fin, 'tecnicos': tecnicos, 'agrupacion': agrupacion}
+
+
+# --- Cola ---
+
+def encolar(tipo, datos, usuario=None):
+    """Registra un trabajo pendiente y lo devuelve (ValueError si los datos no son válidos)."""
+    parametros = normalizar_parametros(tipo, datos)
+    trabajo = TrabajoReporte.objects.create(tipo=tipo, parametros=parametros, usuario=usuario)
+    logger.info(f"Trabajo {trabajo.pk} encolado: {tipo} {parametros}")
+    return trabajo
+
+
+def reclamar(worker, candidatos=10):
+    """
+    Marca como en proceso el trabajo pendiente más antiguo que logre reclamar y lo
+    devuelve, o None si no hay ninguno. El UPDATE solo afecta a filas aún
+    pendientes, así que dos workers nunca reclaman el mismo trabajo.
+    """
+    pendientes = (TrabajoReporte.objects.filter(estado=TrabajoReporte.PENDIENTE)
+                  .order_by('creado', 'pk').values_list('pk', flat=True)[:candidatos])
+    for pk in list(pendientes):
+        reclamado = TrabajoReporte.objects.filter(pk=pk, estado=TrabajoReporte.PENDIENTE).update(
+            estado=TrabajoReporte.EN_PROCESO, iniciado=timezone.now(), worker=worker,
+        )
+        if reclamado:
+            return TrabajoReporte.objects.get(pk=pk)
+    return None
+
+
+def ejecutar(trabajo):
+    """Ejecuta un trabajo ya reclamado y guarda su resultado o su error."""
+    funcion, _, _ = TIPOS_TRABAJO[trabajo.tipo]
+    try:
+        directorio_resultados().mkdir(parents=True, exist_ok=True)
+        resultado, ruta = funcion(trabajo, trabajo.parametros)
+    except Exception as e:
+        logger.error(f"Trabajo {trabajo.pk} ({trabajo.tipo}) falló: {e}", exc_info=True)
+        trabajo.estado = TrabajoReporte.ERROR
+        trabajo.error = str(e) or e.__class__.__name__
+    else:
+        trabajo.estado = TrabajoReporte.COMPLETADO
+        trabajo.resultado = resultado
+        trabajo.archivo = str(ruta) if ruta else ''
+    trabajo.terminado = timezone.now()
+    trabajo.expira = trabajo.terminado + timedelta(seconds=config_trabajos()['RETENCION'])
+    trabajo.save(update_fields=['estado', 'resultado', 'archivo', 'error', 'terminado', 'expira'])
+    logger.info(f"Trabajo {trabajo.pk} ({trabajo.tipo}) {trabajo.estado} en "
+                f"{(trabajo.terminado - trabajo.iniciado).total_seconds():.1f} s")
+    return trabajo
+
+
+def ejecutar_en_hilo(trabajo_id):
+    """Punto de entrada de los hilos del worker: cada hilo usa (y cierra) su propia conexión."""
+    try:
+        return ejecutar(TrabajoReporte.objects.get(pk=trabajo_id))
+    finally:
+        # Las conexiones de Django son por hilo: se cierran las de este hilo
+        connections.close_all()
+
+
+def _borrar_archivo(ruta):
+    if ruta:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+def limpiar():
+    """
+    Borra los trabajos cuyo resultado venció (y sus archivos) y marca con error los
+    que llevan en proceso más de TIEMPO_MAXIMO. Devuelve (borrados, perdidos).
+    """
+    ahora = timezone.now()
+    vencidos = list(TrabajoReporte.objects.filter(expira__lt=ahora).values_list('pk', 'archivo'))
+    for _, archivo in vencidos:
+        _borrar_archivo(archivo)
+    TrabajoReporte.objects.filter(pk__in=[pk for pk, _ in vencidos]).delete()
+
+    perdidos = TrabajoReporte.objects.filter(
+        estado=TrabajoReporte.EN_PROCESO,
+        iniciado__lt=ahora - timedelta(seconds=config_trabajos()['TIEMPO_MAXIMO']),
+    ).update(
+        estado=TrabajoReporte.ERROR,
+        error='El trabajo superó el tiempo máximo de ejecución (¿se detuvo el worker?).',
+        terminado=ahora,
+        expira=ahora + timedelta(seconds=config_trabajos()['RETENCION']),
+    )
+    if vencidos or perdidos:
+        logger.info(f"Limpieza de trabajos: {len(vencidos)} vencidos borrados, {perdidos} marcados como perdidos")
+    return len(vencidos), perdidos
+
+
+def estado_trabajo(trabajo):
+    """Representación JSON del estado de un trabajo para el cliente."""
+    return {
+        'id': trabajo.pk,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'parametros': trabajo.parametros,
+        'creado': trabajo.creado,
+        'iniciado': trabajo.iniciado,
+        'terminado': trabajo.terminado,
+        'expira': trabajo.expira,
+        'error': trabajo.error or None,
+    }
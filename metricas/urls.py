@@ -8,10 +8,21 @@ urlpatterns = [
     path('tecnicos/', views.obtener_tecnicos, name='obtener_tecnicos'),
     path('generar-reporte/', views.generar_reporte, name='generar_reporte'),
     path('tickets-reabiertos/', views.tickets_reabiertos, name='tickets_reabiertos'),
+    path('exportar-excel/', views.exportar_excel, name='exportar_excel'),
+    path('exportar-pdf/', views.exportar_pdf, name='exportar_pdf'),
+    path('trabajos/', views.crear_trabajo, name='crear_trabajo'),
+    path('trabajos/<int:trabajo_id>/', views.estado_trabajo, name='estado_trabajo'),
+    path('trabajos/<int:trabajo_id>/resultado/', views.resultado_trabajo, name='resultado_trabajo'),
     path('obtener-grupos/', views.obtener_grupos, name='obtener_grupos'),
     path('obtener-tecnicos-por-grupo/', views.obtener_tecnicos_por_grupo, name='obtener_tecnicos_por_grupo'),
     path('obtener-subgrupos/', views.obtener_subgrupos, name='obtener_subgrupos'),
     path('obtener-tecnicos-por-subgrupo/', views.obtener_tecnicos_por_subgrupo, name='obtener_tecnicos_por_subgrupo'),
+    path('jerarquia/', views.jerarquia_grupos, name='jerarquia_grupos'),
     path('generar-grafica/', views.generar_grafica, name='generar_grafica'),
+    path('graficas/plantillas/<str:version>/', views.plantillas_graficas, name='plantillas_graficas'),
+    path('graficas/<str:clave>/', views.graficas_reporte, name='graficas_reporte'),
     path('generar-tendencia-sla/', views.generar_tendencia_sla_view, name='generar_tendencia_sla'),
+    path('tendencia-tecnicos/', views.tendencia_tecnicos, name='tendencia_tecnicos'),
+    path('estado/', views.estado_sistema, name='estado_sistema'),
+    path('metrics/', views.metricas_prometheus, name='metricas_prometheus'),
 ]
@@ -1,24 +1,36 @@
 # /home/oleon/Escritorio/reporte_glpi_django/metricas/views.py
+import io # Para enviar bytes generados en memoria como archivo
 import json # Para trabajar con datos JSON (en requests/responses)
 from django.shortcuts import render, redirect # Funciones básicas de Django para renderizar plantillas y redirigir
-from django.http import JsonResponse # Para devolver respuestas en formato JSON
-from .services import ReportGenerator, DatabaseConnector # Importa clases del módulo services para lógica de negocio (reportes, conexión DB)
+from django.http import FileResponse, HttpResponse # Para devolver archivos descargables y respuestas ya serializadas
+from .instrumentacion import JsonResponseMedido as JsonResponse, etapa # Respuestas JSON con tiempo de serialización medido (Server-Timing)
+from .services import (ReportGenerator,
+                       iterar_consulta, periodos_tendencia_sla, pivotar_tendencia_sla) # Importa clases del módulo services para lógica de negocio (reportes, conexión DB)
+from .glpi_db import pool_stats # Estadísticas del pool de conexiones GLPI
+from .dimensiones import (filtro_tecnicos, obtener_jerarquia, version_directorio_usuarios,
+                          version_catalogo_grupos, EquipoGLPI) # Técnicos y equipos, jerarquía de grupos en memoria y marcadores de cambios de GLPI
+from .condicional import catalogo_condicional # ETag / Last-Modified y Cache-Control de los catálogos
+from .report_cache import cache_stats # Contadores de la caché de reportes
+from .telemetria import acceso_permitido, texto_prometheus # Métricas de todos los workers en formato Prometheus
+from .context_processors import SESION_USUARIO_GLPI, datos_usuario_glpi # Datos del usuario GLPI guardados en la sesión
+from .instantaneas import cubre_tendencia_sla # Tendencia SLA servida desde instantáneas de meses cerrados
+from .periodos import AGRUPACIONES_TENDENCIA, MENSAJE_AGRUPACION_INVALIDA # Agrupaciones de la tendencia SLA
+from .models import TrabajoReporte # Trabajos de reportes en segundo plano
+from . import trabajos # Cola de trabajos (encolar, estado)
+from .streaming import solicita_streaming, respuesta_json_streaming, primera_fila # Respuestas JSON incrementales (opcionales)
+from .plantillas_graficas import PLANTILLAS, VERSION_PLANTILLAS, grafica_compacta # Formato compacto de gráficas (sin plotly)
 import re # Para usar expresiones regulares (validación de fechas)
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie # Decoradores para manejo de CSRF
+from django.utils.cache import patch_cache_control # Cabeceras Cache-Control para recursos versionados
 from django.contrib.auth.decorators import login_required # Decorador para requerir que el usuario esté autenticado
 from django.contrib.auth import login, logout, authenticate # Funciones de autenticación de Django
 from django.contrib import messages # Para mostrar mensajes flash al usuario (éxito, error, info)
 from django.contrib.auth.forms import AuthenticationForm # Formulario estándar de autenticación (aunque aquí se usa uno personalizado implícitamente)
 from django.views.decorators.http import require_http_methods, require_GET, require_POST # Decoradores para restringir métodos HTTP permitidos
 import logging # Para registrar eventos y errores de la aplicación
-import plotly.graph_objects as go # Importar Plotly
-import plotly.io as pio # Para convertir figuras a JSON
-import plotly.express as px # Para gráficos más rápidos como la tendencia
-import plotly.utils # Para el encoder JSON de Plotly
-import matplotlib.ticker as mticker  # Importar para formatear los valores numéricos en los ejes (no usado activamente aquí, pero útil)
-import matplotlib.font_manager as fm # Para gestión de fuentes en Matplotlib (opcional)
-import pandas as pd # Importar pandas para manejar el DataFrame del servicio
-from plotly.subplots import make_subplots # Para crear gráficos con ejes secundarios
+# plotly, pandas, openpyxl y reportlab no se importan aquí: lo hacen metricas/graficas.py,
+# metricas/dataframes.py, metricas/exportacion.py y metricas/reporte_pdf.py, que las vistas
+# importan solo al usarlos (ver `python manage.py medir_importacion`)
 
 # Configura el logger para este módulo. Usará la configuración definida en settings.py
 logger = logging.getLogger(__name__)
@@ -70,6 +82,10 @@ def login_view(request):
             # 3. Crear/obtener el usuario Django.
             # 4. Añadir el usuario al grupo Django 'Perfil Requerido'.
             login(request, user) # Inicia la sesión en Django para este usuario
+            # Guarda en la sesión los datos visibles del usuario GLPI (avatar, nombre)
+            datos_glpi = getattr(user, 'datos_glpi', None)
+            if datos_glpi:
+                request.session[SESION_USUARIO_GLPI] = datos_usuario_glpi(**datos_glpi)
             logger.info(f"Inicio de sesión exitoso para el usuario {username}.")
             # Redirige a la página 'next' si existe (ej. si intentó acceder a una página protegida antes de loguearse)
             # o a la página 'index' por defecto.
@@ -105,9 +121,36 @@ def index(request):
     # a login, y allí se le negará el acceso si intenta loguearse de nuevo.
     return render(request, 'metricas/index.html')
 
+# --- API: Estado del sistema (monitoreo) ---
+@login_required # Requiere autenticación
+@require_GET # Permite solo peticiones GET
+def estado_sistema(request):
+    """
+    Devuelve estadísticas de monitoreo del proceso que atiende la petición
+    (pool de conexiones GLPI: prestadas, ociosas, tiempos de espera, etc., y
+    aciertos/fallos de la caché de reportes).
+    Con gunicorn cada worker tiene su propio pool y contadores, por lo que los valores son por worker.
+    """
+    return JsonResponse({'pool_glpi': pool_stats(), 'cache_reportes': cache_stats()})
+
+# --- API: Métricas para Prometheus ---
+@require_GET # Permite solo peticiones GET
+def metricas_prometheus(request):
+    """
+    Histogramas de duración por vista y etapa (consultas GLPI, pandas, gráficas,
+    serialización JSON) y contadores de peticiones, errores, caché y pool, sumados
+    de todos los workers, en formato de texto de Prometheus (ver metricas/telemetria.py).
+    No usa la sesión: se protege con TELEMETRIA['TOKEN'] o TELEMETRIA['IPS_PERMITIDAS'];
+    sin ninguno de los dos responde 403.
+    """
+    if not acceso_permitido(request):
+        return HttpResponse('Acceso denegado.', status=403, content_type='text/plain; charset=utf-8')
+    return HttpResponse(texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # --- API: Obtener Técnicos ---
 @login_required # Requiere autenticación
 @require_GET # Permite solo peticiones GET
+@catalogo_condicional(version_directorio_usuarios) # 304 si el catálogo no cambió en GLPI
 def obtener_tecnicos(request):
     """Devuelve una lista de nombres de técnicos (perfil 10 en GLPI) en formato JSON."""
     try:
@@ -121,13 +164,27 @@ def obtener_tecnicos(request):
         # Devuelve una respuesta de error en JSON con estado HTTP 500
         return JsonResponse({'error': 'Ocurrió un error al obtener la lista de técnicos.'}, status=500)
 
+MENSAJE_EQUIPO_INVALIDO = 'Los parámetros grupo_id y subgrupo_id deben ser números enteros.'
+
+def _equipo_solicitado(data):
+    """
+    EquipoGLPI si la petición trae 'grupo_id' o 'subgrupo_id' en lugar de la lista de
+    técnicos (el servidor filtra por el grupo en SQL); None si no. ValueError si no
+    son enteros.
+    """
+    grupo_id, subgrupo_id = data.get('grupo_id'), data.get('subgrupo_id')
+    if grupo_id in (None, '') and subgrupo_id in (None, ''):
+        return None
+    return EquipoGLPI.desde_parametros(grupo_id, subgrupo_id)
+
 # --- API: Generar Reporte Principal ---
 @login_required # Requiere autenticación
 @require_http_methods(["POST"]) # Permite solo peticiones POST
 def generar_reporte(request):
     """
     Genera el reporte principal con métricas por técnico.
-    Espera datos JSON en el cuerpo de la petición con 'fecha_ini', 'fecha_fin', y 'tecnicos'.
+    Espera datos JSON en el cuerpo de la petición con 'fecha_ini', 'fecha_fin', y 'tecnicos'
+    (o 'grupo_id' / 'subgrupo_id' para reportar un equipo sin enviar sus técnicos).
     Devuelve los resultados del reporte en formato JSON.
     """
     try:
@@ -150,9 +207,17 @@ def generar_reporte(request):
         if not re.match(r'^\d{4}-\d{2}-\d{2}$', fecha_ini) or not re.match(r'^\d{4}-\d{2}-\d{2}$', fecha_fin):
             return JsonResponse({'error': 'Formato de fecha inválido (debe ser YYYY-MM-DD).'}, status=400)
 
+        try:
+            equipo = _equipo_solicitado(data)
+        except ValueError:
+            return JsonResponse({'error': MENSAJE_EQUIPO_INVALIDO}, status=400)
+
         # Determina la lista final de técnicos para pasar a la consulta SQL
         tecnicos_a_consultar = None # Por defecto, si es None, la consulta SQL no filtrará por técnico
-        if tecnicos_seleccionados == 'todos':
+        if equipo is not None:
+            # Equipo GLPI: se filtra por el grupo dentro de la consulta
+            tecnicos_a_consultar = equipo
+        elif tecnicos_seleccionados == 'todos':
              tecnicos_a_consultar = None # La consulta SQL está preparada para manejar None (no filtra)
         elif isinstance(tecnicos_seleccionados, list) and tecnicos_seleccionados:
             # Si es una lista y no está vacía, usa esa lista
@@ -163,10 +228,20 @@ def generar_reporte(request):
 
         # Registra la acción
         logger.info(f"Generando reporte principal para fechas {fecha_ini} a {fecha_fin} y técnicos: {tecnicos_a_consultar or 'Todos'}")
+        # Clave con la que el cliente pide las gráficas sin reenviar la tabla (/graficas/<clave>/)
+        clave_reporte = ReportGenerator.registrar_clave_reporte(fecha_ini, fecha_fin, tecnicos_a_consultar)
+        if solicita_streaming(request, data):
+            # Modo opcional: las filas se escriben a medida que se leen de GLPI
+            respuesta = respuesta_json_streaming(
+                ReportGenerator.iterar_reporte_principal(fecha_ini, fecha_fin, tecnicos_a_consultar)
+            )
+            if clave_reporte:
+                respuesta['X-Clave-Reporte'] = clave_reporte
+            return respuesta
         # Llama al método del servicio para generar el reporte
         resultados = ReportGenerator.generar_reporte_principal(fecha_ini, fecha_fin, tecnicos_a_consultar)
         # Devuelve los resultados en formato JSON
-        return JsonResponse({'data': resultados})
+        return JsonResponse({'data': resultados, 'clave_reporte': clave_reporte})
 
     except Exception as e:
         # Registra cualquier error inesperado
@@ -180,7 +255,8 @@ def generar_reporte(request):
 def tickets_reabiertos(request):
     """
     Obtiene la lista de tickets reabiertos para un técnico específico en un rango de fechas.
-    Espera datos en formato form-data o x-www-form-urlencoded (request.POST).
+    Espera datos en formato form-data o x-www-form-urlencoded (request.POST); en lugar de
+    'tecnico' acepta 'grupo_id' o 'subgrupo_id' para los reabiertos de un equipo.
     Devuelve los detalles de los tickets en formato JSON.
     """
     try:
@@ -190,6 +266,12 @@ def tickets_reabiertos(request):
         fecha_ini = data.get('fecha_ini')
         fecha_fin = data.get('fecha_fin')
 
+        try:
+            equipo = _equipo_solicitado(data)
+        except ValueError:
+            return JsonResponse({'error': MENSAJE_EQUIPO_INVALIDO}, status=400)
+        if equipo is not None:
+            tecnico = equipo
         # Validación: el técnico es requerido
         if not tecnico:
             return JsonResponse({'error': 'El nombre del técnico es requerido.'}, status=400)
@@ -201,6 +283,8 @@ def tickets_reabiertos(request):
 
         # Registra la acción
         logger.info(f"Obteniendo tickets reabiertos para {tecnico} entre {fecha_ini} y {fecha_fin}")
+        if solicita_streaming(request, data):
+            return respuesta_json_streaming(ReportGenerator.iterar_tickets_reabiertos(tecnico, fecha_ini, fecha_fin))
         # Llama al método del servicio para obtener los tickets
         tickets = ReportGenerator.obtener_tickets_reabiertos(tecnico, fecha_ini, fecha_fin)
         # Devuelve los resultados en JSON
@@ -213,25 +297,174 @@ def tickets_reabiertos(request):
         # Devuelve una respuesta de error
         return JsonResponse({'error': 'Ocurrió un error al obtener los tickets reabiertos.'}, status=500)
 
+# --- API: Exportar Reporte a Excel ---
+@login_required # Requiere autenticación
+@require_POST # Permite solo peticiones POST
+def exportar_excel(request):
+    """
+    Genera en el servidor un libro Excel con el reporte principal, el detalle de
+    tickets reabiertos y el cuadro de tendencia SLA.
+    Espera datos JSON con 'fecha_ini', 'fecha_fin', 'tecnicos' (lista, vacía o 'todos'
+    para todos) y opcionalmente 'agrupacion' (ver metricas/periodos.py) para la tendencia SLA.
+    """
+    try:
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            logger.warning("Error al decodificar JSON en exportar_excel", exc_info=True)
+            return JsonResponse({'error': 'Formato de datos inválido (se esperaba JSON).'}, status=400)
+
+        fecha_ini = data.get('fecha_ini')
+        fecha_fin = data.get('fecha_fin')
+        tecnicos = data.get('tecnicos')
+        agrupacion = data.get('agrupacion', 'mes')
+
+        # Validaciones (mismas reglas que generar_reporte y la tendencia SLA)
+        if not fecha_ini or not fecha_fin:
+            return JsonResponse({'error': 'Las fechas de inicio y fin son requeridas.'}, status=400)
+        if not re.match(r'^\d{4}-\d{2}-\d{2}$', fecha_ini) or not re.match(r'^\d{4}-\d{2}-\d{2}$', fecha_fin):
+            return JsonResponse({'error': 'Formato de fecha inválido (debe ser YYYY-MM-DD).'}, status=400)
+        if agrupacion not in AGRUPACIONES_TENDENCIA:
+            return JsonResponse({'error': MENSAJE_AGRUPACION_INVALIDA}, status=400)
+        # 'todos', None o una lista vacía exportan a todos los técnicos
+        tecnicos_a_exportar = tecnicos if isinstance(tecnicos, list) and tecnicos else None
+
+        logger.info(f"Exportando Excel para fechas {fecha_ini} a {fecha_fin} y técnicos: {tecnicos_a_exportar or 'Todos'}")
+        from .exportacion import generar_excel_reporte # openpyxl solo se carga al exportar
+        archivo = generar_excel_reporte(fecha_ini, fecha_fin, tecnicos_a_exportar, agrupacion)
+        # FileResponse envía el archivo por bloques y lo cierra (y borra) al terminar
+        return FileResponse(
+            archivo,
+            as_attachment=True,
+            filename=f"Reporte_Metricas_{fecha_ini}_{fecha_fin}.xlsx",
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+
+    except Exception as e:
+        logger.error(f"Error al exportar el reporte a Excel: {e}", exc_info=True)
+        return JsonResponse({'error': 'Ocurrió un error al generar el archivo Excel.'}, status=500)
+
+# --- API: Exportar Reporte a PDF ---
+@login_required # Requiere autenticación
+@require_POST # Permite solo peticiones POST
+def exportar_pdf(request):
+    """
+    Genera en el servidor el PDF del reporte principal (tabla de indicadores y
+    gráficas de SLA y volumen). El archivo se guarda en caché por reporte.
+    Espera datos JSON con 'fecha_ini', 'fecha_fin' y 'tecnicos' (lista, vacía o 'todos' para todos).
+    """
+    try:
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            logger.warning("Error al decodificar JSON en exportar_pdf", exc_info=True)
+            return JsonResponse({'error': 'Formato de datos inválido (se esperaba JSON).'}, status=400)
+
+        fecha_ini = data.get('fecha_ini')
+        fecha_fin = data.get('fecha_fin')
+        tecnicos = data.get('tecnicos')
+
+        if not fecha_ini or not fecha_fin:
+            return JsonResponse({'error': 'Las fechas de inicio y fin son requeridas.'}, status=400)
+        if not re.match(r'^\d{4}-\d{2}-\d{2}$', fecha_ini) or not re.match(r'^\d{4}-\d{2}-\d{2}$', fecha_fin):
+            return JsonResponse({'error': 'Formato de fecha inválido (debe ser YYYY-MM-DD).'}, status=400)
+        # 'todos', None o una lista vacía exportan a todos los técnicos
+        tecnicos_a_exportar = tecnicos if isinstance(tecnicos, list) and tecnicos else None
+
+        logger.info(f"Exportando PDF para fechas {fecha_ini} a {fecha_fin} y técnicos: {tecnicos_a_exportar or 'Todos'}")
+        from .reporte_pdf import generar_pdf_reporte # reportlab solo se carga al exportar
+        pdf = generar_pdf_reporte(fecha_ini, fecha_fin, tecnicos_a_exportar)
+        return FileResponse(
+            io.BytesIO(pdf),
+            as_attachment=True,
+            filename=f"Reporte_Metricas_{fecha_ini}_{fecha_fin}.pdf",
+            content_type='application/pdf',
+        )
+
+    except Exception as e:
+        logger.error(f"Error al exportar el reporte a PDF: {e}", exc_info=True)
+        return JsonResponse({'error': 'Ocurrió un error al generar el archivo PDF.'}, status=500)
+
+# --- API: Trabajos de Reportes en Segundo Plano ---
+@login_required # Requiere autenticación
+@require_POST # Permite solo peticiones POST
+def crear_trabajo(request):
+    """
+    Encola un reporte o exportación para ejecutarlo fuera de la petición
+    (worker: ``manage.py procesar_trabajos``). Espera JSON con 'tipo'
+    ('reporte_principal', 'excel' o 'pdf'), 'fecha_ini', 'fecha_fin', 'tecnicos'
+    y opcionalmente 'agrupacion'. Devuelve el id del trabajo (HTTP 202).
+    """
+    try:
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            logger.warning("Error al decodificar JSON en crear_trabajo", exc_info=True)
+            return JsonResponse({'error': 'Formato de datos inválido (se esperaba JSON).'}, status=400)
+
+        try:
+            trabajo = trabajos.encolar(data.get('tipo'), data, usuario=request.user)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse(trabajos.estado_trabajo(trabajo), status=202)
+
+    except Exception as e:
+        logger.error(f"Error al encolar trabajo: {e}", exc_info=True)
+        return JsonResponse({'error': 'Ocurrió un error al registrar el trabajo.'}, status=500)
+
+
+def _trabajo_del_usuario(request, trabajo_id):
+    """Trabajo del usuario autenticado o None (no se exponen trabajos de otros usuarios)."""
+    return TrabajoReporte.objects.filter(pk=trabajo_id, usuario=request.user).first()
+
+
+@login_required # Requiere autenticación
+@require_GET # Permite solo peticiones GET
+def estado_trabajo(request, trabajo_id):
+    """Estado de un trabajo encolado (pendiente, en_proceso, completado o error)."""
+    trabajo = _trabajo_del_usuario(request, trabajo_id)
+    if trabajo is None:
+        return JsonResponse({'error': 'Trabajo no encontrado.'}, status=404)
+    return JsonResponse(trabajos.estado_trabajo(trabajo))
+
+
+@login_required # Requiere autenticación
+@require_GET # Permite solo peticiones GET
+def resultado_trabajo(request, trabajo_id):
+    """Resultado de un trabajo completado: JSON del reporte o el archivo Excel/PDF generado."""
+    trabajo = _trabajo_del_usuario(request, trabajo_id)
+    if trabajo is None:
+        return JsonResponse({'error': 'Trabajo no encontrado.'}, status=404)
+    if trabajo.estado != TrabajoReporte.COMPLETADO:
+        return JsonResponse({'error': f'El trabajo no está completado (estado: {trabajo.estado}).'}, status=409)
+
+    if not trabajo.archivo:
+        return JsonResponse(trabajo.resultado or {'data': []})
+    _, extension, content_type = trabajos.TIPOS_TRABAJO[trabajo.tipo]
+    try:
+        archivo = open(trabajo.archivo, 'rb')
+    except OSError:
+        return JsonResponse({'error': 'El resultado del trabajo ya no está disponible.'}, status=410)
+    parametros = trabajo.parametros
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f"Reporte_Metricas_{parametros['fecha_ini']}_{parametros['fecha_fin']}.{extension}",
+        content_type=content_type,
+    )
+
 # --- API: Obtener Grupos (Entidades GLPI Nivel 3) ---
 @login_required # Requiere autenticación
 @require_GET # Permite solo peticiones GET
+@catalogo_condicional(version_catalogo_grupos) # 304 si el catálogo no cambió en GLPI
 def obtener_grupos(request):
     """
     Obtiene una lista de entidades GLPI de nivel 3 (usadas como 'grupos' principales).
     Devuelve la lista (id, name) en formato JSON.
     """
-    conn = None # Inicializa la conexión a None
-    cursor = None # Inicializa el cursor a None
     try:
-        # Obtiene una conexión a la base de datos GLPI
-        conn = DatabaseConnector.get_connection()
-        # Crea un cursor que devuelve resultados como diccionarios
-        cursor = conn.cursor(dictionary=True)
-        # Query para obtener entidades de nivel 3, ordenadas por nombre
-        query = "SELECT ge.id, ge.name FROM glpi_entities ge WHERE ge.`level` = 3 ORDER BY ge.name"
-        cursor.execute(query) # Ejecuta la query
-        grupos = cursor.fetchall() # Obtiene todos los resultados
+        # Jerarquía de grupos en memoria (ver dimensiones.JerarquiaGrupos); no consulta GLPI
+        grupos = obtener_jerarquia().entidades
         # Devuelve los grupos en formato JSON
         return JsonResponse({'grupos': grupos})
     except Exception as e:
@@ -239,25 +472,17 @@ def obtener_grupos(request):
         logger.error(f"Error al obtener grupos GLPI: {e}", exc_info=True)
         # Devuelve una respuesta de error
         return JsonResponse({'error': 'Error al obtener los grupos.'}, status=500)
-    finally:
-        # Bloque finally: se ejecuta siempre, haya error o no
-        # Asegura que el cursor y la conexión se cierren correctamente
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 # --- API: Obtener Técnicos por Grupo (Entidad GLPI) ---
 @login_required # Requiere autenticación
 @require_GET # Permite solo peticiones GET
+@catalogo_condicional(version_catalogo_grupos) # 304 si el catálogo no cambió en GLPI
 def obtener_tecnicos_por_grupo(request):
     """
     Obtiene una lista de técnicos asociados a una entidad GLPI específica (grupo principal).
     Espera el parámetro 'grupo_id' (ID de la entidad) en la query string.
     Devuelve la lista de técnicos (id, nombre) en formato JSON.
     """
-    conn = None
-    cursor = None
     grupo_id = request.GET.get('grupo_id') # Obtiene el ID del grupo de los parámetros GET
     try:
         # Validación: grupo_id es requerido
@@ -269,23 +494,9 @@ def obtener_tecnicos_por_grupo(request):
         except ValueError:
             return JsonResponse({'error': 'El parámetro grupo_id debe ser un número entero.'}, status=400)
 
-        conn = DatabaseConnector.get_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Query para obtener técnicos (usuarios) que pertenecen a grupos (glpi_groups)
-        # cuya entidad asociada (entities_id) es la entidad padre seleccionada.
-        # DISTINCT evita duplicados si un usuario está en varios grupos de la misma entidad.
-        query = """
-            SELECT DISTINCT gu.id, CONCAT(gu.realname, ' ', gu.firstname) AS nombre
-            FROM glpi_groups_users ggu
-            JOIN glpi_users gu ON gu.id = ggu.users_id
-            JOIN glpi_groups gg ON gg.id = ggu.groups_id
-            WHERE gg.entities_id = %s
-            ORDER BY nombre;
-        """
-        # Ejecuta la query pasando el ID del grupo como parámetro seguro
-        cursor.execute(query, (grupo_id_int,))
-        tecnicos = cursor.fetchall() # Obtiene los resultados
+        # Usuarios que pertenecen a grupos (glpi_groups) cuya entidad asociada
+        # (entities_id) es la entidad padre seleccionada, desde la jerarquía en memoria
+        tecnicos = obtener_jerarquia().usuarios_de_entidad(grupo_id_int)
 
         # Devuelve la lista de técnicos en JSON
         return JsonResponse({'tecnicos': tecnicos})
@@ -294,24 +505,17 @@ def obtener_tecnicos_por_grupo(request):
         logger.error(f"Error al obtener técnicos por grupo ID {grupo_id}: {e}", exc_info=True)
         # Devuelve una respuesta de error
         return JsonResponse({'error': 'Error al obtener los técnicos para el grupo seleccionado.'}, status=500)
-    finally:
-        # Cierra cursor y conexión
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 # --- API: Obtener Subgrupos (Grupos GLPI asociados a una Entidad) ---
 @login_required # Requiere autenticación
 @require_GET # Permite solo peticiones GET
+@catalogo_condicional(version_catalogo_grupos) # 304 si el catálogo no cambió en GLPI
 def obtener_subgrupos(request):
     """
     Obtiene una lista de grupos GLPI (glpi_groups) cuya entidad asociada es la entidad padre especificada.
     Espera el parámetro 'grupo_id' (ID de la entidad padre) en la query string.
     Devuelve la lista de subgrupos (id, name, comment) en formato JSON.
     """
-    conn = None
-    cursor = None
     grupo_id = request.GET.get('grupo_id') # ID de la entidad padre
     try:
         # Validación: grupo_id es requerido
@@ -323,18 +527,8 @@ def obtener_subgrupos(request):
         except ValueError:
              return JsonResponse({'error': 'El parámetro grupo_id debe ser un número entero.'}, status=400)
 
-        conn = DatabaseConnector.get_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Query para obtener los grupos (glpi_groups) asociados a la entidad padre
-        query = """
-            SELECT gg.id, gg.name, gg.comment
-            FROM glpi_groups gg
-            WHERE gg.entities_id = %s
-            ORDER BY gg.name;
-        """
-        cursor.execute(query, (grupo_id_int,))
-        subgrupos = cursor.fetchall() # Estos son los 'subgrupos' reales de GLPI
+        # Grupos (glpi_groups) asociados a la entidad padre, desde la jerarquía en memoria
+        subgrupos = obtener_jerarquia().subgrupos(grupo_id_int) # Estos son los 'subgrupos' reales de GLPI
 
         # Devuelve la lista de subgrupos en JSON
         return JsonResponse({'subgrupos': subgrupos})
@@ -343,24 +537,17 @@ def obtener_subgrupos(request):
         logger.error(f"Error al obtener subgrupos para entidad ID {grupo_id}: {e}", exc_info=True)
         # Devuelve respuesta de error
         return JsonResponse({'error': 'Error al obtener los subgrupos.'}, status=500)
-    finally:
-        # Cierra cursor y conexión
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 # --- API: Obtener Técnicos por Subgrupo (Grupo GLPI) ---
 @login_required # Requiere autenticación
 @require_GET # Permite solo peticiones GET
+@catalogo_condicional(version_catalogo_grupos) # 304 si el catálogo no cambió en GLPI
 def obtener_tecnicos_por_subgrupo(request):
     """
     Obtiene una lista de técnicos (usuarios) que pertenecen a un grupo GLPI específico (glpi_groups).
     Espera el parámetro 'subgrupo_id' (ID del grupo GLPI) en la query string.
     Devuelve la lista de técnicos (id, nombre) en formato JSON.
     """
-    conn = None
-    cursor = None
     subgrupo_id = request.GET.get('subgrupo_id') # ID del grupo GLPI (subgrupo)
     try:
         # Validación: subgrupo_id es requerido
@@ -372,21 +559,8 @@ def obtener_tecnicos_por_subgrupo(request):
         except ValueError:
              return JsonResponse({'error': 'El parámetro subgrupo_id debe ser un número entero.'}, status=400)
 
-        conn = DatabaseConnector.get_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Query para obtener los usuarios que pertenecen directamente al grupo GLPI especificado
-        query = """
-            SELECT DISTINCT gu.id, CONCAT(gu.realname, ' ', gu.firstname) AS nombre
-            FROM glpi_groups_users ggu
-            JOIN glpi_users gu ON gu.id = ggu.users_id
-            JOIN glpi_profiles_users gpu ON gu.id = gpu.users_id
-            JOIN glpi_profiles gp ON gpu.profiles_id = gp.id
-            WHERE ggu.groups_id = %s and gp.id=10
-            ORDER BY nombre;
-        """
-        cursor.execute(query, (subgrupo_id_int,))
-        tecnicos = cursor.fetchall() # Obtiene la lista de técnicos
+        # Técnicos (perfil 10) que pertenecen directamente al grupo GLPI, desde la jerarquía en memoria
+        tecnicos = obtener_jerarquia().tecnicos_de_grupo(subgrupo_id_int)
 
         # Devuelve la lista completa de diccionarios {id: x, nombre: y}
         return JsonResponse({'tecnicos': tecnicos})
@@ -396,12 +570,23 @@ def obtener_tecnicos_por_subgrupo(request):
         logger.error(f"Error al obtener técnicos por subgrupo ID {subgrupo_id}: {e}", exc_info=True)
         # Devuelve respuesta de error
         return JsonResponse({'error': 'Error al obtener los técnicos para el subgrupo seleccionado.'}, status=500)
-    finally:
-        # Cierra cursor y conexión
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
+
+# --- API: Jerarquía completa de grupos ---
+@login_required # Requiere autenticación
+@require_GET # Permite solo peticiones GET
+@catalogo_condicional(version_catalogo_grupos) # 304 si el catálogo no cambió en GLPI
+def jerarquia_grupos(request):
+    """
+    Devuelve en una sola respuesta la jerarquía de grupos: 'grupos' (entidades de nivel 3
+    con sus 'subgrupos' GLPI) y en cada nodo los ids de sus 'tecnicos' (los mismos que
+    devuelven /obtener-tecnicos-por-grupo/ y /obtener-tecnicos-por-subgrupo/); los
+    nombres van una sola vez en 'usuarios' (id -> nombre).
+    """
+    try:
+        return JsonResponse(obtener_jerarquia().arbol)
+    except Exception as e:
+        logger.error(f"Error al obtener la jerarquía de grupos: {e}", exc_info=True)
+        return JsonResponse({'error': 'Error al obtener la jerarquía de grupos.'}, status=500)
 
 # --- API: Generar Gráficas ---
 @login_required # Requiere autenticación
@@ -410,8 +595,9 @@ def generar_grafica(request):
     """
     Genera imágenes de gráficos (Cumplimiento SLA y Volumen de Tickets)
     basadas en los datos del reporte principal recibidos vía JSON, usando Plotly.
-    basadas en los datos del reporte principal recibidos vía JSON, usando Plotly.
-    Devuelve las imágenes codificadas en Base64 en formato JSON.
+    Se conserva para clientes que envían la tabla; la interfaz usa graficas_reporte
+    con la clave del reporte. Devuelve el JSON de las figuras, o solo las series si
+    'formato' es 'compacto' (ver metricas/plantillas_graficas.py).
     """
     try:
         # Decodifica los datos JSON del cuerpo de la petición
@@ -423,172 +609,18 @@ def generar_grafica(request):
         if not report_data:
             return JsonResponse({'error': 'No hay datos para generar las gráficas.'}, status=404) # 404 Not Found es más apropiado si no hay datos
 
-        # --- 1. Procesamiento de Datos para los Gráficos ---
-        tecnicos = []           # Lista para nombres de técnicos (eje X)
-        tickets_recibidos = []  # Lista para cantidad de tickets recibidos
-        tickets_cerrados = []   # Lista para cantidad de tickets cerrados
-        cumplimiento_sla = []   # Lista para porcentaje de cumplimiento SLA
-        pendientes = []         # Lista para cantidad de tickets pendientes SLA
-
-        # Itera sobre cada fila (diccionario) de los datos del reporte
-        for item in report_data:
-            # Obtiene el nombre completo del técnico
-            nombre_completo = item.get('Tecnico_Asignado', 'Desconocido')
-            # Acorta el nombre para mejor visualización en el gráfico (ej: primer nombre y primer apellido)
-            partes_nombre = nombre_completo.split()
-            nombre_corto = f"{partes_nombre[0]} {partes_nombre[1]}" if len(partes_nombre) > 1 else nombre_completo
-            tecnicos.append(nombre_corto) # Añade el nombre corto a la lista
-
-            # Extrae y convierte los valores numéricos, usando 0 por defecto si falta o es None/vacío
-            tickets_recibidos.append(float(item.get('Cant_tickets_recibidos', 0) or 0))
-            tickets_cerrados.append(float(item.get('Cant_tickets_cerrados', 0) or 0))
-            sla_value = item.get('Cumplimiento SLA', 0) # Obtiene el valor de SLA
-            try:
-                # Intenta convertir a float, maneja None explícitamente
-                cumplimiento_sla.append(float(sla_value) if sla_value is not None else 0.0)
-            except (ValueError, TypeError):
-                 # Si la conversión falla (ej. si es un string no numérico), registra y usa 0
-                 logger.warning(f"Valor inválido para 'Cumplimiento SLA': {sla_value}. Usando 0.")
-                 cumplimiento_sla.append(0.0)
-            pendientes.append(float(item.get('tickets_pendientes_SLA', 0) or 0))
-
-        # Define una paleta de colores
-        colors = {
-            'primary': '#4CAF50',  # Verde
-            'secondary': '#2196F3',  # Azul
-            'accent': '#FFC107',     # Amarillo/Naranja
-            'danger': '#F44336',     # Rojo
-            'recibidos': '#2196F3', # Azul para recibidos
-            'cerrados': '#4CAF50',  # Verde para cerrados
-            'pendientes': '#F44336', # Rojo para pendientes
-            'neutral': '#9E9E9E',    # Gris
-            'text_light': '#FFFFFF',
-            'text_dark': '#333333'
-        }
-
-        # Lista para almacenar los JSON de las figuras de Plotly
-        plotly_figures_json = []
-
-        # --- 3. Generación del Gráfico 1: Cumplimiento SLA ---
-        fig_sla = go.Figure()
-
-        fig_sla.add_trace(go.Bar(
-            x=tecnicos,
-            y=cumplimiento_sla,
-            name='Cumplimiento SLA',
-            marker_color=colors['primary'],
-            text=[f'{val:.1f}%' for val in cumplimiento_sla], # Texto para cada barra
-            textposition='outside', # Posición del texto
-            hoverinfo='x+y' # Información al pasar el mouse
-            # textfont_size=10 # Opcional: ajustar tamaño del texto en la barra
-        ))
-
-        # Añade línea de meta SLA
-        meta_sla = 90 # Define la meta
-        fig_sla.add_hline(
-            y=meta_sla,
-            line_width=2,
-            line_dash="dash",
-            line_color=colors['accent'],
-            annotation_text=f'Meta SLA ({meta_sla}%)',
-            annotation_position="bottom right"
-        )
+        # Formato compacto: solo las series; el diseño lo arma el cliente con las plantillas
+        if data.get('formato') == 'compacto':
+            return JsonResponse(grafica_compacta(report_data))
 
-        # Configura el layout de la gráfica SLA
-        fig_sla.update_layout(
-            title_text='<b>Cumplimiento de SLA por Técnico</b>', # Título en negrita
-            title_font_size=20,
-            xaxis_title='Técnico',
-            yaxis_title='Cumplimiento (%)',
-            # Ajusta el rango Y para dar espacio al texto 'outside'
-            yaxis_range=[0, max(110, (max(cumplimiento_sla) if cumplimiento_sla else 0) * 1.20) + 5],
-            xaxis_tickangle=-45, # Rota etiquetas X
-            legend_title_text='Leyenda',
-            template='plotly_white', # Estilo base
-            height=600, # Aumentar altura del gráfico
-            margin=dict(l=70, r=40, t=100, b=150), # Ajusta márgenes (más espacio abajo para etiquetas X)
-            font=dict(
-                family="Arial, sans-serif",
-                size=12,
-                color="black"
-            ),
-            xaxis_tickfont_size=11,
-            yaxis_tickfont_size=11,
-            hovermode='x unified' # Mejora el hover
-        )
+        # plotly se importa aquí y no al cargar el módulo (ver metricas/graficas.py)
+        from .graficas import figuras_reporte_principal
+        with etapa('graficas'):
+            graficas_json = figuras_reporte_principal(report_data)
 
-        # Convierte la figura SLA a JSON
-        graph_sla_json = pio.to_json(fig_sla)
-
-        # --- 4. Generación del Gráfico 2: Volumen de Tickets ---
-        fig_volumen = go.Figure()
-
-        # Añade traza para Tickets Recibidos
-        fig_volumen.add_trace(go.Bar(
-            x=tecnicos,
-            y=tickets_recibidos,
-            name='Recibidos',
-            marker_color=colors['recibidos'],
-            text=[int(val) for val in tickets_recibidos], # Texto entero
-            textposition='auto', # 'auto' puede ser mejor si las barras son muy pequeñas
-            # textfont_size=10,
-            hoverinfo='x+y'
-        ))
-
-        # Añade traza para Tickets Cerrados
-        fig_volumen.add_trace(go.Bar(
-            x=tecnicos,
-            y=tickets_cerrados,
-            name='Cerrados',
-            marker_color=colors['cerrados'],
-            text=[int(val) for val in tickets_cerrados],
-            textposition='auto',
-            # textfont_size=10,
-            hoverinfo='x+y'
-        ))
-
-        # Añade traza para Tickets Pendientes SLA
-        fig_volumen.add_trace(go.Bar(
-            x=tecnicos,
-            y=pendientes,
-            name='Pendientes SLA',
-            marker_color=colors['pendientes'],
-            text=[int(val) for val in pendientes],
-            textposition='auto',
-            # textfont_size=10,
-            hoverinfo='x+y'
-        ))
-
-        # Configura el layout de la gráfica de Volumen
-        max_volumen_val = 0
-        if tickets_recibidos or tickets_cerrados or pendientes:
-            all_volumen_values = tickets_recibidos + tickets_cerrados + pendientes
-            max_volumen_val = max(all_volumen_values) if all_volumen_values else 0
-
-        fig_volumen.update_layout(
-            title_text='<b>Volumen de Tickets por Técnico</b>', # Título en negrita
-            title_font_size=20,
-            xaxis_title='Técnico',
-            yaxis_title='Cantidad de Tickets',
-            yaxis_range=[0, max_volumen_val * 1.20 + 5], # Ajusta el rango Y para dar espacio
-            barmode='group', # Agrupa las barras
-            xaxis_tickangle=-45,
-            legend_title_text='Tipo de Ticket',
-            template='plotly_white',
-            height=600, # Aumentar altura
-            margin=dict(l=70, r=40, t=100, b=150), # Ajusta márgenes
-            font=dict(family="Arial, sans-serif", size=12, color="black"),
-            xaxis_tickfont_size=11,
-            yaxis_tickfont_size=11,
-            hovermode='x unified',
-        )
-
-        # Convierte la figura de Volumen a JSON
-        graph_volumen_json = pio.to_json(fig_volumen)
-
-        # --- 5. Respuesta ---
+        # --- Respuesta ---
         # Devuelve los JSON de las gráficas
-        return JsonResponse({'graphs_json': [graph_sla_json, graph_volumen_json]})
+        return JsonResponse({'graphs_json': graficas_json})
 
     except Exception as e:
         # Registra cualquier error durante la generación de gráficos
@@ -596,13 +628,58 @@ def generar_grafica(request):
         # Devuelve una respuesta de error
         return JsonResponse({'error': 'Ocurrió un error al generar las gráficas.'}, status=500)
 
+# --- API: Gráficas de un Reporte ya Generado ---
+@login_required # Requiere autenticación
+@require_GET # Permite solo peticiones GET
+def graficas_reporte(request, clave):
+    """
+    Devuelve las gráficas (Cumplimiento SLA y Volumen de Tickets) del reporte
+    identificado por la clave que devolvió /generar-reporte/, en formato compacto:
+    solo las series, que el cliente combina con las plantillas de
+    /graficas/plantillas/<version>/. Se generan a partir del resultado en el servidor
+    y se guardan en caché ya serializadas, así que el cliente no vuelve a subir la tabla.
+    """
+    try:
+        parametros = ReportGenerator.parametros_clave_reporte(clave)
+        if parametros is None:
+            # Clave vencida o desconocida: el cliente debe volver a generar el reporte
+            return JsonResponse({'error': 'El reporte ya no está disponible; genérelo de nuevo.'}, status=404)
+
+        graficas = ReportGenerator.graficas_reporte_principal(
+            parametros['fecha_ini'], parametros['fecha_fin'], ReportGenerator.tecnicos_de_parametros(parametros)
+        )
+        # El JSON ya viene serializado (y cacheado): se envía tal cual
+        return HttpResponse(graficas, content_type='application/json')
+
+    except Exception as e:
+        logger.error(f"Error al generar las gráficas del reporte {clave}: {e}", exc_info=True)
+        return JsonResponse({'error': 'Ocurrió un error al generar las gráficas.'}, status=500)
+
+# --- API: Plantillas de Diseño de las Gráficas ---
+@login_required # Requiere autenticación
+@require_GET # Permite solo peticiones GET
+def plantillas_graficas(request, version):
+    """
+    Devuelve el diseño fijo de las gráficas (títulos, ejes, colores, meta SLA) para
+    armar las figuras del formato compacto. Cada versión es inmutable, así que el
+    navegador la descarga una sola vez.
+    """
+    if version != VERSION_PLANTILLAS:
+        return JsonResponse({'error': f'Versión de plantillas desconocida; la actual es {VERSION_PLANTILLAS}.'}, status=404)
+    respuesta = JsonResponse({'version': VERSION_PLANTILLAS, 'plantillas': PLANTILLAS})
+    # La URL cambia con la versión: el navegador puede guardarla sin volver a validarla
+    patch_cache_control(respuesta, private=True, max_age=365 * 24 * 3600, immutable=True)
+    return respuesta
+
 # --- API: Generar Cuadro de Tendencia SLA (NUEVA FUNCIÓN) ---
 @login_required
 @require_POST
 def generar_tendencia_sla_view(request):
     """
-    Genera un cuadro con el cumplimiento de SLA por técnico, agrupado por meses o días.
-    Espera datos JSON con 'fecha_ini', 'fecha_fin', 'tecnicos' y 'agrupacion' ('mes' o 'dia').
+    Genera un cuadro con el cumplimiento de SLA por técnico, agrupado por días,
+    semanas, meses, trimestres o años (ver ReportGenerator.tendencia_sla).
+    Espera datos JSON con 'fecha_ini', 'fecha_fin', 'tecnicos' (o 'grupo_id' /
+    'subgrupo_id') y 'agrupacion' ('dia', 'semana', 'mes', 'trimestre' o 'año').
     """
     try:
         data = json.loads(request.body)
@@ -610,6 +687,12 @@ def generar_tendencia_sla_view(request):
         fecha_fin = data.get('fecha_fin')
         tecnicos_seleccionados = data.get('tecnicos', [])
         agrupacion = data.get('agrupacion', 'mes')  # Por defecto, agrupación por mes
+        try:
+            equipo = _equipo_solicitado(data)
+        except ValueError:
+            return JsonResponse({'error': MENSAJE_EQUIPO_INVALIDO}, status=400)
+        if equipo is not None:
+            tecnicos_seleccionados = equipo
 
         # Validaciones básicas
         if not fecha_ini or not fecha_fin:
@@ -618,141 +701,37 @@ def generar_tendencia_sla_view(request):
             return JsonResponse({'error': 'Formato de fecha inválido (debe ser YYYY-MM-DD).'}, status=400)
         if not tecnicos_seleccionados:
             return JsonResponse({'error': 'Debe seleccionar al menos un técnico.'}, status=400)
-        if agrupacion not in ['mes', 'dia']:
-            return JsonResponse({'error': 'La agrupación debe ser "mes" o "dia".'}, status=400)
+        if agrupacion not in AGRUPACIONES_TENDENCIA:
+            return JsonResponse({'error': MENSAJE_AGRUPACION_INVALIDA}, status=400)
 
         logger.info(f"Generando cuadro de tendencia SLA para técnicos {tecnicos_seleccionados} entre {fecha_ini} y {fecha_fin}, agrupado por {agrupacion}")
 
-        conn = None
-        cursor = None
-        timezone = 'America/Caracas'
-
         try:
-            conn = DatabaseConnector.get_connection()
-            cursor = conn.cursor(dictionary=True)
-
-            placeholders = ', '.join(['%s'] * len(tecnicos_seleccionados))
-            group_by_clause = "DATE_FORMAT(DATE(CONVERT_TZ(gt.solvedate, 'UTC', %s)), '%Y-%m')" if agrupacion == 'mes' else "DATE(CONVERT_TZ(gt.solvedate, 'UTC', %s))"
-
-            query_sla_tendencia = f"""
-                SELECT
-                    {group_by_clause} AS periodo,
-                    CONCAT(gu.realname, ' ', gu.firstname) AS tecnico,
-                    SUM(CASE WHEN gt.solvedate <= gt.time_to_resolve THEN 1 ELSE 0 END) AS cerrados_dentro_sla,
-                    COUNT(DISTINCT gt.id) AS cerrados_con_sla,
-                    SUM(CASE 
-                        WHEN gt.solvedate IS NULL 
-                             AND gt.time_to_resolve < UTC_TIMESTAMP() 
-                             AND gt.date BETWEEN CONVERT_TZ(%s, %s, 'UTC') AND CONVERT_TZ(%s, %s, 'UTC')
-                        THEN 1 
-                        ELSE 0 
-                    END) AS pendientes_sla,
-                    ROUND(
-                        (
-                            SUM(CASE WHEN gt.solvedate <= gt.time_to_resolve THEN 1 ELSE 0 END) /
-                            (COUNT(DISTINCT gt.id) + SUM(CASE 
-                                                            WHEN gt.solvedate IS NULL 
-                                                                 AND gt.time_to_resolve < UTC_TIMESTAMP() 
-                                                                 AND gt.date BETWEEN CONVERT_TZ(%s, %s, 'UTC') AND CONVERT_TZ(%s, %s, 'UTC')
-                                                            THEN 1 
-                                                            ELSE 0 
-                                                        END))
-                        ) * 100, 2
-                    ) AS cumplimiento
-                FROM glpi_tickets gt
-                JOIN glpi_tickets_users gtu ON gt.id = gtu.tickets_id AND gtu.type = 2
-                JOIN glpi_users gu ON gtu.users_id = gu.id
-                WHERE
-                    gt.is_deleted = 0
-                    AND gt.status > 4
-                    AND gt.time_to_resolve IS NOT NULL -- Common condition for SLA-relevant tickets
-                    AND CONCAT(gu.realname, ' ', gu.firstname) IN ({placeholders})
-                    AND (
-                        ( 
-                            gt.status > 4 -- This implies solvedate is NOT NULL
-                            AND gt.solvedate BETWEEN CONVERT_TZ(%s, %s, 'UTC') AND CONVERT_TZ(%s, %s, 'UTC')
-                        )
-                        OR
-                        ( 
-                            gt.solvedate IS NULL
-                            AND gt.time_to_resolve < UTC_TIMESTAMP() 
-                        )
-                    )
-                GROUP BY periodo, tecnico
-                ORDER BY periodo, tecnico;
-            """
-            # Parameters order:
-            # 1. timezone (for group_by_clause)
-            # 2. fecha_ini, timezone, fecha_fin, timezone (for gt.date in pendientes_sla SUM) - REPEATED FOR THE SQL COMPLIANCE CALCULATION
-            # 3. fecha_ini, timezone, fecha_fin, timezone (for gt.date in cumplimiento SQL calculation)
-            # 4. tecnicos_seleccionados (for IN clause)
-            # 5. fecha_ini, timezone, fecha_fin, timezone (for gt.solvedate in WHERE clause)
-            params_for_gt_date_filter = [f'{fecha_ini} 00:00:00', timezone, f'{fecha_fin} 23:59:59', timezone]
-            params_for_solvedate_filter = [f'{fecha_ini} 00:00:00', timezone, f'{fecha_fin} 23:59:59', timezone]
-
-            params_sla_tendencia = ([timezone] + params_for_gt_date_filter + params_for_gt_date_filter +
-                                    tecnicos_seleccionados + params_for_solvedate_filter)
-
-            cursor.execute(query_sla_tendencia, params_sla_tendencia)
-            sla_data = cursor.fetchall()
-
-            # Procesar los datos para calcular el cumplimiento de SLA
-            for row in sla_data:
-                cerrados_dentro_sla = row['cerrados_dentro_sla']
-                cerrados_con_sla = row['cerrados_con_sla']
-                pendientes_sla = row['pendientes_sla']
-                total_sla = cerrados_con_sla + pendientes_sla
-                row['cumplimiento'] = round((cerrados_dentro_sla / total_sla * 100), 2) if total_sla > 0 else 0.0
-
-            if not sla_data:
+            if (solicita_streaming(request, data) and ReportGenerator.fuente_reporte() == 'glpi'
+                    and not cubre_tendencia_sla(fecha_ini, fecha_fin, agrupacion)):
+                # Modo opcional: filas ordenadas por técnico, pivotadas y escritas una a una
+                query_sla_tendencia, params_sla_tendencia = ReportGenerator.consulta_tendencia_sla(
+                    fecha_ini, fecha_fin, filtro_tecnicos(tecnicos_seleccionados), agrupacion, orden_por_tecnico=True
+                )
+                primera, filas = primera_fila(pivotar_tendencia_sla(
+                    iterar_consulta(query_sla_tendencia, params_sla_tendencia, nombre='tendencia_sla'),
+                    periodos_tendencia_sla(fecha_ini, fecha_fin, agrupacion),
+                ))
+                if primera is None:
+                    return JsonResponse({'error': 'No se encontraron datos de SLA para los técnicos y fechas seleccionados.'}, status=404)
+                return respuesta_json_streaming(filas)
+
+            # Cálculo y pivote vectorizados (instantáneas, almacén local o GLPI)
+            resultados_pivotados = ReportGenerator.tendencia_sla(fecha_ini, fecha_fin, tecnicos_seleccionados, agrupacion)
+            if not resultados_pivotados:
                 return JsonResponse({'error': 'No se encontraron datos de SLA para los técnicos y fechas seleccionados.'}, status=404)
 
-            # --- Procesamiento con Pandas ---
-            # Crear DataFrame inicial
-            df_sla = pd.DataFrame(sla_data)
-
-            if df_sla.empty:
-                return JsonResponse({'data': []})
-
-            # Calcular el cumplimiento de SLA
-            df_sla['cumplimiento'] = df_sla.apply(
-                lambda row: round((row['cerrados_dentro_sla'] / row['cerrados_con_sla'] * 100), 2) if row['cerrados_con_sla'] > 0 else 0.0,
-                axis=1
-            )
-
-            # Convierte la columna 'periodo' a cadenas
-            df_sla['periodo'] = df_sla['periodo'].astype(str)
-
-            # Pivotar la tabla
-            df_pivot_indexed = df_sla.pivot_table(
-                index='tecnico',
-                columns='periodo',
-                values='cumplimiento'
-            )
-
-            # Reindexar para asegurar que todas las columnas de 'periodos' existan y estén en el orden deseado
-            df_with_all_period_columns = df_pivot_indexed.reindex(columns=sorted(df_sla['periodo'].unique()))
-
-            # Llenar valores NaN con 0.0
-            df_filled = df_with_all_period_columns.fillna(0.0)
-
-            # Convertir el índice 'tecnico' de nuevo en una columna
-            df_final_pivot = df_filled.reset_index()
-
-            # Convertir el DataFrame pivotado a una lista de diccionarios
-            resultados_pivotados = df_final_pivot.to_dict(orient='records')
-
             # Devuelve los resultados
             return JsonResponse({'data': resultados_pivotados})
 
         except Exception as db_err:
             logger.error(f"Error de base de datos al generar cuadro de tendencia SLA: {db_err}", exc_info=True)
             return JsonResponse({'error': f'Error de base de datos: {db_err}'}, status=500)
-        finally:
-            if cursor:
-                cursor.close()
-            if conn and conn.is_connected():
-                conn.close()
 
     except json.JSONDecodeError:
         logger.warning("Error decodificando JSON en generar_tendencia_sla_view", exc_info=True)
@@ -760,3 +739,48 @@ def generar_tendencia_sla_view(request):
     except Exception as e:
         logger.error(f"Error inesperado en generar_tendencia_sla_view: {e}", exc_info=True)
         return JsonResponse({'error': f'Ocurrió un error inesperado en el servidor: {e}'}, status=500)
+
+
+@login_required # Requiere autenticación
+@require_POST # Permite solo peticiones POST
+def tendencia_tecnicos(request):
+    """
+    Series diarias de recibidos, cerrados, cerrados dentro de SLA y cerrados con SLA
+    de varios técnicos (ver ReportGenerator.tendencia_diaria_tecnicos).
+    Espera datos JSON con 'fecha_ini', 'fecha_fin' y 'tecnicos' (lista).
+    Devuelve un JSON columnar: 'dias', 'tecnicos' y en 'series' una lista por técnico
+    alineada con 'dias' para cada métrica.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        logger.warning("Error decodificando JSON en tendencia_tecnicos", exc_info=True)
+        return JsonResponse({'error': 'Formato de datos inválido (se esperaba JSON).'}, status=400)
+
+    try:
+        fecha_ini = data.get('fecha_ini')
+        fecha_fin = data.get('fecha_fin')
+        tecnicos_seleccionados = data.get('tecnicos')
+
+        # Validaciones básicas
+        if not fecha_ini or not fecha_fin:
+            return JsonResponse({'error': 'Las fechas de inicio y fin son requeridas.'}, status=400)
+        if not re.match(r'^\d{4}-\d{2}-\d{2}$', fecha_ini) or not re.match(r'^\d{4}-\d{2}-\d{2}$', fecha_fin):
+            return JsonResponse({'error': 'Formato de fecha inválido (debe ser YYYY-MM-DD).'}, status=400)
+        if fecha_ini > fecha_fin:
+            return JsonResponse({'error': 'La fecha de inicio no puede ser posterior a la fecha de fin.'}, status=400)
+        if not isinstance(tecnicos_seleccionados, list) or not tecnicos_seleccionados:
+            return JsonResponse({'error': 'Debe seleccionar al menos un técnico.'}, status=400)
+        # Nombres visibles o ids de usuario GLPI; otros tipos (listas, objetos) no se pueden resolver
+        if any(isinstance(t, bool) or not isinstance(t, (str, int)) for t in tecnicos_seleccionados):
+            return JsonResponse({'error': 'Cada técnico debe ser un nombre o un id de usuario GLPI.'}, status=400)
+
+        logger.info(f"Generando tendencia diaria de {len(tecnicos_seleccionados)} técnicos entre {fecha_ini} y {fecha_fin}")
+        resultado = ReportGenerator.tendencia_diaria_tecnicos(tecnicos_seleccionados, fecha_ini, fecha_fin)
+        if resultado is None:
+            return JsonResponse({'error': 'Ninguno de los técnicos seleccionados tiene usuario en GLPI.'}, status=404)
+        return JsonResponse(resultado)
+
+    except Exception as e:
+        logger.error(f"Error al generar la tendencia diaria de técnicos: {e}", exc_info=True)
+        return JsonResponse({'error': 'Ocurrió un error inesperado al generar la tendencia de los técnicos.'}, status=500)
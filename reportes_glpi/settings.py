@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero: mide la petición completa y añade la cabecera Server-Timing
+    'metricas.instrumentacion.MiddlewareInstrumentacion',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -100,6 +103,133 @@ DATABASES = {
 
 #10.48.63.60'
 
+# Pool de conexiones a GLPI (ver metricas/glpi_db.py). Es por proceso: con
+# gunicorn el máximo de conexiones abiertas es SIZE x número de workers.
+GLPI_POOL = {
+    'SIZE': 5,                 # Conexiones máximas por proceso
+    'BORROW_TIMEOUT': 10,      # Segundos esperando una conexión libre
+    'MAX_LIFETIME': 1800,      # Segundos antes de reciclar una conexión (menor que wait_timeout de MySQL)
+    'PING_ON_CHECKOUT': True,  # Verificar la conexión antes de entregarla
+    'CONNECT_TIMEOUT': 10,     # Timeout de conexión a MySQL
+}
+
+# Dimensiones GLPI resueltas a ids enteros (ver metricas/dimensiones.py): directorio
+# de usuarios (lista de técnicos, nombre -> ids, datos visibles) y entidades elegibles.
+# Cada INTERVALO_VERIFICACION segundos se consulta un marcador de cambios y solo se
+# recargan si GLPI cambió; el directorio se recarga además cada TTL_DIRECTORIO segundos.
+# Un técnico o login que no está en el directorio adelanta la verificación, como
+# mucho una vez cada INTERVALO_REVALIDACION segundos.
+# La jerarquía de grupos (entidades -> grupos -> usuarios) verifica su marcador cada
+# INTERVALO_JERARQUIA segundos y se recarga completa cada TTL_JERARQUIA segundos.
+DIMENSIONES = {
+    'INTERVALO_VERIFICACION': 300,
+    'TTL_DIRECTORIO': 3600,
+    'INTERVALO_REVALIDACION': 10,
+    'INTERVALO_JERARQUIA': 30,
+    'TTL_JERARQUIA': 3600,
+}
+
+# Catálogos de técnicos y grupos (/tecnicos/, /obtener-grupos/, ...): responden con
+# ETag/Last-Modified y 304 si no cambiaron (ver metricas/condicional.py). MAX_AGE:
+# segundos que el navegador reutiliza su copia sin volver a preguntar.
+CACHE_HTTP_CATALOGOS = {
+    'MAX_AGE': 300,
+}
+
+# Instrumentación de las consultas GLPI por petición (ver metricas/instrumentacion.py):
+# cabecera Server-Timing (db, dataframe, graficas, serializacion, total) y registro en
+# consultas_lentas.log de las sentencias que tardan al menos UMBRAL_CONSULTA_LENTA_MS.
+INSTRUMENTACION = {
+    'ACTIVA': True,
+    'SERVER_TIMING': True,
+    'UMBRAL_CONSULTA_LENTA_MS': 1000,
+    'CONTAR_BYTES': True,
+}
+
+# Métricas en formato Prometheus en /metrics/ (ver metricas/telemetria.py): cada
+# worker escribe sus histogramas y contadores en DIRECTORIO cada INTERVALO_ESCRITURA
+# segundos y la vista los suma. Sin TOKEN (variable de entorno METRICAS_TOKEN) la
+# vista solo responde a IPS_PERMITIDAS; vacía, se deniega todo. No poner localhost
+# si hay un proxy inverso (nginx) en el mismo servidor: todas las peticiones
+# llegarían con REMOTE_ADDR 127.0.0.1.
+TELEMETRIA = {
+    'ACTIVA': True,
+    'DIRECTORIO': BASE_DIR / 'telemetria',
+    'INTERVALO_ESCRITURA': 5,
+    'TOKEN': os.environ.get('METRICAS_TOKEN'),
+    'IPS_PERMITIDAS': (),
+}
+
+# Motor SQL del reporte principal:
+#   'subconsultas': consulta original con cinco subconsultas unidas por nombre.
+#   'agregacion':   una sola pasada sobre los tickets con agregados condicionales por id
+#                   de usuario. Verificar con `python manage.py comparar_motores_reporte`.
+REPORT_ENGINE = 'subconsultas'
+
+# Origen de los datos del reporte principal y de las tendencias:
+#   'glpi':  consultas en vivo contra la base GLPI.
+#   'local': agregados diarios por técnico en la base por defecto (ver metricas/agregados.py),
+#            mantenidos con `python manage.py sincronizar_agregados` (cron).
+REPORT_SOURCE = 'glpi'
+
+# Consultas GLPI independientes que una misma petición puede ejecutar a la vez
+# (p. ej. las tres de la tendencia por técnico), cada una con su conexión del pool.
+# 1 = en secuencia. Se acota al tamaño del pool (GLPI_POOL['SIZE']).
+REPORT_CONCURRENCY = 3
+
+# Filas leídas por cada fetchmany() cuando un reporte se pide en streaming
+# (parámetro opcional "stream"; ver metricas/streaming.py). Mientras dura la
+# respuesta la conexión GLPI y el worker de gunicorn quedan ocupados.
+REPORT_STREAM_BATCH_SIZE = 500
+
+# Instantáneas mensuales de meses cerrados (ver metricas/instantaneas.py), generadas
+# con `python manage.py generar_instantaneas` (cron). Un mes completo con instantánea
+# se sirve sin consultar GLPI; el reporte principal y la tendencia SLA de varios meses
+# se calculan en vivo.
+INSTANTANEAS = {
+    'ACTIVAS': True,
+    'DIAS_GRACIA': 3,    # Días tras el fin de mes antes de considerarlo cerrado
+    'MESES_ATRAS': 24,   # Meses que se generan si no se indica --desde
+}
+
+# Cola de trabajos de reportes en segundo plano (ver metricas/trabajos.py). Los
+# ejecuta `python manage.py procesar_trabajos`, un proceso aparte de gunicorn.
+# Cada trabajo usa conexiones del pool GLPI de ese proceso: CONCURRENCIA no
+# debería superar GLPI_POOL['SIZE'].
+TRABAJOS_REPORTES = {
+    'DIRECTORIO': BASE_DIR / 'trabajos_reportes',  # Archivos Excel/PDF generados
+    'CONCURRENCIA': 2,
+    'INTERVALO_SONDEO': 2,     # Segundos entre búsquedas de trabajos pendientes
+    'RETENCION': 24 * 3600,    # Segundos que se conservan los resultados
+    'TIEMPO_MAXIMO': 2 * 3600, # Trabajos en proceso más tiempo se marcan con error
+}
+
+# Presupuesto de arranque de los workers (`python manage.py medir_importacion`):
+# `import metricas.views` debe tardar menos de MAX_MS y no cargar pandas, plotly,
+# openpyxl ni reportlab, que se importan solo en las vistas que los usan.
+PRESUPUESTO_IMPORTACION = {
+    'MAX_MS': 1500,
+    'MAX_RSS_MB': None,  # Opcional: RSS máximo del proceso tras la importación
+}
+
+AGREGADOS_LOCALES = {
+    'DIAS_REPROCESO': 7,   # Días recientes que se recalculan en cada sincronización
+    'DIAS_POR_LOTE': 31,   # Días consecutivos recalculados por consulta a GLPI
+}
+
+# Caché de resultados de reportes (ver metricas/report_cache.py): LRU en memoria
+# por proceso + directorio en disco compartido por todos los workers.
+REPORT_CACHE = {
+    'ACTIVO': True,
+    'DIRECTORIO': BASE_DIR / 'cache_reportes',
+    'MAX_ENTRADAS_MEMORIA': 64,
+    'MAX_ENTRADAS_DISCO': 1000,  # Por espacio de nombres; al superarlo se borran las menos usadas
+    'TTL_ABIERTO': 300,        # Rangos que incluyen el día de hoy
+    'TTL_RECIENTE': 3600,      # Rangos ya pasados dentro del mes en curso
+    'TTL_CERRADO': None,       # Meses cerrados: sin vencimiento (acotados por MAX_ENTRADAS_DISCO)
+    'TTL_CLAVES_REPORTE': 24 * 3600,  # Claves de reporte para pedir gráficas sin reenviar datos
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -191,6 +321,13 @@ LOGGING = {
             'filename': BASE_DIR / 'debug.log',
             'formatter': 'verbose',
         },
+        'consultas_lentas': {
+            'level': 'WARNING',
+            'class': 'logging.FileHandler',
+            'filename': BASE_DIR / 'consultas_lentas.log',
+            'formatter': 'verbose',
+            'delay': True,  # El archivo se crea con la primera sentencia lenta, no al arrancar
+        },
     },
     'loggers': {
         'django': {
@@ -203,5 +340,11 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        # Sentencias GLPI lentas (settings.INSTRUMENTACION['UMBRAL_CONSULTA_LENTA_MS'])
+        'metricas.consultas_lentas': {
+            'handlers': ['consultas_lentas'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }